@@ -7,22 +7,34 @@ ensure against network or server problems.
 
 import Queue
 import threading
+import collections
 import time
 import logging
+import math
+import sqlite3
 try:
     import MySQLdb
     SQL = 'mysqldb'
     ODBC_PROGRAMMING_ERROR = Exception
+    OPERATIONAL_ERROR = MySQLdb.OperationalError
 except ImportError:
     import pyodbc
     SQL = 'pyodbc'
     ODBC_PROGRAMMING_ERROR = pyodbc.ProgrammingError
+    OPERATIONAL_ERROR = pyodbc.Error
 
 
 LOGGER = logging.getLogger(__name__)
 # Make the logger follow the logging setup from the caller
 LOGGER.addHandler(logging.NullHandler())
 
+#: The aggregates, besides the mean, that the rollup logger can log
+ROLLUP_AGGREGATES = ('min', 'max', 'count')
+#: The number of attempts the MySQL client library makes to read and to write,
+#: each of which may take the read and write timeout respectively
+MYSQL_READ_ATTEMPTS = 3
+MYSQL_WRITE_ATTEMPTS = 2
+
 
 class NoneResponse:
     """NoneResponse"""
@@ -31,6 +43,21 @@ class NoneResponse:
 NONE_RESPONSE = NoneResponse()
 
 
+def fetch_results(cursor):
+    """Fetch the results of the last query executed on cursor
+
+    :param cursor: The database cursor
+    :type cursor: MySQL or ODBC cursor
+    :return: A tuple of results or None for ODBC queries without results
+    """
+    if SQL == 'mysqldb':
+        return cursor.fetchall()
+    try:
+        return cursor.fetchall()
+    except ODBC_PROGRAMMING_ERROR:
+        return None
+
+
 class InterruptableThread(threading.Thread):
     """Class to run a MySQL query with a time out"""
     def __init__(self, cursor, query):
@@ -46,17 +73,55 @@ class InterruptableThread(threading.Thread):
         """Start the thread"""
         LOGGER.debug('InterruptableThread.run start')
         self.cursor.execute(self.query)
-        if SQL == 'mysqldb':
-            self.result = self.cursor.fetchall()
-        else:
-            try:
-                self.result = self.cursor.fetchall()
-            except ODBC_PROGRAMMING_ERROR:
-                self.result = None
+        self.result = fetch_results(self.cursor)
         LOGGER.debug('InterruptableThread.run end. Executed query: {}'
                      ''.format(self.query))
 
 
+def is_connection_error(status, error):
+    """Return whether a failed query failed because of the connection
+
+    :param status: The status of the query, 'error' or 'timeout', as returned
+        by :meth:`.QueryExecutor.query`
+    :type status: str
+    :param error: The exception the query failed with
+    :type error: Exception
+    :return: True for time outs and connection errors, False for errors in
+        the query itself, e.g. a value that cannot be inserted
+    :rtype: bool
+    """
+    if status == 'timeout':
+        return True
+    if SQL == 'mysqldb' and isinstance(error, MySQLdb.InterfaceError):
+        return True
+    if not isinstance(error, OPERATIONAL_ERROR) or not error.args:
+        return False
+    if SQL == 'mysqldb':
+        # The client errors (2000-2999) are about the connection, e.g. 2006
+        # (server has gone away) and 2013 (lost connection), whereas the
+        # server errors are about the query
+        return 2000 <= error.args[0] < 3000
+    # SQLSTATE class 08 is connection exceptions and HYT0x time outs
+    return str(error.args[0]).startswith('08') or \
+        str(error.args[0]) in ('HYT00', 'HYT01')
+
+
+def driver_timeout(timeout):
+    """Return the longest time the driver may take to connect and execute a
+    query on a connection from :meth:`.ContinuousLogger._connect`
+
+    :param timeout: The timeout given to the connect function
+    :type timeout: float or int
+    :return: The time in seconds
+    :rtype: float
+    """
+    if SQL == 'mysqldb':
+        timeout = math.ceil(timeout)
+        return timeout * (1 + MYSQL_WRITE_ATTEMPTS + MYSQL_READ_ATTEMPTS)
+    # The connection and the query time out on their own
+    return 2.0 * timeout
+
+
 def timeout_query(cursor, query, timeout_duration=3):
     """Run a mysql query with a timeout
 
@@ -79,6 +144,186 @@ def timeout_query(cursor, query, timeout_duration=3):
     return query_thread.result
 
 
+class QueryWorker(threading.Thread):
+    """Persistent thread that owns a database connection and executes the
+    jobs of a :class:`.QueryExecutor` on it one at a time
+    """
+    def __init__(self, connect, timeout):
+        LOGGER.debug('QueryWorker.__init__ start')
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.jobs = Queue.Queue()
+        #: Set by the executor if it has given up waiting for the current job
+        self.abandoned = False
+        self._connect = connect
+        self._timeout = timeout
+        self._connection = None
+        self._cursor = None
+        LOGGER.debug('QueryWorker.__init__ end')
+
+    def run(self):
+        """Execute jobs until the worker is closed or abandoned"""
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            function, arguments, reply = job
+            try:
+                reply.put(('ok', function(self, *arguments)))
+            except Exception as exception:  # pylint: disable=broad-except
+                # The state of the connection is unknown after an error
+                LOGGER.warning('QueryWorker: job failed with: {}'
+                               ''.format(exception))
+                self.disconnect()
+                reply.put(('error', exception))
+            if self.abandoned:
+                LOGGER.warning('QueryWorker: abandoned job finished. Exit')
+                break
+        self.disconnect()
+        LOGGER.debug('QueryWorker.run end')
+
+    def connect(self):
+        """(Re-)open the connection"""
+        self.disconnect()
+        self._connection = self._connect(self._timeout)
+        self._cursor = self._connection.cursor()
+        LOGGER.debug('QueryWorker: connection opened')
+
+    def disconnect(self):
+        """Close the connection, if it is open"""
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:  # pylint: disable=broad-except
+                pass
+            LOGGER.debug('QueryWorker: connection closed')
+        self._connection = None
+        self._cursor = None
+
+    def query(self, query):
+        """Execute query, connecting first if necessary, and return results"""
+        if self._connection is None:
+            self.connect()
+        self._cursor.execute(query)
+        return fetch_results(self._cursor)
+
+
+class QueryExecutor(object):
+    """Execute queries with a timeout on a persistent connection
+
+    The queries are executed one at a time by a single persistent
+    :class:`.QueryWorker` thread, which owns the connection. The timeout is
+    enforced at the driver level by the connect function, so a query that
+    times out raises an error in the worker, which then closes the connection
+    and re-connects on the next query. Since the driver may take longer than
+    the timeout, e.g. the MySQL client library makes several attempts to read
+    that each may take the timeout, the caller waits for ``wait`` seconds,
+    which should be more than the longest time the driver can take, see
+    :func:`.driver_timeout`. Should the driver fail to enforce its timeouts,
+    the caller gives up waiting and the worker is abandoned: it exits as soon
+    as the driver call returns and a new worker, with a new connection, takes
+    over. The number of queries
+    that timed out or failed are counted in :attr:`timeouts` and
+    :attr:`errors`.
+    """
+
+    def __init__(self, connect, timeout=3, wait=None):
+        """Initialize the executor
+
+        :param connect: Function that takes the timeout as argument and
+            returns a new DB-API connection, that enforces the timeout
+        :type connect: callable
+        :param timeout: The timeout (in seconds) for connecting and executing
+            a query
+        :type timeout: float or int
+        :param wait: The time (in seconds) to wait for a query, including a
+            connect, before the worker is abandoned. Default is None, for
+            twice the timeout plus one second.
+        :type wait: float or int
+        """
+        LOGGER.debug('QueryExecutor.__init__ with timeout: {}'.format(timeout))
+        self.timeout = timeout
+        self.wait = 2 * timeout + 1 if wait is None else wait
+        self.timeouts = 0
+        self.errors = 0
+        self._connect = connect
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def _submit(self, function, *arguments):
+        """Let the worker call function with arguments and wait for the result
+
+        :return: A (status, result) tuple, where status is 'ok', 'error' or
+            'timeout'
+        """
+        with self._lock:
+            if self._worker is None or self._worker.abandoned:
+                self._worker = QueryWorker(self._connect, self.timeout)
+                self._worker.start()
+                LOGGER.debug('QueryExecutor: new worker started')
+            worker = self._worker
+            reply = Queue.Queue(1)
+            worker.jobs.put((function, arguments, reply))
+            try:
+                status, result = reply.get(timeout=self.wait)
+            except Queue.Empty:
+                worker.abandoned = True
+                self.timeouts += 1
+                LOGGER.warning('QueryExecutor: timed out waiting for {}'
+                               ''.format(function.__name__))
+                return 'timeout', None
+        if status == 'error':
+            self.errors += 1
+        return status, result
+
+    def connect(self):
+        """(Re-)connect to the database
+
+        :return: Whether the connection succeeded
+        :rtype: bool
+        """
+        status, _ = self._submit(QueryWorker.connect)
+        return status == 'ok'
+
+    def recycle(self):
+        """Close the connection. It is re-opened on the next query"""
+        self._submit(QueryWorker.disconnect)
+
+    def query(self, query):
+        """Execute query and return the status along with the result
+
+        :param query: The query to execute
+        :type query: str
+        :return: A (status, result) tuple, where status is 'ok', 'error' or
+            'timeout' and result is the tuple of results from the query, the
+            exception the query failed with or None on a time out
+        :rtype: tuple
+        """
+        return self._submit(QueryWorker.query, query)
+
+    def execute(self, query):
+        """Execute query
+
+        :param query: The query to execute
+        :type query: str
+        :return: A tuple of results from the query or ``loggers.NONE_RESPONSE``
+            if the query timed out or failed
+        """
+        status, result = self.query(query)
+        if status != 'ok':
+            return NONE_RESPONSE
+        return result
+
+    def close(self):
+        """Stop the worker, which closes the connection"""
+        with self._lock:
+            if self._worker is not None:
+                self._worker.jobs.put(None)
+                self._worker.join(self.wait)
+                self._worker = None
+        LOGGER.debug('QueryExecutor: closed')
+
+
 class StartupException(Exception):
     """Exception raised when the continous logger fails to start up"""
     def __init__(self, *args, **kwargs):
@@ -87,6 +332,229 @@ class StartupException(Exception):
         super(StartupException, self).__init__(*args, **kwargs)
 
 
+class Spool(object):
+    """An append-only on-disk spool of points for the continuous logger
+
+    The spool is a local SQLite database in WAL mode, which holds points on
+    the form (measurement number, unixtime, value) while the database
+    server cannot be reached. Points are deduplicated on (measurement
+    number, unixtime), where the last value put wins, and are retrieved
+    oldest first. All methods are thread safe.
+
+    The spool runs with ``synchronous=NORMAL``, which in WAL mode does not
+    sync on each commit. The spool cannot be corrupted by that, but the last
+    transactions may be lost on a power failure.
+    """
+
+    def __init__(self, filename):
+        """Open (or create) the spool
+
+        :param filename: The path of the spool file
+        :type filename: str
+        """
+        LOGGER.debug('Spool.__init__ with filename: {}'.format(filename))
+        self.filename = filename
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(filename, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS spool (id INTEGER PRIMARY KEY, '
+            'type INTEGER, time REAL, value REAL, UNIQUE (type, time))'
+        )
+        self._connection.execute(
+            'CREATE INDEX IF NOT EXISTS spool_time ON spool (time)'
+        )
+        self._connection.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute(
+                'SELECT COUNT(*) FROM spool').fetchone()[0]
+
+    def put(self, points):
+        """Append points to the spool in one transaction
+
+        A point with the same measurement number and unixtime as a point in
+        the spool replaces the value of that point, which keeps its id, so
+        that the new value is not lost if the point is being replayed.
+
+        :param points: Iterable of (measurement number, unixtime, value)
+            tuples
+        :type points: iterable
+        """
+        # The last value wins, also within points
+        values = collections.OrderedDict()
+        for meas_number, unixtime, value in points:
+            values[(meas_number, unixtime)] = value
+        # An UPDATE and an INSERT OR IGNORE, rather than an upsert, which
+        # needs SQLite 3.24
+        with self._lock:
+            with self._connection:
+                self._connection.executemany(
+                    'UPDATE spool SET value=? WHERE type=? AND time=?',
+                    ((value,) + key for key, value in values.items())
+                )
+                self._connection.executemany(
+                    'INSERT OR IGNORE INTO spool (type, time, value) '
+                    'VALUES (?, ?, ?)',
+                    (key + (value,) for key, value in values.items())
+                )
+
+    def get(self, number):
+        """Return the oldest points from the spool, without removing them
+
+        :param number: The maximum number of points to return
+        :type number: int
+        :return: List of (id, measurement number, unixtime, value) tuples
+        :rtype: list
+        """
+        with self._lock:
+            return self._connection.execute(
+                'SELECT id, type, time, value FROM spool '
+                'ORDER BY time, id LIMIT ?', (number,)
+            ).fetchall()
+
+    def remove(self, points):
+        """Remove points from the spool in one transaction. Points whose
+        value has been replaced since they were returned by :meth:`get` are
+        kept, so that the new value is replayed as well.
+
+        :param points: The (id, measurement number, unixtime, value) tuples
+            of the points, as returned by :meth:`get`
+        :type points: iterable
+        """
+        with self._lock:
+            with self._connection:
+                # IS, since NaN values are stored as NULL
+                self._connection.executemany(
+                    'DELETE FROM spool WHERE id=? AND value IS ?',
+                    ((point[0], point[3]) for point in points)
+                )
+
+    def close(self):
+        """Close the spool"""
+        with self._lock:
+            self._connection.close()
+
+
+class CompressionPolicy(object):
+    """Compression policy, that decides which points of a codename to log
+
+    The policy is either a deadband, where a point is logged if it differs
+    from the last logged value by more than ``absolute`` or by more than the
+    fraction ``relative`` of it, or swinging door trending with the error
+    bound ``swinging_door``. In both cases a point is also logged if
+    ``max_interval`` seconds have passed since the last logged point. The
+    first point is always logged.
+
+    With swinging door trending, the points are held back until it is known
+    whether they are needed to keep the curve within the error bound, so a
+    point may be logged after later points have been given to the policy. A
+    held back point is logged by :meth:`flush`.
+    """
+
+    def __init__(self, absolute=None, relative=None, max_interval=None,
+                 swinging_door=None):
+        """Initialize the policy
+
+        :param absolute: The absolute deadband
+        :type absolute: float
+        :param relative: The deadband relative to the last logged value, e.g.
+            0.1 for 10%
+        :type relative: float
+        :param max_interval: The maximum time (in seconds) between logged
+            points
+        :type max_interval: float
+        :param swinging_door: The error bound for swinging door trending.
+            Cannot be combined with a deadband
+        :type swinging_door: float
+        :raises ValueError: On negative arguments or if a deadband is combined
+            with swinging door trending
+        """
+        for name, argument in (('absolute', absolute), ('relative', relative),
+                               ('max_interval', max_interval),
+                               ('swinging_door', swinging_door)):
+            if argument is not None and argument < 0:
+                raise ValueError('{} cannot be negative'.format(name))
+        if swinging_door is not None and \
+                (absolute is not None or relative is not None):
+            raise ValueError('A deadband cannot be combined with swinging '
+                             'door trending')
+        self.absolute = absolute
+        self.relative = relative
+        self.max_interval = max_interval
+        self.swinging_door = swinging_door
+        self._lock = threading.Lock()
+        # The last logged point and the last point that was not logged
+        self._last = None
+        self._held = None
+        # The slopes of the lower and upper door
+        self._slopes = None
+
+    def filter(self, unixtime, value):
+        """Give a point to the policy and get the points to log
+
+        :param unixtime: The timestamp of the point
+        :type unixtime: float
+        :param value: The value of the point
+        :type value: float
+        :return: List of the (unixtime, value) points to log
+        :rtype: list
+        """
+        with self._lock:
+            if self._last is None or (
+                    self.max_interval is not None and
+                    unixtime - self._last[0] >= self.max_interval):
+                points = self._log(*self._held) if self._held else []
+                return points + self._log(unixtime, value)
+            if self.swinging_door is not None:
+                return self._swinging_door(unixtime, value)
+            difference = abs(value - self._last[1])
+            if (self.absolute is not None and difference > self.absolute) or \
+                    (self.relative is not None and
+                     difference > self.relative * abs(self._last[1])):
+                return self._log(unixtime, value)
+            return []
+
+    def flush(self):
+        """Return the held back point to log, if there is one
+
+        :return: List of the (unixtime, value) points to log
+        :rtype: list
+        """
+        with self._lock:
+            if self._held is None:
+                return []
+            return self._log(*self._held)
+
+    def _log(self, unixtime, value):
+        """Log the point as the new starting point"""
+        self._last = (unixtime, value)
+        self._held = None
+        self._slopes = None
+        return [(unixtime, value)]
+
+    def _swinging_door(self, unixtime, value):
+        """Update the doors with the point and return the points to log"""
+        interval = unixtime - self._last[0]
+        if interval <= 0:
+            return []
+        lower = (value - self._last[1] - self.swinging_door) / interval
+        upper = (value - self._last[1] + self.swinging_door) / interval
+        if self._slopes is not None:
+            lower = max(lower, self._slopes[0])
+            upper = min(upper, self._slopes[1])
+        if lower <= upper or self._held is None:
+            self._slopes = (lower, upper)
+            self._held = (unixtime, value)
+            return []
+        # The doors are open, so the held point is logged and the doors are
+        # restarted from it with the new point
+        points = self._log(*self._held)
+        return points + self._swinging_door(unixtime, value)
+
+
 class ContinuousLogger(threading.Thread):
     """A logger for continous data as a function of datetime. The class can
     ONLY be used with the new layout of tables for continous data, where there
@@ -102,7 +570,9 @@ class ContinuousLogger(threading.Thread):
     database = 'cinfdata'
 
     def __init__(self, table, username, password, measurement_codenames,
-                 dequeue_timeout=1, reconnect_waittime=60, dsn=None):
+                 dequeue_timeout=1, reconnect_waittime=60, dsn=None,
+                 batch_size=100, max_latency=1.0, spool_file=None,
+                 spool_threshold=10000, query_timeout=3, compression=None):
         """Initialize the continous logger
 
         :param table: The table to log data to
@@ -127,6 +597,43 @@ class ContinuousLogger(threading.Thread):
             connection or translate the code names
         :param dsn: DSN name of ODBC connection, used on Windows only
         :type dsn: str
+        :param batch_size: The maximum number of points to send to the
+            database in one multi-row insert. Default is 100.
+        :type batch_size: int
+        :param max_latency: The maximum time (in seconds) a point is held back
+            while waiting for more points to fill up a batch. Default is 1.
+        :type max_latency: float or int
+        :param spool_file: Path of a local :class:`.Spool` file. If given,
+            points are spooled to disk, instead of held in memory, while the
+            database is unreachable or when the queue holds more than
+            ``spool_threshold`` points. Spooled points are replayed oldest
+            first, in batches of 10 times ``batch_size``, when the database is
+            reachable. Since points are only removed from the spool after they
+            have been written, a point may be written twice if the logger is
+            stopped in between, so the table should have a unique key on
+            (type, time), for the replay (which updates the value of rows
+            that are already in the table) to deduplicate them. For points
+            with the same codename and time, the last value wins. Points left
+            in memory at stop are spooled, so they survive a restart. While
+            spooling, new points are collected in memory and written to the
+            spool by the logger thread, in one transaction, at least every
+            ``dequeue_timeout`` seconds. Default is None, for no spool.
+        :type spool_file: str
+        :param spool_threshold: The number of points in the in-memory queue
+            above which new points are spooled. Default is 10000.
+        :type spool_threshold: int
+        :param query_timeout: The timeout (in seconds) for connecting and for
+            each query, enforced at the driver level by a persistent
+            :class:`.QueryExecutor`. The driver may take a multiple of it,
+            see :func:`.driver_timeout`. Default is 3.
+        :type query_timeout: float or int
+        :param compression: Compression policies to filter the points of
+            some codenames with before they are queued. The keys are the
+            codenames and the values are :class:`.CompressionPolicy` objects
+            or dicts of keyword arguments for them, e.g.
+            ``{'pressure': {'relative': 0.1, 'max_interval': 600}}``. Held back
+            points are flushed when the logger is stopped. Default is None.
+        :type compression: dict
         """
         LOGGER.info('CL: __init__ called')
         # Initialize thread
@@ -140,8 +647,27 @@ class ContinuousLogger(threading.Thread):
                       'dsn': dsn}
         self._dequeue_timeout = dequeue_timeout
         self._reconnect_waittime = reconnect_waittime
-        self._cursor = None
-        self._connection = None
+        if batch_size < 1:
+            raise ValueError('batch_size must be at least 1')
+        self._batch_size = batch_size
+        self._max_latency = max_latency
+        # A batch that failed to be sent and must be retried first
+        self._pending = []
+        #: The number of points that were dropped because the database
+        #: refused them
+        self.dropped_points = 0
+        # Whether new points go to the spool, protected by the spool lock
+        self._spool = None
+        self._spooling = False
+        self._spool_lock = threading.Lock()
+        # Points to be written to the spool, protected by the spool lock
+        self._spool_buffer = []
+        self._spool_threshold = spool_threshold
+        if spool_file is not None:
+            self._spool = Spool(spool_file)
+            self._spooling = len(self._spool) > 0
+        self._executor = QueryExecutor(self._connect, query_timeout,
+                                       driver_timeout(query_timeout) + 1)
         self.data_queue = Queue.Queue()
         LOGGER.debug('CL: instance attributes initialized')
         # Dict used to translate code_names to measurement numbers
@@ -149,25 +675,48 @@ class ContinuousLogger(threading.Thread):
         # Init database connection and get measurement numbers from codenames
         self._init_connection()
         self._init_measurement_numbers(measurement_codenames)
+        # Compression policies
+        self._compression = {}
+        for codename, policy in (compression or {}).items():
+            if codename not in self._codename_translation:
+                message = 'Compression policy for unknown codename \'{}\''\
+                    ''.format(codename)
+                raise ValueError(message)
+            if isinstance(policy, dict):
+                policy = CompressionPolicy(**policy)
+            self._compression[codename] = policy
         LOGGER.info('CL: __init__ done')
 
+    def _connect(self, timeout):
+        """Return a new database connection, which times out queries
+
+        :param timeout: The timeout in seconds
+        :type timeout: float or int
+        """
+        if SQL == 'mysqldb':
+            kwargs = {'host': self.host, 'user': self.mysql['username'],
+                      'passwd': self.mysql['password'], 'db': self.database,
+                      'connect_timeout': int(math.ceil(timeout))}
+            try:
+                return MySQLdb.connect(read_timeout=int(math.ceil(timeout)),
+                                       write_timeout=int(math.ceil(timeout)),
+                                       **kwargs)
+            except TypeError:
+                # Old MySQLdb versions do not support read and write timeouts
+                LOGGER.warning('CL: MySQLdb does not support query timeouts')
+                return MySQLdb.connect(**kwargs)
+        connect_string = 'DSN={}'.format(self.mysql['dsn'])
+        connection = pyodbc.connect(connect_string, timeout=timeout)
+        connection.timeout = timeout
+        return connection
+
     def _init_connection(self):
         """Initialize the database connection."""
-        try:
-            if SQL == 'mysqldb':
-                self._connection = MySQLdb.connect(
-                    host=self.host, user=self.mysql['username'],
-                    passwd=self.mysql['password'], db=self.database
-                )
-            else:
-                connect_string = 'DSN={}'.format(self.mysql['dsn'])
-                self._connection = pyodbc.connect(connect_string)
-            self._cursor = self._connection.cursor()
-            LOGGER.info('CL: Database connection initialized')
-        except MySQLdb.OperationalError:
+        if not self._executor.connect():
             message = 'Could not connect to database'
             LOGGER.warning('CL: ' + message)
             raise StartupException(message)
+        LOGGER.info('CL: Database connection initialized')
 
     def _init_measurement_numbers(self, measurement_codenames):
         """Get the measurement numbers that corresponds to the measurement
@@ -177,8 +726,12 @@ class ContinuousLogger(threading.Thread):
         for codename in measurement_codenames:
             query = 'SELECT id FROM dateplots_descriptions '\
                 'WHERE codename=\'{}\''.format(codename)
-            self._cursor.execute(query)
-            results = self._cursor.fetchall()
+            results = self._executor.execute(query)
+            if results is NONE_RESPONSE:
+                message = 'Could not get the measurement number of \'{}\''\
+                    ''.format(codename)
+                LOGGER.critical('CL: ' + message)
+                raise StartupException(message)
             LOGGER.debug('CL: query for {} returned {}'
                          ''.format(codename, str(results)))
             if len(results) != 1:
@@ -193,37 +746,172 @@ class ContinuousLogger(threading.Thread):
     def stop(self):
         """Stop the thread"""
         LOGGER.info('CL: Set stop. Wait before returning')
+        for codename, policy in self._compression.items():
+            for unixtime, value in policy.flush():
+                self._enqueue(codename, unixtime, value)
         self._stop = True
-        time.sleep(max(1, 1.2 * self._dequeue_timeout))
+        time.sleep(max(1, 1.2 * (self._dequeue_timeout + self._max_latency)))
         LOGGER.debug('CL: Stop finished')
 
     def run(self):
         """Start the thread. Must be run before points are added."""
         while not self._stop:
+            self._housekeeping()
+            if self._spooling:
+                self._replay_spool()
+                continue
+            batch = self._pending or self._dequeue_batch()
+            if not batch:
+                continue
+            unsent = self._send_batch(batch)
+            if unsent:
+                self._pending = unsent
+                if self._spool is not None:
+                    # Move everything to disk while the database is down
+                    self._spooling = True
+                    self._spool_queue()
+                    LOGGER.debug('CL: Batch could not be sent. Spooled')
+                else:
+                    LOGGER.debug('CL: Batch could not be sent. Kept for '
+                                 'retry')
+                self._reinit_connection()
+            else:
+                self._pending = []
+                LOGGER.info('CL: Batch of {} points dequeued and sent'
+                            ''.format(len(batch)))
+        # When we stop the logger, make one attempt to send what is left in
+        # memory, e.g. the points flushed from the compression policies
+        if not self._spooling:
+            remaining = self._pending
+            while True:
+                try:
+                    remaining.append(self.data_queue.get(block=False))
+                except Queue.Empty:
+                    break
+            unsent = []
+            for start in range(0, len(remaining), self._batch_size):
+                unsent = self._send_batch(
+                    remaining[start:start + self._batch_size]
+                )
+                if unsent:
+                    unsent += remaining[start + self._batch_size:]
+                    break
+            self._pending = unsent
+        self._executor.close()
+        if self._spool is not None:
+            self._spool_queue()
+            LOGGER.info('Database connection closed. Remaining in spool: {}'
+                        .format(len(self._spool)))
+            self._spool.close()
+        else:
+            LOGGER.info('Database connection closed. Remaining in queue: {}'
+                .format(self.data_queue.qsize() + len(self._pending)))
+
+    def _spool_queue(self):
+        """Move the pending batch, the in-memory queue and the spool buffer to
+        the spool
+        """
+        points = self._pending
+        self._pending = []
+        while True:
             try:
-                point = self.data_queue.get(block=True,
-                                            timeout=self._dequeue_timeout)
-                result = self._send_point(point)
-                LOGGER.info('CL: Point "{}" dequeued and sent'.format(point))
-                if result is False:
-                    self.data_queue.put(point)
-                    LOGGER.debug('CL: Point could not be sent. Re-queued')
-                    self._reinit_connection()
+                points.append(self.data_queue.get(block=False))
             except Queue.Empty:
-                pass
-        # When we stop the logger
-        self._connection.close()
-        LOGGER.info('Database connection closed. Remaining in queue: {}'
-            .format(self.data_queue.qsize()))
-
-    def _send_point(self, point):
-        """Send all points in the queue to the data base"""
-        result = timeout_query(self._cursor, point)
-        LOGGER.debug('CL: timeout_query called from send_point')
-        # If the query was un successfully executed, put the points back in
-        # the queue and raise and set succes to False
-        success = False if (result is NONE_RESPONSE) else True
-        return success
+                break
+        with self._spool_lock:
+            points += self._spool_buffer
+            self._spool_buffer = []
+        if points:
+            self._spool.put(points)
+
+    def _replay_spool(self):
+        """Replay the oldest points in the spool in one bulk insert"""
+        self._spool_queue()
+        spooled = self._spool.get(10 * self._batch_size)
+        if not spooled:
+            with self._spool_lock:
+                # Points may have been buffered since the get
+                if not self._spool_buffer:
+                    self._spooling = False
+                    LOGGER.info('CL: Spool replayed')
+            return
+        batch = [point[1:] for point in spooled]
+        # The points that were sent before a connection error are sent again
+        # with the rest, where the update of duplicate rows deduplicates them
+        if self._send_batch(batch, replace=True):
+            LOGGER.debug('CL: Spooled points could not be sent')
+            self._reinit_connection()
+        else:
+            self._spool.remove(spooled)
+            LOGGER.info('CL: {} spooled points sent'.format(len(spooled)))
+
+    def _dequeue_batch(self):
+        """Dequeue a batch of points
+
+        Waits up to the dequeue timeout for the first point and then up to the
+        max latency after that for more points, or until the batch is full.
+
+        :return: List of (measurement number, unixtime, value) tuples, which is
+            empty if there were no points
+        :rtype: list
+        """
+        try:
+            batch = [self.data_queue.get(block=True,
+                                         timeout=self._dequeue_timeout)]
+        except Queue.Empty:
+            return []
+        deadline = time.time() + self._max_latency
+        while len(batch) < self._batch_size:
+            remaining = deadline - time.time()
+            try:
+                if remaining > 0:
+                    batch.append(self.data_queue.get(block=True,
+                                                      timeout=remaining))
+                else:
+                    batch.append(self.data_queue.get(block=False))
+            except Queue.Empty:
+                break
+        return batch
+
+    def _send_batch(self, batch, replace=False):
+        """Send a batch of points to the data base as one multi-row insert
+
+        If the insert fails for another reason than the connection, e.g. on a
+        value that cannot be inserted, the points are inserted one at a time
+        instead and the points that fail are dropped and logged, so that one
+        bad point does not hold back the others.
+
+        :param batch: List of (measurement number, unixtime, value) tuples
+        :type batch: list
+        :param replace: Whether to update the values of rows that are already
+            in the table, instead of failing on them
+        :type replace: bool
+        :return: The points that could not be sent because of the connection,
+            which is empty if the batch was sent
+        :rtype: list
+        """
+        values = ', '.join('({}, FROM_UNIXTIME({}), {})'.format(*point)
+                           for point in batch)
+        query = 'INSERT INTO {} (type, time, value) VALUES {}{};'.format(
+            self.mysql['table'], values,
+            ' ON DUPLICATE KEY UPDATE value=VALUES(value)' if replace else '')
+        status, result = self._executor.query(query)
+        LOGGER.debug('CL: query executed from send_batch')
+        if status == 'ok':
+            return []
+        if is_connection_error(status, result):
+            return batch
+        if len(batch) == 1:
+            self.dropped_points += 1
+            LOGGER.error('CL: Point {} dropped, it could not be inserted: {}'
+                         ''.format(batch[0], result))
+            return []
+        LOGGER.warning('CL: Batch could not be inserted: {}. Insert the points '
+                       'one at a time'.format(result))
+        for index, point in enumerate(batch):
+            if self._send_batch([point], replace):
+                return batch[index:]
+        return []
 
     def _reinit_connection(self):
         """Reinitialize the database connection"""
@@ -231,13 +919,34 @@ class ContinuousLogger(threading.Thread):
         while not database_up:
             try:
                 LOGGER.debug('CL: Try to re-open database connection')
+                self._executor.recycle()
                 self._init_connection()
                 database_up = True
             except StartupException:
                 pass
-            time.sleep(self._reconnect_waittime)
+            self._wait(self._reconnect_waittime)
         LOGGER.debug('CL: Database connection re-opened')
 
+    def _housekeeping(self):
+        """Do the periodic work that does not need the database, i.e. write
+        the spool buffer to the spool. Called by the logger thread at least
+        every dequeue timeout, also while the database is unreachable.
+        """
+        if self._spooling:
+            self._spool_queue()
+
+    def _wait(self, duration):
+        """Wait for duration seconds, while doing the housekeeping at least
+        every dequeue timeout
+        """
+        end = time.time() + duration
+        while True:
+            self._housekeeping()
+            remaining = end - time.time()
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, self._dequeue_timeout))
+
     def enqueue_point_now(self, codename, value):
         """Add a point to the queue and use the current time as the time
 
@@ -263,12 +972,187 @@ class ContinuousLogger(threading.Thread):
         :param unixtime: The timestamp for the point
         :type unixtime: float
         :param value: The value to be logged
-        :type value: float"""
+        :type value: float
+
+        If there is a compression policy for the codename, the point is only
+        queued if the policy decides so."""
+        if codename in self._compression:
+            for point in self._compression[codename].filter(unixtime, value):
+                self._enqueue(codename, *point)
+            return
+        self._enqueue(codename, unixtime, value)
+
+    def _enqueue(self, codename, unixtime, value):
+        """Add a point to the queue or the spool"""
         meas_number = self._codename_translation[codename]
-        query = ('INSERT INTO {} (type, time, value) VALUES '
-                 '({}, FROM_UNIXTIME({}), {});')
-        query = query.format(self.mysql['table'], meas_number, unixtime, value)
-        self.data_queue.put(query)
+        if self._spool is not None:
+            with self._spool_lock:
+                if not self._spooling and \
+                        self.data_queue.qsize() >= self._spool_threshold:
+                    self._spooling = True
+                    LOGGER.info('CL: Queue above spool threshold')
+                if self._spooling:
+                    # Written to the spool in bulk by the logger thread
+                    self._spool_buffer.append((meas_number, unixtime, value))
+                    LOGGER.debug('CL: Point ({}, {}, {}) spooled'
+                                 ''.format(codename, unixtime, value))
+                    return
+        self.data_queue.put((meas_number, unixtime, value))
         LOGGER.info('CL: Point ({}, {}, {}) added to queue. Queue size: {}'
                     ''.format(codename, unixtime, value,
                               self.data_queue.qsize()))
+
+
+class RollupLogger(ContinuousLogger):
+    """A continuous logger, that logs aggregates of the samples in time buckets
+
+    The samples of each codename, given at any rate to :meth:`enqueue_point`
+    or :meth:`enqueue_point_now`, are aggregated in buckets of ``bucket``
+    seconds, aligned to multiples of ``bucket`` in unixtime. When a bucket
+    closes, the mean is logged to the codename and optionally the minimum,
+    maximum and number of samples to sibling codenames. All points are logged
+    with the center time of the bucket.
+
+    A bucket closes when a sample for a later bucket arrives, or at the
+    latest ``grace`` seconds after its end (checked by the logger thread at
+    least every ``dequeue_timeout``, also while the database is unreachable,
+    in which case the aggregates are spooled or queued like other points).
+    Samples for a bucket that has already
+    been closed are dropped and counted in :attr:`late_samples`. Open buckets
+    are closed when the logger is stopped.
+    """
+
+    def __init__(self, table, username, password, measurement_codenames,
+                 bucket=10, siblings=None, grace=1.0, **kwargs):
+        """Initialize the rollup logger
+
+        :param table: The table to log data to
+        :type table: str
+        :param username: The MySQL username (must have write rights to
+            ``table``)
+        :type username: str
+        :param password: The password for ``user`` in the database
+        :type password: str
+        :param measurement_codenames: List of the codenames that samples are
+            given for and the means are logged to
+        :type measurement_codenames: Iterable containing str
+        :param bucket: The length (in seconds) of the buckets. Default is 10.
+        :type bucket: float or int
+        :param siblings: The sibling codenames to log the other aggregates to.
+            The keys are codenames and the values dicts of aggregate ('min',
+            'max' or 'count') to sibling codename, e.g.
+            ``{'pressure': {'min': 'pressure_min', 'max': 'pressure_max'}}``.
+            Default is None.
+        :type siblings: dict
+        :param grace: The time (in seconds) after the end of a bucket to wait
+            for late samples before it is closed. Default is 1.
+        :type grace: float or int
+        :param kwargs: Other keyword arguments for :class:`.ContinuousLogger`
+        :raises ValueError: On a bucket length that is not positive or unknown
+            codenames or aggregates in siblings
+        """
+        LOGGER.info('RL: __init__ called')
+        if bucket <= 0:
+            raise ValueError('bucket must be positive')
+        measurement_codenames = list(measurement_codenames)
+        siblings = siblings or {}
+        all_codenames = list(measurement_codenames)
+        for codename, aggregates in siblings.items():
+            if codename not in measurement_codenames:
+                message = 'Siblings given for unknown codename \'{}\''\
+                    ''.format(codename)
+                raise ValueError(message)
+            for aggregate, sibling in aggregates.items():
+                if aggregate not in ROLLUP_AGGREGATES:
+                    message = 'Unknown aggregate \'{}\'. Use one of: {}'\
+                        ''.format(aggregate, ROLLUP_AGGREGATES)
+                    raise ValueError(message)
+                all_codenames.append(sibling)
+        self._bucket = bucket
+        self._grace = grace
+        self._siblings = siblings
+        self._rollup_lock = threading.Lock()
+        # codename: [bucket start, count, sum, min, max]
+        self._aggregates = {}
+        # codename: start of the last closed bucket
+        self._closed = {}
+        self.late_samples = 0
+        super(RollupLogger, self).__init__(table, username, password,
+                                           all_codenames, **kwargs)
+        self._rollup_codenames = set(measurement_codenames)
+        LOGGER.info('RL: __init__ done')
+
+    def enqueue_point(self, codename, unixtime, value):
+        """Add a sample to the aggregate of its bucket
+
+        :param codename: The measurement codename that this sample belongs to
+        :type codename: str
+        :param unixtime: The timestamp for the sample
+        :type unixtime: float
+        :param value: The value of the sample
+        :type value: float
+        """
+        if codename not in self._rollup_codenames:
+            message = 'Codename \'{}\' is not one of the rollup codenames: {}'\
+                ''.format(codename, sorted(self._rollup_codenames))
+            raise ValueError(message)
+        start = math.floor(unixtime / self._bucket) * self._bucket
+        with self._rollup_lock:
+            if start <= self._closed.get(codename, start - 1):
+                self.late_samples += 1
+                LOGGER.warning('RL: Late sample ({}, {}, {}) dropped'
+                               ''.format(codename, unixtime, value))
+                return
+            aggregate = self._aggregates.get(codename)
+            if aggregate is not None and aggregate[0] != start:
+                self._close_bucket(codename)
+                aggregate = None
+            if aggregate is None:
+                self._aggregates[codename] = [start, 1, value, value, value]
+            else:
+                aggregate[1] += 1
+                aggregate[2] += value
+                aggregate[3] = min(aggregate[3], value)
+                aggregate[4] = max(aggregate[4], value)
+
+    def _close_bucket(self, codename):
+        """Log the aggregates of the open bucket of codename. Must be called
+        with the rollup lock held
+        """
+        start, count, sum_, minimum, maximum = self._aggregates.pop(codename)
+        self._closed[codename] = start
+        unixtime = start + self._bucket / 2.0
+        values = {'mean': sum_ / count, 'min': minimum, 'max': maximum,
+                  'count': count}
+        super(RollupLogger, self).enqueue_point(codename, unixtime,
+                                                values['mean'])
+        for aggregate, sibling in self._siblings.get(codename, {}).items():
+            super(RollupLogger, self).enqueue_point(sibling, unixtime,
+                                                    values[aggregate])
+        LOGGER.debug('RL: Bucket {} of \'{}\' closed with {} samples'
+                     ''.format(start, codename, count))
+
+    def close_buckets(self, before=None):
+        """Close the buckets that end before the time before
+
+        :param before: The unixtime. Default is None, for all open buckets
+        :type before: float
+        """
+        with self._rollup_lock:
+            for codename in list(self._aggregates.keys()):
+                if before is None or \
+                        self._aggregates[codename][0] + self._bucket <= before:
+                    self._close_bucket(codename)
+
+    def _housekeeping(self):
+        """Close the expired buckets and do the housekeeping of the continuous
+        logger
+        """
+        self.close_buckets(time.time() - self._grace)
+        super(RollupLogger, self)._housekeeping()
+
+    def stop(self):
+        """Close the open buckets and stop the thread"""
+        self.close_buckets()
+        super(RollupLogger, self).stop()
+
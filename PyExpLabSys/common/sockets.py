@@ -43,15 +43,28 @@ Presently the module contains the following socket servers:
 
 import threading
 import socket
+import select
 import SocketServer
 import time
 import json
+import errno
+import struct
 import Queue
 import logging
+import math
+import collections
+import mmap
+import os
+import stat
+import zlib
 LOGGER = logging.getLogger(__name__)
 # Make the logger follow the logging setup from the caller
 LOGGER.addHandler(logging.NullHandler())
 from .utilities import call_spec_string
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 def bool_translate(string):
@@ -63,6 +76,683 @@ def bool_translate(string):
     return True if str(string) == 'True' else False
 
 
+def split_tag(request):
+    """Split the optional request tag off request
+
+    A request may start with a tag on the form ``@tag`` followed by a space,
+    e.g. ``'@17 json'``. The tag is sent back in front of the reply, so that
+    a client can match replies to requests, see :class:`.SocketClient`.
+
+    Args:
+        request (str): The request
+
+    Returns:
+        tuple: ``(tag, request)`` where ``tag`` is the tag including the ``@``
+            and the space to put in front of the reply, or an empty string
+    """
+    if request.startswith('@'):
+        tag, separator, request = request.partition(' ')
+        if separator:
+            return tag + separator, request
+        return '', tag
+    return '', request
+
+
+SERVLOG = logging.getLogger(__name__ + '.servers')
+SERVLOG.addHandler(logging.NullHandler())
+
+
+class InFlightMixIn(object):
+    """Mix-in for UDP servers that caps and tracks the number of requests in
+    progress, i.e. received but not yet fully handled.
+
+    When the cap is reached, :meth:`._acquire_slot` blocks until a request is
+    done if ``block_when_full`` is True (the server stops reading requests),
+    otherwise the request is dropped.
+    """
+
+    #: Whether to wait for a free slot or drop the request when the cap is
+    #: reached. A :class:`.Reactor` sets this to False when the server is
+    #: registered, so one busy server cannot block the others.
+    block_when_full = True
+
+    def _init_in_flight(self, max_in_flight):
+        """Initialize the in flight tracking
+
+        Args:
+            max_in_flight (int): The maximum number of requests in progress at
+                the same time. None means no limit.
+        """
+        self._max_in_flight = max_in_flight
+        self._in_flight = 0
+        self._in_flight_condition = threading.Condition()
+
+    def _acquire_slot(self):
+        """Acquire a slot for a request
+
+        Returns:
+            bool: Whether a slot was acquired. False means that the request
+                should be dropped.
+        """
+        with self._in_flight_condition:
+            while self._max_in_flight and \
+                    self._in_flight >= self._max_in_flight:
+                if not self.block_when_full:
+                    return False
+                self._in_flight_condition.wait()
+            self._in_flight += 1
+        return True
+
+    def _release_slot(self):
+        """Release the slot for a request that is done"""
+        with self._in_flight_condition:
+            self._in_flight -= 1
+            self._in_flight_condition.notify_all()
+
+    def wait_for_requests(self):
+        """Wait until all requests in progress are done"""
+        with self._in_flight_condition:
+            while self._in_flight > 0:
+                self._in_flight_condition.wait()
+
+
+class PoolingUDPServer(InFlightMixIn, SocketServer.UDPServer):
+    """UDP server that handles the requests in a fixed size pool of worker
+    threads, with a cap on the number of requests in progress (waiting for or
+    being handled by a worker).
+
+    The worker threads are started on the first request and stopped by
+    :meth:`.server_close`, after the requests in progress are done.
+    """
+
+    def __init__(self, server_address, handler_class, workers=4,
+                 max_in_flight=32, bind_and_activate=True):
+        """Initialize the server
+
+        Args:
+            server_address (tuple): The (host, port) address to bind to
+            handler_class (Sub-class of SocketServer.BaseRequestHandler): The
+                UDP handler to use in the server
+            workers (int): The number of worker threads
+            max_in_flight (int): The maximum number of requests in progress at
+                the same time. None means no limit.
+            bind_and_activate (bool): Whether to bind the socket right away
+        """
+        SocketServer.UDPServer.__init__(self, server_address, handler_class,
+                                        bind_and_activate)
+        self._init_in_flight(max_in_flight)
+        self._number_of_workers = workers
+        self._requests = Queue.Queue()
+        self._workers = []
+        self._workers_lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        """Hand the request to the worker pool"""
+        if not self._acquire_slot():
+            SERVLOG.warning('Dropped request from {}, too many in flight'
+                            .format(client_address))
+            return
+        with self._workers_lock:
+            if not self._workers:
+                for _ in range(self._number_of_workers):
+                    worker = threading.Thread(target=self._work)
+                    worker.daemon = True
+                    worker.start()
+                    self._workers.append(worker)
+        self._requests.put((request, client_address))
+
+    def _work(self):
+        """Handle requests from the request queue until None is received"""
+        while True:
+            item = self._requests.get()
+            if item is None:
+                break
+            request, client_address = item
+            # pylint: disable=broad-except
+            try:
+                self.finish_request(request, client_address)
+            except Exception:  # Same error handling as BaseServer
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+                self._release_slot()
+
+    def server_close(self):
+        """Wait for the requests in progress, stop the workers and close the
+        socket
+        """
+        self.wait_for_requests()
+        with self._workers_lock:
+            for _ in self._workers:
+                self._requests.put(None)
+            for worker in self._workers:
+                worker.join()
+            self._workers = []
+        SocketServer.UDPServer.server_close(self)
+
+
+class BoundedThreadingUDPServer(InFlightMixIn, SocketServer.ThreadingMixIn,
+                                SocketServer.UDPServer):
+    """UDP server that handles each request in a new thread, with a cap on the
+    number of requests in progress at the same time
+    """
+
+    daemon_threads = True
+
+    def __init__(self, server_address, handler_class, max_in_flight=32,
+                 bind_and_activate=True):
+        """Initialize the server
+
+        Args:
+            server_address (tuple): The (host, port) address to bind to
+            handler_class (Sub-class of SocketServer.BaseRequestHandler): The
+                UDP handler to use in the server
+            max_in_flight (int): The maximum number of requests in progress at
+                the same time. None means no limit.
+            bind_and_activate (bool): Whether to bind the socket right away
+        """
+        SocketServer.UDPServer.__init__(self, server_address, handler_class,
+                                        bind_and_activate)
+        self._init_in_flight(max_in_flight)
+
+    def process_request(self, request, client_address):
+        """Start a thread for the request"""
+        if not self._acquire_slot():
+            SERVLOG.warning('Dropped request from {}, too many in flight'
+                            .format(client_address))
+            return
+        SocketServer.ThreadingMixIn.process_request(self, request,
+                                                    client_address)
+
+    def process_request_thread(self, request, client_address):
+        """Handle the request and release the in flight slot"""
+        try:
+            SocketServer.ThreadingMixIn.process_request_thread(
+                self, request, client_address
+            )
+        finally:
+            self._release_slot()
+
+    def server_close(self):
+        """Wait for the requests in progress and close the socket"""
+        self.wait_for_requests()
+        SocketServer.UDPServer.server_close(self)
+
+
+def make_udp_server(port, handler_class, serving_mode='serial', workers=4,
+                    max_in_flight=32, reuse_port=False):
+    """Return a UDP server for port with the requested serving mode
+
+    Args:
+        port (int): The port to start the server on
+        handler_class (Sub-class of SocketServer.BaseRequestHandler): The UDP
+            handler to use in the server
+        serving_mode (str): How the requests are served. One of:
+
+             * ``'serial'`` (default) one request at a time in the server
+               thread
+             * ``'pool'`` in a pool of ``workers`` threads
+             * ``'thread'`` in a new thread per request
+
+        workers (int): The number of worker threads for the ``'pool'`` mode
+        max_in_flight (int): The maximum number of requests that are in
+            progress (waiting for or being handled by a thread) at the same
+            time for the ``'pool'`` and ``'thread'`` modes. None means no
+            limit.
+        reuse_port (bool): Whether to set ``SO_REUSEPORT`` on the socket, so
+            that several processes can serve the same port. The kernel then
+            distributes the requests between them.
+
+    Raises:
+        ValueError: On unknown serving mode or if ``SO_REUSEPORT`` is not
+            supported
+        PortStillReserved: If the port is still reserved
+    """
+    if serving_mode not in SERVING_MODES:
+        message = 'Unknown serving mode \'{}\'. Must be one of: {}'\
+            .format(serving_mode, SERVING_MODES)
+        SERVLOG.error(message)
+        raise ValueError(message)
+    if reuse_port and not hasattr(socket, 'SO_REUSEPORT'):
+        message = 'SO_REUSEPORT is not supported on this platform'
+        SERVLOG.error(message)
+        raise ValueError(message)
+    # The server is bound after it is made, so that the socket options can be
+    # set first
+    if serving_mode == 'pool':
+        server = PoolingUDPServer(('', port), handler_class, workers=workers,
+                                  max_in_flight=max_in_flight,
+                                  bind_and_activate=False)
+    elif serving_mode == 'thread':
+        server = BoundedThreadingUDPServer(('', port), handler_class,
+                                           max_in_flight=max_in_flight,
+                                           bind_and_activate=False)
+    else:
+        server = SocketServer.UDPServer(('', port), handler_class,
+                                        bind_and_activate=False)
+    if reuse_port:
+        server.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    try:
+        server.server_bind()
+        server.server_activate()
+    except socket.error as error:
+        server.server_close()
+        if error.errno == 98:
+            # See custom exception message to understand this
+            SERVLOG.error('Port \'{}\' still reserved'.format(port))
+            raise PortStillReserved()
+        else:
+            raise error
+    return server
+
+
+REACTLOG = logging.getLogger(__name__ + '.Reactor')
+REACTLOG.addHandler(logging.NullHandler())
+
+
+class Reactor(threading.Thread):
+    """Event loop that serves the requests for any number of socket servers in
+    a single thread.
+
+    Instead of each socket server running ``serve_forever`` in its own thread,
+    the socket servers can be given a reactor with the ``reactor`` argument,
+    after which calling ``start`` on the socket server will register its
+    server with the reactor. The reactor waits for requests on all the
+    registered servers with :py:func:`select.epoll` (or :py:func:`select.select`
+    where epoll is not available) and lets each server handle them, so the
+    commands are exactly the same. Example:
+
+    .. code-block:: python
+
+        reactor = Reactor()
+        reactor.start()
+        pull_socket = DateDataPullSocket(name, codenames, reactor=reactor)
+        pull_socket.start()
+        push_socket = DataPushSocket(name, reactor=reactor)
+        push_socket.start()
+
+    .. note:: The requests are handled one at a time in the reactor thread,
+        unless the socket server uses the ``'pool'`` or ``'thread'`` serving
+        mode. In those modes, requests that arrive when ``max_in_flight`` is
+        reached are dropped, so that one busy server cannot hold up the
+        others.
+    """
+
+    def __init__(self, poll_interval=0.5):
+        """Initialize the reactor
+
+        Args:
+            poll_interval (float): The maximum time in seconds to wait for
+                requests before checking whether to stop, which is also the
+                maximum time it takes to stop the reactor
+        """
+        REACTLOG.info('Initialize with: {}'.format(call_spec_string()))
+        super(Reactor, self).__init__()
+        self.daemon = True
+        self._stop = False
+        self.poll_interval = poll_interval
+        # fileno -> server
+        self._servers = {}
+        self._lock = threading.Lock()
+        # Held while a request is handled, so unregister can wait for it
+        self._handle_lock = threading.RLock()
+        if hasattr(select, 'epoll'):
+            self._epoll = select.epoll()
+        else:
+            self._epoll = None
+        REACTLOG.debug('Initialized')
+
+    def register(self, server):
+        """Register a server, after which its requests will be served
+
+        Args:
+            server (SocketServer.BaseServer): The server to register
+        """
+        fileno = server.fileno()
+        # A server with a full worker pool must drop requests instead of
+        # blocking the reactor thread, and with that all the other servers
+        server.block_when_full = False
+        with self._lock:
+            if fileno in self._servers:
+                return
+            self._servers[fileno] = server
+            if self._epoll is not None:
+                self._epoll.register(fileno, select.EPOLLIN)
+        REACTLOG.info('Registered server on fileno {}'.format(fileno))
+
+    def unregister(self, server):
+        """Unregister a server, after which its requests will not be served.
+        If the reactor is handling a request when this method is called, it
+        waits for that to finish.
+
+        Args:
+            server (SocketServer.BaseServer): The server to unregister
+        """
+        fileno = server.fileno()
+        with self._lock:
+            if self._servers.pop(fileno, None) is None:
+                return
+            if self._epoll is not None:
+                self._epoll.unregister(fileno)
+        # Wait for a request that is being handled right now
+        with self._handle_lock:
+            pass
+        REACTLOG.info('Unregistered server on fileno {}'.format(fileno))
+
+    @property
+    def servers(self):
+        """Get a list of the registered servers"""
+        with self._lock:
+            return list(self._servers.values())
+
+    def _wait(self):
+        """Wait for requests and return the filenos that are ready"""
+        if self._epoll is not None:
+            try:
+                events = self._epoll.poll(self.poll_interval)
+            except IOError as error:
+                if error.errno == errno.EINTR:
+                    return []
+                raise
+            return [fileno for fileno, _ in events]
+
+        filenos = list(self._servers.keys())
+        if not filenos:
+            time.sleep(self.poll_interval)
+            return []
+        try:
+            readable, _, _ = select.select(filenos, [], [], self.poll_interval)
+        except select.error as error:
+            if error.args[0] == errno.EINTR:
+                return []
+            raise
+        return readable
+
+    def run(self):
+        """Serve requests until stopped"""
+        REACTLOG.info('Run')
+        while not self._stop:
+            for fileno in self._wait():
+                with self._handle_lock:
+                    server = self._servers.get(fileno)
+                    if server is None:
+                        # Unregistered since the wait
+                        continue
+                    # This reads the request and handles it in the same way
+                    # as serve_forever would
+                    # pylint: disable=protected-access
+                    server._handle_request_noblock()
+        REACTLOG.info('Run ended')
+
+    def stop(self):
+        """Stop the reactor"""
+        REACTLOG.debug('Stop requested')
+        self._stop = True
+        if self.is_alive():
+            self.join()
+        if self._epoll is not None:
+            self._epoll.close()
+        REACTLOG.info('Stopped')
+
+
+def close_udp_server(server, reactor=None, running=True):
+    """Stop serving requests with server and close it
+
+    When this function returns, all requests in progress are done, all
+    worker threads are stopped and the socket is closed, so the data for the
+    server can safely be deleted.
+
+    Args:
+        server (SocketServer.UDPServer): The server to close
+        reactor (Reactor): The reactor the server is registered with, if any
+        running (bool): Whether ``serve_forever`` is running for the server
+            (ignored if ``reactor`` is given)
+    """
+    if reactor is not None:
+        reactor.unregister(server)
+    elif running:
+        server.shutdown()
+    server.server_close()
+
+
+class RingBuffer(object):
+    """Fixed size, NumPy backed, ring buffer of ``(time, x, y)`` rows used for
+    the point history of the pull sockets. Requires :py:mod:`numpy`.
+    """
+
+    def __init__(self, size):
+        """Initialize the buffer
+
+        Args:
+            size (int): The number of rows in the buffer
+        """
+        self.size = size
+        self._rows = numpy.zeros((size, 3))
+        # The number of rows written ever and the index of the next row
+        self._count = 0
+        self._next = 0
+
+    def __len__(self):
+        return min(self._count, self.size)
+
+    def append(self, row_time, x_value, y_value):
+        """Append a row, overwriting the oldest if the buffer is full
+
+        Raises:
+            ValueError: If the values cannot be converted to floats
+        """
+        self._rows[self._next] = (float(row_time), float(x_value),
+                                  float(y_value))
+        self._next = (self._next + 1) % self.size
+        self._count += 1
+
+    def last(self, number=None):
+        """Return the last number rows (all if None), oldest first
+
+        Returns:
+            numpy.ndarray: Array of ``(time, x, y)`` rows
+        """
+        length = len(self)
+        if number is None or number > length:
+            number = length
+        if number <= 0:
+            return self._rows[:0].copy()
+        indexes = numpy.arange(self._next - number, self._next) % self.size
+        return self._rows[indexes]
+
+    def since(self, since_time):
+        """Return the rows whose time is later than since_time, oldest first
+
+        Returns:
+            numpy.ndarray: Array of ``(time, x, y)`` rows
+        """
+        rows = self.last()
+        return rows[rows[:, 0] > since_time]
+
+
+class WindowedStats(object):
+    """Incrementally updated min, max, mean, standard deviation and count of
+    the values from the last ``window`` seconds
+
+    The sums are updated when values are added and removed and the min and
+    max are kept in monotonic queues, so neither adding a value nor getting
+    the statistics require a scan of the values in the window.
+    """
+
+    def __init__(self, window):
+        """Initialize the statistics
+
+        Args:
+            window (float): The length of the window in seconds
+        """
+        self.window = window
+        self._values = collections.deque()
+        # Monotonic queues of (time, value) for the min and max
+        self._min = collections.deque()
+        self._max = collections.deque()
+        self._sum = 0.0
+        self._sum_squares = 0.0
+
+    def add(self, value_time, value):
+        """Add a value
+
+        Raises:
+            ValueError: If value cannot be converted to a float
+        """
+        value = float(value)
+        self._values.append((value_time, value))
+        self._sum += value
+        self._sum_squares += value ** 2
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((value_time, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((value_time, value))
+        self.expire(value_time)
+
+    def expire(self, now):
+        """Remove the values older than ``window`` seconds before now"""
+        limit = now - self.window
+        while self._values and self._values[0][0] <= limit:
+            _, value = self._values.popleft()
+            self._sum -= value
+            self._sum_squares -= value ** 2
+        for extreme in [self._min, self._max]:
+            while extreme and extreme[0][0] <= limit:
+                extreme.popleft()
+
+    def stats(self, now=None):
+        """Return the statistics for the window ending at now
+
+        Args:
+            now (float): The end of the window. Defaults to the current time.
+
+        Returns:
+            dict: With the keys min, max, mean, std and count. All but count
+                are None for an empty window
+        """
+        self.expire(time.time() if now is None else now)
+        count = len(self._values)
+        if count == 0:
+            return {'min': None, 'max': None, 'mean': None, 'std': None,
+                    'count': 0}
+        mean = self._sum / count
+        # Rounding may make the variance slightly negative
+        variance = max(self._sum_squares / count - mean ** 2, 0.0)
+        return {'min': self._min[0][1], 'max': self._max[0][1], 'mean': mean,
+                'std': math.sqrt(variance), 'count': count}
+
+
+def encode_bin(entries):
+    """Encode points in the binary pull socket format
+
+    The format is a header followed by one entry per point, all in network
+    byte order:
+
+     * **Header** (:data:`.BIN_HEADER`): 2 bytes magic (:data:`.BIN_MAGIC`),
+       1 byte format version (:data:`.BIN_VERSION`), 1 byte reserved flags
+       and 2 bytes unsigned number of entries
+     * **Entry** (:data:`.BIN_ENTRY`): 2 bytes unsigned index of the codename
+       (in the order given by the ``codenames_json`` command), 1 byte status,
+       which is one of :data:`.BIN_OK`, :data:`.BIN_OLD_DATA` or
+       :data:`.BIN_NOT_NUMBER`, and the x and y values as float64. For the
+       two latter statuses x and y are NaN.
+
+    Args:
+        entries (list): List of ``(index, point)`` tuples, where point is an
+            ``(x, y)`` tuple or OLD_DATA
+
+    Returns:
+        str: The encoded data
+    """
+    parts = [BIN_HEADER.pack(BIN_MAGIC, BIN_VERSION, 0, len(entries))]
+    for index, point in entries:
+        if point == OLD_DATA:
+            parts.append(BIN_ENTRY.pack(index, BIN_OLD_DATA, NAN, NAN))
+            continue
+        try:
+            parts.append(BIN_ENTRY.pack(index, BIN_OK, float(point[0]),
+                                        float(point[1])))
+        except (TypeError, ValueError, struct.error):
+            parts.append(BIN_ENTRY.pack(index, BIN_NOT_NUMBER, NAN, NAN))
+    return ''.join(parts)
+
+
+def decode_bin(data, codenames=None):
+    """Decode the reply to a ``bin`` or ``codename#bin`` pull socket command
+
+    Args:
+        data (str): The reply
+        codenames (list): The codenames of the socket server (as returned by
+            the ``codenames_json`` command). If given, the points are
+            returned in a dict with codenames as keys.
+
+    Returns:
+        list or dict: List of ``(index, point)`` tuples, or dict of
+            ``codename: point`` if codenames is given. ``point`` is an
+            ``(x, y)`` tuple, :data:`.OLD_DATA` for data that has timed out or
+            None for values that are not numbers.
+
+    Raises:
+        ValueError: If the data is not in the binary format
+    """
+    try:
+        magic, version, _, count = BIN_HEADER.unpack_from(data)
+    except struct.error:
+        raise ValueError('Data too short for the binary format header')
+    if magic != BIN_MAGIC or version != BIN_VERSION:
+        message = 'Unknown binary format magic \'{}\' or version {}'\
+            .format(magic, version)
+        raise ValueError(message)
+    if len(data) != BIN_HEADER.size + count * BIN_ENTRY.size:
+        raise ValueError('Data length does not match the number of entries')
+
+    points = []
+    for number in range(count):
+        index, status, x_value, y_value = BIN_ENTRY.unpack_from(
+            data, BIN_HEADER.size + number * BIN_ENTRY.size
+        )
+        if status == BIN_OK:
+            point = (x_value, y_value)
+        elif status == BIN_OLD_DATA:
+            point = OLD_DATA
+        else:
+            point = None
+        points.append((index, point))
+
+    if codenames is None:
+        return points
+    return {codenames[index]: point for index, point in points}
+
+
+def cancel_subscription(port, address):
+    """Remove the subscription of address from the pull socket on port, if
+    there is one, and cancel its timer. Must be called with the lock held.
+
+    Args:
+        port (int): The port of the pull socket
+        address (tuple): The address of the subscriber
+    """
+    subscriber = DATA[port]['subscribers'].pop(address, None)
+    if subscriber is not None and subscriber['timer'] is not None:
+        subscriber['timer'].cancel()
+
+
+def expire_subscriptions(port, now):
+    """Remove the subscriptions whose lease has run out from the pull socket
+    on port. Must be called with the lock held.
+
+    Args:
+        port (int): The port of the pull socket
+        now (float): The current unixtime
+    """
+    for address, subscriber in list(DATA[port]['subscribers'].items()):
+        if subscriber['expires'] < now:
+            PULLUHLOG.debug('Subscription for {} expired'.format(address))
+            cancel_subscription(port, address)
+
+
 PULLUHLOG = logging.getLogger(__name__ + '.PullUDPHandler')
 PULLUHLOG.addHandler(logging.NullHandler())
 
@@ -102,6 +792,52 @@ class PullUDPHandler(SocketServer.BaseRequestHandler):
          * **codenames_json** (*str*): Return a list of the codenames contained
            in a :py:mod:`json` string
          * **name** (*str*): Return the name of the socket server
+         * **bin** (*str*): Return all values in the compact binary format
+           described in :func:`.encode_bin`, in the same order as ``raw``.
+           Decode with :func:`.decode_bin`.
+         * **codename#bin** (*str*): Return the value for ``codename`` in the
+           binary format
+         * **codename#history:N** (*str*): Return the last ``N`` points for
+           ``codename`` (oldest first) as a list of points contained in a
+           :py:mod:`json` string. Only available if the socket was
+           instantiated with a ``history_size``.
+         * **codename#since:T** (*str*): Return the points for ``codename``
+           that was set later than the unix time ``T``, in the same format
+           as ``codename#history:N``
+         * **history_json_wn** or **history_json_wn:N** (*str*): Return the
+           entire history, or the last ``N`` points, for all codenames as a
+           :py:class:`dict` of codename to list of points contained in a
+           :py:mod:`json` string
+         * **codename#stats:W** (*str*): Return the min, max, mean, std and
+           count of the y values for ``codename`` from the last ``W``
+           seconds as a :py:class:`dict` contained in a :py:mod:`json`
+           string. ``W`` must be one of the ``stats_windows`` the socket was
+           instantiated with.
+         * **stats_json_wn:W** (*str*): Return the statistics for all
+           codenames as a :py:class:`dict` of codename to statistics
+           contained in a :py:mod:`json` string
+         * **changed_since:S** (*str*): Return only the points that has been
+           set after the sequence number ``S`` as a :py:mod:`json` string of
+           a :py:class:`dict` on the form ``{"sequence": S_new, "data":
+           {codename: [x, y]}}``, where ``S_new`` is the sequence number to
+           use in the next request. Use ``changed_since:-1`` to get all
+           points. Points that has timed out after they were set are not
+           reported again. The sequence numbers start over when the server
+           is restarted, so an ``S`` above the current sequence number
+           also returns all points.
+         * **subscribe#codename1,codename2** or
+           **subscribe#codename1,codename2:T** (*str*): Subscribe the sender
+           to updates of the codenames. When one of the points is set, the
+           server sends ``PUSH#`` followed by a :py:mod:`json` encoded
+           :py:class:`dict` of codename to point to the sender, but at most
+           once per ``T`` seconds (default 0). Updates within ``T`` seconds
+           of the last push are sent together, ``T`` seconds after the last
+           push. Replies
+           ``ACK#L``, where ``L`` is the lease in seconds after which the
+           subscription expires unless it is renewed by subscribing again.
+           Replies ``ERROR#...`` if the socket has the maximum number of
+           subscribers.
+         * **unsubscribe#** (*str*): Cancel the subscription of the sender
         """
         command = self.request[0]
         # pylint: disable=attribute-defined-outside-init
@@ -110,16 +846,81 @@ class PullUDPHandler(SocketServer.BaseRequestHandler):
         PULLUHLOG.debug('Request \'{}\' received from {} on port {}'
                         .format(command, self.client_address, self.port))
 
-        if command.count('#') == 1:
-            data = self._single_value(command)
-        else:
-            # The name command if also handled here
-            data = self._all_values(command)
-
+        tag, command = split_tag(command)
+        data = tag + self._reply(command)
         sock.sendto(data, self.client_address)
         PULLUHLOG.debug('Sent back \'{}\' to {}'
                         .format(data, self.client_address))
 
+    def _reply(self, command):
+        """Return the reply for command
+
+        Args:
+            command (str): Complete command
+
+        Returns:
+            str: The data as a string (or an error) to be sent back
+        """
+        # The lock makes sure that the response is formed from a consistent
+        # set of points, also when requests are served in several threads
+        with DATA[self.port]['lock']:
+            if 'sync' in DATA[self.port]:
+                DATA[self.port]['sync']()
+            if command.startswith('subscribe#'):
+                data = self._subscribe(command)
+            elif command == 'unsubscribe#':
+                cancel_subscription(self.port, self.client_address)
+                data = PUSH_ACK
+            elif command.count('#') == 1:
+                data = self._single_value(command)
+            elif command in CACHED_COMMANDS:
+                data = self._cached_all_values(command)
+            else:
+                # The name command if also handled here
+                data = self._all_values(command)
+        return data
+
+    def _subscribe(self, command):
+        """Subscribe the client to updates
+
+        Args:
+            command (str): Complete command
+
+        Returns:
+            str: The data as a string (or an error) to be sent back
+        """
+        arguments, _, min_interval = command.split('#')[1].partition(':')
+        codenames = set(arguments.split(','))
+        if not codenames.issubset(DATA[self.port]['codenames']):
+            return UNKNOWN_COMMAND
+        try:
+            min_interval = float(min_interval) if min_interval else 0.0
+        except ValueError:
+            return UNKNOWN_COMMAND
+
+        # The expired subscriptions do not count towards the maximum
+        expire_subscriptions(self.port, time.time())
+        subscribers = DATA[self.port]['subscribers']
+        if self.client_address not in subscribers and \
+                len(subscribers) >= DATA[self.port]['max_subscribers']:
+            PULLUHLOG.warning('Subscription from {} refused, maximum number '
+                              'of subscribers reached'
+                              .format(self.client_address))
+            return '{}#Maximum number of subscribers reached'.format(
+                PUSH_ERROR
+            )
+        lease = DATA[self.port]['subscription_lease']
+        cancel_subscription(self.port, self.client_address)
+        # The timer sends the pending updates when min_interval has passed
+        subscribers[self.client_address] = {
+            'codenames': codenames, 'min_interval': min_interval,
+            'expires': time.time() + lease, 'last_sent': 0.0,
+            'pending': set(), 'timer': None,
+        }
+        PULLUHLOG.debug('{} subscribed to {}'.format(self.client_address,
+                                                    codenames))
+        return '{}#{}'.format(PUSH_ACK, lease)
+
     def _single_value(self, command):
         """Return a string for a single point
 
@@ -131,6 +932,8 @@ class PullUDPHandler(SocketServer.BaseRequestHandler):
         """
         PULLUHLOG.debug('Parsing single value command: {}'.format(command))
         name, command = command.split('#')
+        # Commands with an argument, e.g. history:10
+        command, _, argument = command.partition(':')
         # Return as raw string
         if command == 'raw' and name in DATA[self.port]['data']:
             if self._old_data(name):
@@ -143,12 +946,132 @@ class PullUDPHandler(SocketServer.BaseRequestHandler):
                 out = json.dumps(OLD_DATA)
             else:
                 out = json.dumps(DATA[self.port]['data'][name])
+        # Return the binary format
+        elif command == 'bin' and name in DATA[self.port]['data']:
+            index = DATA[self.port]['codenames'].index(name)
+            out = encode_bin([self._bin_entry(index, name)])
+        # Return part of the history
+        elif command in ['history', 'since'] and \
+                name in DATA[self.port].get('history', {}):
+            out = self._history(name, command, argument)
+        # Return the windowed statistics
+        elif command == 'stats' and name in DATA[self.port].get('stats', {}):
+            window_stats = self._window_stats(name, argument)
+            if window_stats is None:
+                out = UNKNOWN_COMMAND
+            else:
+                out = json.dumps(window_stats)
         # The command is unknown
         else:
             out = UNKNOWN_COMMAND
 
         return out
 
+    def _history(self, codename, command, argument):
+        """Return the history for codename as json
+
+        Args:
+            codename (str): The codename
+            command (str): ``'history'`` or ``'since'``
+            argument (str): The number of points or the unix time
+
+        Returns:
+            str: List of ``[x, y]`` points as json or UNKNOWN_COMMAND on a bad
+                argument
+        """
+        ring_buffer = DATA[self.port]['history'][codename]
+        try:
+            if command == 'history':
+                rows = ring_buffer.last(int(argument))
+            else:
+                rows = ring_buffer.since(float(argument))
+        except ValueError:
+            return UNKNOWN_COMMAND
+        return json.dumps(rows[:, 1:].tolist())
+
+    def _window_stats(self, codename, argument):
+        """Return the statistics for codename
+
+        Args:
+            codename (str): The codename
+            argument (str): The window in seconds
+
+        Returns:
+            dict: The statistics or None if there are no statistics for that
+                window
+        """
+        try:
+            window = float(argument)
+        except ValueError:
+            return None
+        window_stats = DATA[self.port]['stats'][codename].get(window)
+        if window_stats is None:
+            return None
+        return window_stats.stats()
+
+    def _bin_entry(self, index, codename):
+        """Return the (index, point) entry for codename for
+        :func:`.encode_bin`
+
+        Args:
+            index (int): The index of codename in the codenames
+            codename (str): The codename
+
+        Returns:
+            tuple: ``(index, point)`` where point is OLD_DATA if it has timed
+                out
+        """
+        if self._old_data(codename):
+            return index, OLD_DATA
+        return index, DATA[self.port]['data'][codename]
+
+    def _cached_all_values(self, command):
+        """Return the response for an all-values command from the response
+        cache if it is still valid, otherwise form it and cache it
+
+        A cached response is valid as long as no points have been set since
+        it was formed (checked with the sequence number, which is bumped by
+        ``set_point``) and none of the points in it have timed out since.
+
+        Args:
+            command (str): Complete command, one of :data:`.CACHED_COMMANDS`
+
+        Returns:
+            str: The data as a string to be sent back
+        """
+        port_data = DATA[self.port]
+        # NOTE: The sequence number must be read before the data, so that a
+        # point set while forming the response makes the entry stale
+        sequence = port_data['sequence']
+        cached = port_data['cache'].get(command)
+        if cached is not None and cached[0] == sequence and \
+                time.time() <= cached[1]:
+            port_data['cache_hits'] += 1
+            return cached[2]
+
+        port_data['cache_misses'] += 1
+        expires = self._cache_expiry()
+        out = self._all_values(command)
+        port_data['cache'][command] = (sequence, expires, out)
+        return out
+
+    def _cache_expiry(self):
+        """Return the time at which the first of the currently valid points
+        times out, or infinity if none of them will
+
+        Returns:
+            float: The expiry time as a unix timestamp
+        """
+        expires = float('inf')
+        now = time.time()
+        for codename in DATA[self.port]['codenames']:
+            timeout_time = self._timeout_time(codename)
+            # Points that have already timed out stay that way until the next
+            # set_point, which invalidates the cache anyway
+            if timeout_time is not None and timeout_time >= now:
+                expires = min(expires, timeout_time)
+        return expires
+
     # pylint: disable=too-many-branches
     def _all_values(self, command):
         """Return a string for all points or names
@@ -200,6 +1123,53 @@ class PullUDPHandler(SocketServer.BaseRequestHandler):
                 if self._old_data(codename):
                     datacopy[codename] = OLD_DATA
             out = json.dumps(datacopy)
+        # Return all measurements in the binary format
+        elif command == 'bin':
+            entries = [self._bin_entry(index, codename) for index, codename
+                       in enumerate(DATA[self.port]['codenames'])]
+            out = encode_bin(entries)
+        # Return the history for all codenames
+        elif command.partition(':')[0] == 'history_json_wn' and \
+                'history' in DATA[self.port]:
+            argument = command.partition(':')[2]
+            try:
+                number = int(argument) if argument else None
+            except ValueError:
+                return UNKNOWN_COMMAND
+            history = {}
+            for codename, ring_buffer in DATA[self.port]['history'].items():
+                history[codename] = ring_buffer.last(number)[:, 1:].tolist()
+            out = json.dumps(history)
+        # Return the windowed statistics for all codenames
+        elif command.partition(':')[0] == 'stats_json_wn' and \
+                'stats' in DATA[self.port]:
+            argument = command.partition(':')[2]
+            all_stats = {}
+            for codename in DATA[self.port]['codenames']:
+                window_stats = self._window_stats(codename, argument)
+                if window_stats is None:
+                    return UNKNOWN_COMMAND
+                all_stats[codename] = window_stats
+            out = json.dumps(all_stats)
+        # Return the points that has changed since a sequence number
+        elif command.partition(':')[0] == 'changed_since':
+            try:
+                since = int(command.partition(':')[2])
+            except ValueError:
+                return UNKNOWN_COMMAND
+            # A since above the current sequence number is from before a
+            # restart of the server, so the client gets all the points
+            if since > DATA[self.port]['sequence']:
+                since = -1
+            changed = {}
+            for codename, sequence in DATA[self.port]['sequences'].items():
+                if sequence > since:
+                    if self._old_data(codename):
+                        changed[codename] = OLD_DATA
+                    else:
+                        changed[codename] = DATA[self.port]['data'][codename]
+            out = json.dumps({'sequence': DATA[self.port]['sequence'],
+                              'data': changed})
         # Return all codesnames in a raw string
         elif command == 'codenames_raw':
             out = ','.join(DATA[self.port]['codenames'])
@@ -226,21 +1196,35 @@ class PullUDPHandler(SocketServer.BaseRequestHandler):
             bool: Whether the data is too old or not
         """
         PULLUHLOG.debug('Check if data for \'{}\' is too old'.format(codename))
-        now = time.time()
+        timeout_time = self._timeout_time(codename)
+        if timeout_time is None:
+            return False
+        return time.time() > timeout_time
+
+    def _timeout_time(self, codename):
+        """Return the time at which the data for codename times out
+
+        Args:
+            codename (str): The codename whose timeout time should be returned
+
+        Returns:
+            float: The timeout time as a unix timestamp or None if the codename
+                has no timeout
+        """
         if DATA[self.port]['type'] == 'date':
             timeout = DATA[self.port]['timeouts'].get(codename)
             if timeout is None:
-                out = False
+                out = None
             else:
                 point_time = DATA[self.port]['data'][codename][0]
-                out = now - point_time > timeout
+                out = point_time + timeout
         elif DATA[self.port]['type'] == 'data':
             timeout = DATA[self.port]['timeouts'].get(codename)
             if timeout is None:
-                out = False
+                out = None
             else:
                 timestamp = DATA[self.port]['timestamps'][codename]
-                out = now - timestamp > timeout
+                out = timestamp + timeout
         else:
             message = 'Checking for timeout is not yet implemented for type '\
                 '\'{}\''.format(DATA[self.port]['type'])
@@ -250,6 +1234,530 @@ class PullUDPHandler(SocketServer.BaseRequestHandler):
         return out
 
 
+STREAMLOG = logging.getLogger(__name__ + '.stream')
+STREAMLOG.addHandler(logging.NullHandler())
+
+
+def send_frame(sock, payload, flags=0):
+    """Send payload as a frame on a stream socket
+
+    A frame is a :data:`.STREAM_HEADER` with flags and the length of the
+    payload, followed by the payload. If the :data:`.STREAM_ZLIB` flag is
+    set, the payload is compressed with :py:mod:`zlib`.
+
+    Args:
+        sock (socket.socket): The connected stream socket
+        payload (str): The payload
+        flags (int): The flags, e.g. :data:`.STREAM_ZLIB` or
+            :data:`.STREAM_ACCEPT_ZLIB`
+    """
+    if flags & STREAM_ZLIB:
+        payload = zlib.compress(payload)
+    sock.sendall(STREAM_HEADER.pack(flags, len(payload)) + payload)
+
+
+def _recv_exactly(sock, size):
+    """Receive exactly size bytes from sock, or None if it is closed"""
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(min(size, 65536))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return ''.join(chunks)
+
+
+def recv_frame(sock):
+    """Receive a frame from a stream socket, see :func:`.send_frame`
+
+    Returns:
+        tuple: ``(flags, payload)`` with the payload decompressed, or None if
+            the connection was closed
+
+    Raises:
+        ValueError: If the frame is larger than :data:`.STREAM_MAX_FRAME` or
+            cannot be decompressed
+    """
+    header = _recv_exactly(sock, STREAM_HEADER.size)
+    if header is None:
+        return None
+    flags, length = STREAM_HEADER.unpack(header)
+    if length > STREAM_MAX_FRAME:
+        raise ValueError('Frame of {} bytes is too large'.format(length))
+    payload = _recv_exactly(sock, length)
+    if payload is None:
+        return None
+    if flags & STREAM_ZLIB:
+        try:
+            payload = zlib.decompress(payload)
+        except zlib.error as exception:
+            raise ValueError('Bad compressed frame: {}'.format(exception))
+    return flags, payload
+
+
+class StreamPullHandler(PullUDPHandler):
+    """Handles the requests on the stream (TCP or Unix domain socket)
+    companion endpoint of a pull socket
+
+    The commands are the same as for the :class:`.PullUDPHandler`, except
+    for the subscription commands. The :class:`.LiveSocket` has no stream
+    endpoint, since its commands differ. Each request and reply is a frame,
+    see :func:`.send_frame`. A client may send several requests without
+    waiting for the replies (pipelining) and gets the replies in the same
+    order. If the request has the :data:`.STREAM_ACCEPT_ZLIB` flag set,
+    replies larger than :data:`.STREAM_COMPRESS_THRESHOLD` are compressed.
+    """
+
+    def handle(self):
+        """Answer the requests on the connection until it is closed"""
+        # pylint: disable=attribute-defined-outside-init
+        self.port = self.server.data_port
+        STREAMLOG.debug('Connection from {} for port {}'
+                        .format(self.client_address, self.port))
+        while True:
+            try:
+                frame = recv_frame(self.request)
+            except ValueError as exception:
+                STREAMLOG.warning('Closing connection from {}: {}'
+                                  .format(self.client_address, exception))
+                return
+            except socket.error:
+                return
+            if frame is None:
+                return
+            flags, command = frame
+            tag, command = split_tag(command)
+            try:
+                reply = tag + self._reply(command)
+            except KeyError:
+                # The pull socket has been stopped
+                return
+            reply_flags = 0
+            if flags & STREAM_ACCEPT_ZLIB and \
+                    len(reply) > STREAM_COMPRESS_THRESHOLD:
+                reply_flags = STREAM_ZLIB
+            try:
+                send_frame(self.request, reply, reply_flags)
+            except socket.error:
+                return
+
+    def _reply(self, command):
+        """Return the reply for command, see :meth:`.PullUDPHandler._reply`.
+        Subscriptions are pushed over UDP and are therefore not available.
+        """
+        if command.startswith('subscribe#') or command == 'unsubscribe#':
+            return UNKNOWN_COMMAND
+        return PullUDPHandler._reply(self, command)
+
+
+class StreamPullServer(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+    """Threading TCP server for the stream companion endpoint of a pull
+    socket, see :class:`.StreamPullHandler`
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, server_address, data_port):
+        """Initialize the server
+
+        Args:
+            server_address (tuple): The (host, port) address to bind to
+            data_port (int): The port of the pull socket, i.e. the key in
+                :data:`.DATA`
+        """
+        self.data_port = data_port
+        SocketServer.TCPServer.__init__(self, server_address,
+                                        StreamPullHandler)
+
+
+class UnixStreamPullServer(SocketServer.ThreadingMixIn,
+                           SocketServer.UnixStreamServer):
+    """Threading Unix domain socket server for the stream companion endpoint
+    of a pull socket, see :class:`.StreamPullHandler`
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path, data_port):
+        """Initialize the server
+
+        Args:
+            path (str): The path of the socket file. An existing socket file,
+                e.g. left behind by a process that died, is removed.
+            data_port (int): The port of the pull socket, i.e. the key in
+                :data:`.DATA`
+
+        Raises:
+            ValueError: If something that is not a socket exists at path
+        """
+        self.data_port = data_port
+        if os.path.lexists(path):
+            if not stat.S_ISSOCK(os.lstat(path).st_mode):
+                message = 'The path \'{}\' exists and is not a socket'\
+                    .format(path)
+                STREAMLOG.error(message)
+                raise ValueError(message)
+            os.remove(path)
+        SocketServer.UnixStreamServer.__init__(self, path, StreamPullHandler)
+
+    def server_close(self):
+        """Close the server and remove the socket file, unless something that
+        is not a socket has replaced it
+        """
+        SocketServer.UnixStreamServer.server_close(self)
+        path = self.server_address
+        if not os.path.lexists(path):
+            return
+        if not stat.S_ISSOCK(os.lstat(path).st_mode):
+            STREAMLOG.warning('The path \'{}\' is no longer a socket, it is '
+                              'not removed'.format(path))
+            return
+        os.remove(path)
+
+
+SDSLOG = logging.getLogger(__name__ + '.SharedDataStore')
+SDSLOG.addHandler(logging.NullHandler())
+
+
+class SharedDataStore(object):
+    """A store of points in a memory mapped file, so that the points can be
+    set in one process, e.g. a driver loop, and served by pull sockets in
+    other processes
+
+    The file holds a fixed layout table with a slot of float64 values
+    ``(x, y, timestamp)`` per codename. Each slot is guarded by a sequence
+    lock (seqlock): the writer makes the slot sequence number odd, writes the
+    values and makes it even again, and a reader retries if the sequence
+    number was odd or changed while it read. Since Python issues no memory
+    barriers, a CPU with a weak memory ordering, such as the ARM of a
+    Raspberry Pi, may make the writes visible to other processes in another
+    order, so the writer also stores a CRC32 checksum of the sequence number
+    and the values in the slot. The reader copies the slot and retries if
+    the checksum does not match the copy. Reads therefore never take a lock
+    and never see a torn point. There must only be **one** writer process
+    per store. A reader gives up after :data:`.STORE_READ_RETRIES` attempts,
+    e.g. if the writer died while writing, and the pull socket then keeps
+    serving the last point it read, subject to the timeouts.
+
+    In the driver process:
+
+    .. code-block:: python
+
+        store = SharedDataStore('/dev/shm/pressures', ['pressure'],
+                                create=True)
+        store.set_point_now('pressure', 1.2e-7)
+
+    In the server process(es), see the ``shared_store`` argument of
+    :meth:`.CommonDataPullSocket.__init__`:
+
+    .. code-block:: python
+
+        store = SharedDataStore('/dev/shm/pressures')
+        socket = DateDataPullSocket(name, ['pressure'], shared_store=store)
+    """
+
+    def __init__(self, path, codenames=None, create=False):
+        """Open or create the store
+
+        Args:
+            path (str): The path of the file. A file in ``/dev/shm`` is not
+                backed by a disk.
+            codenames (list): The codenames. Required when creating the store
+                and checked against the store otherwise, if given.
+            create (bool): Whether to create (or overwrite) the store
+
+        Raises:
+            ValueError: If the codenames are missing or does not match the
+                store or the file is not a store
+        """
+        SDSLOG.info('Initialize with: {}'.format(call_spec_string()))
+        self.path = path
+        if create:
+            if not codenames:
+                message = 'The codenames are required to create a store'
+                SDSLOG.error(message)
+                raise ValueError(message)
+            self._create(path, codenames)
+
+        self._file = open(path, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, version, count, names_size = \
+            STORE_HEADER.unpack_from(self._map, 0)
+        if magic != STORE_MAGIC or version != STORE_VERSION:
+            self.close()
+            message = 'The file \'{}\' is not a data store'.format(path)
+            SDSLOG.error(message)
+            raise ValueError(message)
+        names_start = STORE_HEADER.size
+        self.codenames = json.loads(
+            self._map[names_start:names_start + names_size]
+        )
+        if codenames is not None and list(codenames) != self.codenames:
+            self.close()
+            message = 'The codenames {} does not match those of the store {}'\
+                .format(codenames, self.codenames)
+            SDSLOG.error(message)
+            raise ValueError(message)
+        slots_start = self._slots_start(names_size)
+        self._offsets = {
+            codename: slots_start + index * STORE_SLOT.size
+            for index, codename in enumerate(self.codenames)
+        }
+        assert count == len(self.codenames)
+
+    @staticmethod
+    def _slots_start(names_size):
+        """Return the offset of the first slot, 8 byte aligned"""
+        start = STORE_HEADER.size + names_size
+        return start + (-start) % 8
+
+    def _create(self, path, codenames):
+        """Write an empty store to path"""
+        for codename in codenames:
+            for char in BAD_CHARS:
+                if char in codename:
+                    message = 'The character \'{}\' is not allowed in the '\
+                        'codenames'.format(char)
+                    SDSLOG.error(message)
+                    raise ValueError(message)
+        names = json.dumps(list(codenames))
+        slots_start = self._slots_start(len(names))
+        size = slots_start + len(codenames) * STORE_SLOT.size
+        content = bytearray(size)
+        STORE_HEADER.pack_into(content, 0, STORE_MAGIC, STORE_VERSION,
+                               len(codenames), len(names))
+        content[STORE_HEADER.size:STORE_HEADER.size + len(names)] = names
+        for index in range(len(codenames)):
+            STORE_SLOT.pack_into(content, slots_start + index * STORE_SLOT.size,
+                                 0, NAN, NAN, NAN,
+                                 self._checksum(0, NAN, NAN, NAN))
+        # Write to a temporary file and rename, so that a reader never opens
+        # a partially written store
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'wb') as file_:
+            file_.write(content)
+        os.rename(temporary_path, path)
+
+    @staticmethod
+    def _checksum(sequence, x_value, y_value, timestamp):
+        """Return the checksum of a slot"""
+        return zlib.crc32(STORE_SEQUENCE.pack(sequence) + STORE_VALUES.pack(
+            x_value, y_value, timestamp)) & 0xffffffff
+
+    def set_point(self, codename, point, timestamp=None):
+        """Set the point for codename
+
+        Args:
+            codename (str): The codename
+            point (iterable): The point as (x, y) floats
+            timestamp (float): A unix timestamp that indicates when the point
+                was measured. Defaults to now.
+
+        Raises:
+            KeyError: On an unknown codename
+            ValueError: If the values cannot be converted to floats
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        x_value, y_value = (float(value) for value in point)
+        offset = self._offsets[codename]
+        sequence = STORE_SEQUENCE.unpack_from(self._map, offset)[0]
+        # An odd sequence number here means that a previous writer died while
+        # writing
+        sequence += sequence % 2
+        # Odd while writing
+        STORE_SEQUENCE.pack_into(self._map, offset, sequence + 1)
+        STORE_VALUES.pack_into(self._map, offset + STORE_SEQUENCE.size,
+                               x_value, y_value, timestamp)
+        STORE_CHECKSUM.pack_into(
+            self._map, offset + STORE_SEQUENCE.size + STORE_VALUES.size,
+            self._checksum(sequence + 2, x_value, y_value, timestamp)
+        )
+        STORE_SEQUENCE.pack_into(self._map, offset, sequence + 2)
+
+    def set_point_now(self, codename, value):
+        """Set the y-value for codename using the current time as x"""
+        now = time.time()
+        self.set_point(codename, (now, value), timestamp=now)
+
+    def get(self, codename):
+        """Return the slot for codename
+
+        Returns:
+            tuple: ``(sequence, x, y, timestamp)``. The sequence is 0 if the
+                point has never been set. None if no consistent read could be
+                made in :data:`.STORE_READ_RETRIES` attempts.
+        """
+        offset = self._offsets[codename]
+        for _ in range(STORE_READ_RETRIES):
+            sequence = STORE_SEQUENCE.unpack_from(self._map, offset)[0]
+            if sequence % 2 == 1:
+                # A write is in progress, let other threads run
+                time.sleep(0)
+                continue
+            # Check a copy of the slot, which cannot change while checked
+            slot = STORE_SLOT.unpack(
+                self._map[offset:offset + STORE_SLOT.size]
+            )
+            if slot[0] != sequence or self._checksum(*slot[:4]) != slot[4]:
+                continue
+            if STORE_SEQUENCE.unpack_from(self._map, offset)[0] == sequence:
+                return slot[:4]
+        SDSLOG.warning('No consistent read of \'{}\' in {} attempts, the '
+                       'writer may have died while writing'
+                       .format(codename, STORE_READ_RETRIES))
+        return None
+
+    def close(self):
+        """Close the store"""
+        self._map.close()
+        self._file.close()
+
+
+SNAPLOG = logging.getLogger(__name__ + '.SocketSnapshot')
+SNAPLOG.addHandler(logging.NullHandler())
+
+
+class SocketSnapshot(object):
+    """A snapshot of the state of a socket server in a memory mapped file, to
+    restore it from when the socket server is restarted
+
+    The file holds two buffers. A new snapshot is written, with a CRC32
+    checksum, to the buffer that is not active and then that buffer is made
+    the active one, so that a process that dies while writing leaves the
+    previous snapshot intact.
+    """
+
+    def __init__(self, path, capacity=65536):
+        """Open or create the snapshot file
+
+        Args:
+            path (str): The path of the file
+            capacity (int): The maximum size in bytes of the json encoded
+                state
+        """
+        SNAPLOG.info('Initialize with: {}'.format(call_spec_string()))
+        self.path = path
+        self.capacity = capacity
+        self._buffer_size = SNAPSHOT_BUFFER_HEADER.size + capacity
+        size = SNAPSHOT_HEADER.size + 2 * self._buffer_size
+        if not os.path.exists(path) or os.path.getsize(path) != size:
+            content = bytearray(size)
+            SNAPSHOT_HEADER.pack_into(content, 0, SNAPSHOT_MAGIC,
+                                      SNAPSHOT_VERSION, 0)
+            with open(path, 'wb') as file_:
+                file_.write(content)
+        self._file = open(path, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._last_payload = None
+
+    def _buffer_offset(self, index):
+        """Return the offset of buffer index"""
+        return SNAPSHOT_HEADER.size + index * self._buffer_size
+
+    def read(self):
+        """Return the state of the newest valid snapshot
+
+        Returns:
+            dict: The state or None if there is no valid snapshot
+        """
+        magic, version, active = SNAPSHOT_HEADER.unpack_from(self._map, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            SNAPLOG.warning('The file \'{}\' is not a snapshot'
+                            .format(self.path))
+            return None
+        # Fall back on the other buffer, if the active one is corrupted
+        for index in [active, 1 - active]:
+            offset = self._buffer_offset(index)
+            length, checksum = SNAPSHOT_BUFFER_HEADER.unpack_from(self._map,
+                                                                  offset)
+            start = offset + SNAPSHOT_BUFFER_HEADER.size
+            payload = self._map[start:start + min(length, self.capacity)]
+            if length == 0 or zlib.crc32(payload) & 0xffffffff != checksum:
+                continue
+            try:
+                return json.loads(payload)
+            except ValueError:
+                continue
+        return None
+
+    def write(self, state):
+        """Write a snapshot of state, if it has changed since the last write
+
+        Args:
+            state (dict): The json serializable state
+
+        Raises:
+            ValueError: If the json encoded state is larger than the capacity
+        """
+        payload = json.dumps(state)
+        if payload == self._last_payload:
+            return
+        if len(payload) > self.capacity:
+            message = 'The snapshot of {} bytes is larger than the capacity '\
+                'of {} bytes'.format(len(payload), self.capacity)
+            SNAPLOG.error(message)
+            raise ValueError(message)
+        active = SNAPSHOT_HEADER.unpack_from(self._map, 0)[2]
+        index = 1 - active
+        offset = self._buffer_offset(index)
+        SNAPSHOT_BUFFER_HEADER.pack_into(self._map, offset, len(payload),
+                                         zlib.crc32(payload) & 0xffffffff)
+        start = offset + SNAPSHOT_BUFFER_HEADER.size
+        self._map[start:start + len(payload)] = payload
+        SNAPSHOT_HEADER.pack_into(self._map, 0, SNAPSHOT_MAGIC,
+                                  SNAPSHOT_VERSION, index)
+        self._last_payload = payload
+
+    def close(self):
+        """Flush and close the snapshot file"""
+        self._map.flush()
+        self._map.close()
+        self._file.close()
+
+
+class SnapshotThread(threading.Thread):
+    """Writes a snapshot of a socket server periodically"""
+
+    def __init__(self, snapshot, state_function, interval=1.0):
+        """Initialize the thread
+
+        Args:
+            snapshot (SocketSnapshot): The snapshot to write to
+            state_function (callable): Callable that returns the state
+            interval (float): The time between snapshots in seconds
+        """
+        SNAPLOG.info('Initialize with: {}'.format(call_spec_string()))
+        super(SnapshotThread, self).__init__()
+        self.daemon = True
+        self.snapshot = snapshot
+        self.state_function = state_function
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        """Write the snapshots"""
+        while not self._stop_event.wait(self.interval):
+            self._write()
+
+    def _write(self):
+        """Write a snapshot, logging rather than raising on failure"""
+        try:
+            self.snapshot.write(self.state_function())
+        except (ValueError, TypeError) as exception:
+            SNAPLOG.error('Snapshot failed: {}'.format(exception))
+
+    def stop(self):
+        """Stop the thread, write a last snapshot and close the file"""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+        self._write()
+        self.snapshot.close()
+
+
 CDPULLSLOG = logging.getLogger(__name__ + '.CommonDataPullSocket')
 CDPULLSLOG.addHandler(logging.NullHandler())
 
@@ -267,7 +1775,13 @@ class CommonDataPullSocket(threading.Thread):
 
     # pylint: disable=too-many-branches
     def __init__(self, name, codenames, port, default_x, default_y, timeouts,
-                 init_timeouts=True, handler_class=PullUDPHandler):
+                 init_timeouts=True, handler_class=PullUDPHandler,
+                 serving_mode='serial', workers=4, max_in_flight=32,
+                 reactor=None, history_size=None, stats_windows=None,
+                 subscription_lease=60.0, max_subscribers=32,
+                 multicast=None, multicast_interval=None, reuse_port=False,
+                 shared_store=None, snapshot_file=None, snapshot_interval=1.0,
+                 tcp_port=None, unix_socket=None):
         """For parameter description of ``name``, ``codenames``, ``port``,
         ``default_x``, ``default_y`` and ``timeouts`` see
         :meth:`.DataPullSocket.__init__` or
@@ -278,6 +1792,51 @@ class CommonDataPullSocket(threading.Thread):
                 the :data:`.DATA` module variable
             handler_class (Sub-class of SocketServer.BaseRequestHandler): The
                 UDP handler to use in the server
+            serving_mode (str): How requests are served, ``'serial'``,
+                ``'pool'`` or ``'thread'``. See :func:`.make_udp_server`
+            workers (int): The number of worker threads in ``'pool'`` mode
+            max_in_flight (int): The maximum number of requests in progress
+                in the ``'pool'`` and ``'thread'`` modes
+            reactor (Reactor): If given, the requests will be served by this
+                :class:`.Reactor` instead of in a thread of its own
+            history_size (int): If given, the last ``history_size`` points
+                for each codename are kept in a :class:`.RingBuffer` and can
+                be requested with the ``history`` commands, see
+                :meth:`.PullUDPHandler.handle`. Requires :py:mod:`numpy`.
+            stats_windows (list): List of window lengths in seconds. If
+                given, the min, max, mean, std and count of the y values in
+                each window are updated as the points are set and can be
+                requested with the ``stats`` commands, see
+                :meth:`.PullUDPHandler.handle`
+            subscription_lease (float): The number of seconds a subscription
+                lasts unless it is renewed, see the ``subscribe`` command in
+                :meth:`.PullUDPHandler.handle`
+            max_subscribers (int): The maximum number of subscribers
+            multicast (tuple): If given, the (group, port) of an IP multicast
+                group to which the updated points are also published, see
+                :class:`.MulticastPublisher`
+            multicast_interval (float): If given, the updates are published
+                coalesced once per interval seconds instead of when they are
+                set
+            reuse_port (bool): Whether to set ``SO_REUSEPORT`` on the socket,
+                so that several processes can serve the port, see
+                :func:`.make_udp_server`
+            shared_store (SharedDataStore): If given, the points are read from
+                this :class:`.SharedDataStore`, where they are set by another
+                process, before each request is answered
+            snapshot_file (str): If given, the points are written to a
+                :class:`.SocketSnapshot` in this file every
+                ``snapshot_interval`` seconds and on stop, and restored from
+                it on initialization. The restored points are subject to the
+                timeouts as usual.
+            snapshot_interval (float): The time between snapshots in seconds
+            tcp_port (int): If given, the requests are also served on this
+                TCP port, with framing, compression and pipelining, see
+                :class:`.StreamPullHandler`. For large replies, that would
+                not fit in a datagram.
+            unix_socket (str): If given, the requests are also served on a
+                Unix domain socket at this path, in the same way as with
+                ``tcp_port``
         """
         CDPULLSLOG.info('Initialize with: {}'.format(call_spec_string()))
         # Init thread
@@ -285,12 +1844,17 @@ class CommonDataPullSocket(threading.Thread):
         self.daemon = True
         # Init local data
         self.port = port
+        self._reactor = reactor
 
         # Check for existing servers on this port
         if port in DATA:
             message = 'A UDP server already exists on port: {}'.format(port)
             CDPULLSLOG.error(message)
             raise ValueError(message)
+        if history_size is not None and numpy is None:
+            message = 'The history (history_size) requires numpy'
+            CDPULLSLOG.error(message)
+            raise ImportError(message)
         # Check and possibly convert timeout
         if hasattr(timeouts, '__len__'):
             if len(timeouts) != len(codenames):
@@ -303,8 +1867,15 @@ class CommonDataPullSocket(threading.Thread):
             # If only a single value is given turn it into a list
             timeouts = [timeouts] * len(codenames)
 
-        # Prepare DATA
-        DATA[port] = {'codenames': list(codenames), 'data': {}, 'name': name}
+        # Prepare DATA. The sequence number is bumped on every set_point and
+        # used to invalidate the response cache. The sequences dict holds the
+        # sequence number at which each point was last set.
+        DATA[port] = {'codenames': list(codenames), 'data': {}, 'name': name,
+                      'sequence': 0, 'sequences': {}, 'cache': {},
+                      'cache_hits': 0, 'cache_misses': 0,
+                      'lock': threading.RLock(), 'subscribers': {},
+                      'subscription_lease': subscription_lease,
+                      'max_subscribers': max_subscribers}
         if init_timeouts:
             DATA[port]['timeouts'] = {}
         for name, timeout in zip(codenames, timeouts):
@@ -323,21 +1894,101 @@ class CommonDataPullSocket(threading.Thread):
                     raise ValueError(message)
             # Init the point
             DATA[port]['data'][name] = (default_x, default_y)
+            DATA[port]['sequences'][name] = 0
             if init_timeouts:
                 DATA[port]['timeouts'][name] = timeout
+        if history_size is not None:
+            DATA[port]['history'] = {name: RingBuffer(history_size)
+                                     for name in codenames}
+        self._shared_store = shared_store
+        if shared_store is not None:
+            missing = set(codenames) - set(shared_store.codenames)
+            if missing:
+                del DATA[port]
+                message = 'The codenames {} are not in the shared store'\
+                    .format(list(missing))
+                CDPULLSLOG.error(message)
+                raise ValueError(message)
+            self._shared_sequences = {name: 0 for name in codenames}
+            DATA[port]['sync'] = self._sync_shared_store
+        if stats_windows is not None:
+            DATA[port]['stats'] = {}
+            for name in codenames:
+                DATA[port]['stats'][name] = {
+                    float(window): WindowedStats(float(window))
+                    for window in stats_windows
+                }
 
         # Setup server
         try:
-            self.server = SocketServer.UDPServer(('', port), handler_class)
-        except socket.error as error:
-            if error.errno == 98:
-                # See custom exception message to understand this
-                CDPULLSLOG.error('Port \'{}\' still reserved'.format(port))
-                raise PortStillReserved()
-            else:
-                raise error
+            self.server = make_udp_server(
+                port, handler_class, serving_mode=serving_mode,
+                workers=workers, max_in_flight=max_in_flight,
+                reuse_port=reuse_port
+            )
+        except (ValueError, PortStillReserved):
+            # Remove the data again, to allow forming a socket on this port
+            del DATA[port]
+            raise
+        self._multicast_publisher = None
+        self._snapshot_thread = None
+        self.stream_servers = []
+        self._stream_threads = []
+        try:
+            if multicast is not None:
+                self._multicast_publisher = MulticastPublisher(
+                    port, multicast, interval=multicast_interval
+                )
+            if snapshot_file is not None:
+                self._snapshot_thread = SnapshotThread(
+                    SocketSnapshot(snapshot_file), self._snapshot_state,
+                    interval=snapshot_interval
+                )
+            if tcp_port is not None:
+                self.stream_servers.append(
+                    StreamPullServer(('', tcp_port), port)
+                )
+            if unix_socket is not None:
+                self.stream_servers.append(
+                    UnixStreamPullServer(unix_socket, port)
+                )
+        except (EnvironmentError, ValueError):
+            self._abort_init()
+            raise
         CDPULLSLOG.debug('Initialized')
 
+    def _abort_init(self):
+        """Close the servers and remove the data after a failed
+        initialization, to allow forming a socket on this port
+        """
+        for server in [self.server] + self.stream_servers:
+            server.server_close()
+        if self._multicast_publisher is not None:
+            self._multicast_publisher.stop()
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.snapshot.close()
+        del DATA[self.port]
+
+    def start(self):
+        """Start the UDP socket server, in the reactor if one was given or
+        else in this thread
+        """
+        if self._multicast_publisher is not None and \
+                self._multicast_publisher.interval is not None:
+            self._multicast_publisher.start()
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.start()
+        for stream_server in self.stream_servers:
+            thread = threading.Thread(target=stream_server.serve_forever)
+            thread.daemon = True
+            thread.start()
+            self._stream_threads.append(thread)
+        if self._reactor is None:
+            super(CommonDataPullSocket, self).start()
+        else:
+            CDPULLSLOG.info('Register with reactor')
+            self._reactor.register(self.server)
+
     def run(self):
         """Start the UPD socket server"""
         CDPULLSLOG.info('Run')
@@ -351,7 +2002,19 @@ class CommonDataPullSocket(threading.Thread):
                 instance is necessary to free up the port for other usage
         """
         CDPULLSLOG.debug('Stop requested')
-        self.server.shutdown()
+        if self._multicast_publisher is not None:
+            self._multicast_publisher.stop()
+        close_udp_server(self.server, reactor=self._reactor,
+                         running=self.is_alive())
+        with DATA[self.port]['lock']:
+            for address in list(DATA[self.port]['subscribers'].keys()):
+                cancel_subscription(self.port, address)
+        for stream_server in self.stream_servers:
+            if self._stream_threads:
+                stream_server.shutdown()
+            stream_server.server_close()
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.stop()
         # Wait 0.1 sec to prevent the interpreter from destroying the
         # environment before we are done if this is the last thread
         time.sleep(0.1)
@@ -359,6 +2022,190 @@ class CommonDataPullSocket(threading.Thread):
         del DATA[self.port]
         CDPULLSLOG.info('Stopped')
 
+    def _point_updated(self, codename):
+        """Register that the point for codename has been updated. Must be
+        called by ``set_point`` **after** the point has been set.
+
+        Args:
+            codename (str): The codename whose point was updated
+        """
+        # Bumping the sequence number invalidates all cached responses
+        DATA[self.port]['sequence'] += 1
+        DATA[self.port]['sequences'][codename] = DATA[self.port]['sequence']
+        if 'history' in DATA[self.port]:
+            x_value, y_value = DATA[self.port]['data'][codename]
+            try:
+                DATA[self.port]['history'][codename].append(
+                    self._point_time(codename), x_value, y_value
+                )
+            except (TypeError, ValueError):
+                CDPULLSLOG.debug('Point for \'{}\' not added to history, it '
+                                 'is not numbers'.format(codename))
+        if DATA[self.port]['subscribers']:
+            self._push_to_subscribers(codename)
+        if self._multicast_publisher is not None:
+            self._multicast_publisher.publish(codename)
+        if 'stats' in DATA[self.port]:
+            y_value = DATA[self.port]['data'][codename][-1]
+            for window_stats in DATA[self.port]['stats'][codename].values():
+                try:
+                    window_stats.add(self._point_time(codename), y_value)
+                except (TypeError, ValueError):
+                    CDPULLSLOG.debug('Point for \'{}\' not added to stats, '
+                                     'it is not a number'.format(codename))
+                    break
+
+    def _snapshot_state(self):
+        """Return the state to snapshot; the points, timestamps and sequence
+        number
+        """
+        with DATA[self.port]['lock']:
+            state = {'data': dict(DATA[self.port]['data']),
+                     'sequence': DATA[self.port]['sequence']}
+            if 'timestamps' in DATA[self.port]:
+                state['timestamps'] = dict(DATA[self.port]['timestamps'])
+            return state
+
+    def _restore_snapshot(self):
+        """Restore the points from the snapshot, for the codenames that this
+        socket has. Must be called at the end of the initialization of the
+        sub-classes, when :data:`.DATA` is complete.
+        """
+        if self._snapshot_thread is None:
+            return
+        try:
+            state = self._snapshot_thread.snapshot.read()
+            if state is None:
+                CDPULLSLOG.info('No snapshot to restore')
+                return
+            with DATA[self.port]['lock']:
+                # Continue the sequence numbers, so that the sequence numbers
+                # the clients got before the restart stay valid
+                DATA[self.port]['sequence'] = max(
+                    DATA[self.port]['sequence'], state.get('sequence', 0)
+                )
+                for codename, point in state['data'].items():
+                    if codename not in DATA[self.port]['data']:
+                        continue
+                    DATA[self.port]['data'][codename] = tuple(point)
+                    if 'timestamps' in DATA[self.port]:
+                        DATA[self.port]['timestamps'][codename] = \
+                            state.get('timestamps', {}).get(codename, 0.0)
+                    self._point_updated(codename)
+        except Exception:  # pylint: disable=broad-except
+            CDPULLSLOG.exception('Restoring the snapshot failed')
+            self._abort_init()
+            raise
+        CDPULLSLOG.info('Snapshot restored')
+
+    def _sync_shared_store(self):
+        """Update the points that has been set in the shared store since the
+        last sync. Called by the handler with the lock held.
+        """
+        for codename, known in self._shared_sequences.items():
+            slot = self._shared_store.get(codename)
+            if slot is None:
+                # Keep the last point, which times out as usual
+                continue
+            sequence, x_value, y_value, timestamp = slot
+            if sequence == known:
+                continue
+            self._shared_sequences[codename] = sequence
+            DATA[self.port]['data'][codename] = (x_value, y_value)
+            if 'timestamps' in DATA[self.port]:
+                DATA[self.port]['timestamps'][codename] = timestamp
+            self._point_updated(codename)
+
+    def _push_to_subscribers(self, codename):
+        """Push the update of codename to the subscribers
+
+        Args:
+            codename (str): The codename whose point was updated
+        """
+        now = time.time()
+        expire_subscriptions(self.port, now)
+        subscribers = DATA[self.port]['subscribers']
+        for address, subscriber in list(subscribers.items()):
+            if codename not in subscriber['codenames']:
+                continue
+            subscriber['pending'].add(codename)
+            wait = subscriber['last_sent'] + subscriber['min_interval'] - now
+            if wait > 0:
+                # Send the pending updates when the interval has passed, also
+                # if no further updates arrive
+                if subscriber['timer'] is None:
+                    subscriber['timer'] = threading.Timer(
+                        wait, self._flush_subscriber, args=(address,)
+                    )
+                    subscriber['timer'].daemon = True
+                    subscriber['timer'].start()
+                continue
+            self._send_to_subscriber(address, subscriber, now)
+
+    def _flush_subscriber(self, address):
+        """Send the pending updates to the subscriber at address. Called by
+        the timer of the subscription.
+
+        Args:
+            address (tuple): The address of the subscriber
+        """
+        port_data = DATA.get(self.port)
+        if port_data is None:
+            # The socket has been stopped
+            return
+        with port_data['lock']:
+            subscriber = port_data['subscribers'].get(address)
+            if subscriber is None or \
+                    subscriber['timer'] is not threading.current_thread():
+                # Unsubscribed or subscribed again since the timer started
+                return
+            subscriber['timer'] = None
+            if subscriber['pending']:
+                self._send_to_subscriber(address, subscriber, time.time())
+
+    def _send_to_subscriber(self, address, subscriber, now):
+        """Send the pending updates to a subscriber. Must be called with the
+        lock held.
+
+        Args:
+            address (tuple): The address of the subscriber
+            subscriber (dict): The subscription
+            now (float): The current unix time
+        """
+        points = {name: DATA[self.port]['data'][name]
+                  for name in subscriber['pending']}
+        try:
+            self.server.socket.sendto(
+                '{}#{}'.format(SUBSCRIPTION_PUSH, json.dumps(points)),
+                address
+            )
+        except socket.error as exception:
+            CDPULLSLOG.warning('Push to {} failed, removing the '
+                               'subscription: {}'.format(address, exception))
+            cancel_subscription(self.port, address)
+            return
+        subscriber['pending'].clear()
+        subscriber['last_sent'] = now
+
+    def _point_time(self, codename):
+        """Return the time the point for codename was set: the timestamp if
+        the socket keeps timestamps, otherwise the x value
+        """
+        if 'timestamps' in DATA[self.port]:
+            return DATA[self.port]['timestamps'][codename]
+        return DATA[self.port]['data'][codename][0]
+
+    @property
+    def cache_stats(self):
+        """Get the response cache statistics
+
+        Returns:
+            dict: ``{'hits': hits, 'misses': misses}`` with the number of
+                cached all-values responses that were re-used and formed
+        """
+        return {'hits': DATA[self.port]['cache_hits'],
+                'misses': DATA[self.port]['cache_misses']}
+
 
 DPULLSLOG = logging.getLogger(__name__ + '.DataPullSocket')
 DPULLSLOG.addHandler(logging.NullHandler())
@@ -372,7 +2219,7 @@ class DataPullSocket(CommonDataPullSocket):
     """
 
     def __init__(self, name, codenames, port=9010, default_x=47, default_y=47,
-                 timeouts=None):
+                 timeouts=None, **kwargs):
         """Init data and UPD server
 
         Args:
@@ -392,18 +2239,21 @@ class DataPullSocket(CommonDataPullSocket):
                 data as being to old and reports that. If a list of timeouts is
                 supplied there must be one value for each codename and in the
                 same order.
+            kwargs: Extra keyword arguments, e.g. ``serving_mode``, are passed
+                on to :meth:`.CommonDataPullSocket.__init__`
         """
         DPULLSLOG.info('Initialize with: {}'.format(call_spec_string()))
         # Run super init to initialize thread, check input and initialize data
         super(DataPullSocket, self).__init__(
             name, codenames, port=port, default_x=default_x,
-            default_y=default_y, timeouts=timeouts
+            default_y=default_y, timeouts=timeouts, **kwargs
         )
         DATA[port]['type'] = 'data'
         # Init timestamps
         DATA[port]['timestamps'] = {}
         for name in codenames:
             DATA[port]['timestamps'][name] = 0.0
+        self._restore_snapshot()
         DPULLSLOG.debug('Initialized')
 
     def set_point(self, codename, point, timestamp=None):
@@ -419,10 +2269,12 @@ class DataPullSocket(CommonDataPullSocket):
                 value is used to evaluate if the point is new enough if
                 timeouts are set.
         """
-        DATA[self.port]['data'][codename] = tuple(point)
         if timestamp is None:
             timestamp = time.time()
-        DATA[self.port]['timestamps'][codename] = timestamp
+        with DATA[self.port]['lock']:
+            DATA[self.port]['data'][codename] = tuple(point)
+            DATA[self.port]['timestamps'][codename] = timestamp
+            self._point_updated(codename)
         DPULLSLOG.debug('Point {} for \'{}\' set'
                         .format(tuple(point), codename))
 
@@ -440,7 +2292,7 @@ class DateDataPullSocket(CommonDataPullSocket):
     """
 
     def __init__(self, name, codenames, port=9000, default_x=0, default_y=47,
-                 timeouts=None):
+                 timeouts=None, **kwargs):
         """Init data and UPD server
 
         Args:
@@ -458,15 +2310,18 @@ class DateDataPullSocket(CommonDataPullSocket):
             timeouts (float or list of floats): The timeouts (in seconds as
                 floats) that determines when the date data socket regards the
                 data as being to old and reports that
+            kwargs: Extra keyword arguments, e.g. ``serving_mode``, are passed
+                on to :meth:`.CommonDataPullSocket.__init__`
         """
         DDPULLSLOG.info('Initialize with: {}'.format(call_spec_string()))
         # Run super init to initialize thread, check input and initialize data
         super(DateDataPullSocket, self).__init__(
             name, codenames, port=port, default_x=default_x,
-            default_y=default_y, timeouts=timeouts
+            default_y=default_y, timeouts=timeouts, **kwargs
         )
         # Set the type
         DATA[port]['type'] = 'date'
+        self._restore_snapshot()
         DDPULLSLOG.debug('Initialized')
 
     def set_point_now(self, codename, value):
@@ -489,11 +2344,224 @@ class DateDataPullSocket(CommonDataPullSocket):
             point (iterable): Current point as a list (or tuple) of 2 floats:
                 [x, y]
         """
-        DATA[self.port]['data'][codename] = tuple(point)
+        with DATA[self.port]['lock']:
+            DATA[self.port]['data'][codename] = tuple(point)
+            self._point_updated(codename)
         DDPULLSLOG.debug('Point {} for \'{}\' set'
                          .format(tuple(point), codename))
 
 
+MCPUBLOG = logging.getLogger(__name__ + '.MulticastPublisher')
+MCPUBLOG.addHandler(logging.NullHandler())
+
+
+class MulticastPublisher(threading.Thread):
+    """Publishes the updated points of a pull socket to an IP multicast group
+
+    The points are published either immediately when they are set or, if an
+    interval is given, coalesced into one datagram per interval, which is
+    sent from this thread. Each datagram is a :py:mod:`json` encoded
+    :py:class:`dict` on the form:
+
+    .. code-block:: python
+
+        {'name': 'socket name', 'port': 9000, 'sequence': 47,
+         'data': {'codename': [x, y]}, 'sequences': {'codename': 46}}
+
+    where ``port`` is the port of the pull socket and ``sequences`` are the
+    sequence numbers at which the points were set. See
+    :class:`.MulticastListener` for the receiving end.
+    """
+
+    def __init__(self, port, address, interval=None, ttl=1):
+        """Initialize the publisher
+
+        Args:
+            port (int): The port of the pull socket, i.e. the key in
+                :data:`.DATA`
+            address (tuple): The (group, port) of the multicast group
+            interval (float): If given, the updates are coalesced and sent
+                once per interval seconds instead of immediately
+            ttl (int): The multicast time to live, i.e. the number of routers
+                the datagrams may pass. The default of 1 keeps them on the
+                local network.
+        """
+        MCPUBLOG.info('Initialize with: {}'.format(call_spec_string()))
+        super(MulticastPublisher, self).__init__()
+        self.daemon = True
+        self.port = port
+        self.address = tuple(address)
+        self.interval = interval
+        self._pending = set()
+        self._stop_event = threading.Event()
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL,
+                               ttl)
+
+    def publish(self, codename):
+        """Publish the update of the point for codename. Must be called with
+        the lock of the pull socket held.
+
+        Args:
+            codename (str): The codename whose point was updated
+        """
+        self._pending.add(codename)
+        if self.interval is None:
+            self._send()
+
+    def _send(self):
+        """Send the pending points"""
+        if not self._pending:
+            return
+        port_data = DATA[self.port]
+        message = {
+            'name': port_data['name'], 'port': self.port,
+            'sequence': port_data['sequence'],
+            'data': {name: port_data['data'][name] for name in self._pending},
+            'sequences': {name: port_data['sequences'][name]
+                          for name in self._pending},
+        }
+        self._pending.clear()
+        try:
+            self.socket.sendto(json.dumps(message), self.address)
+        except socket.error as exception:
+            MCPUBLOG.warning('Publish to {} failed: {}'.format(self.address,
+                                                               exception))
+
+    def run(self):
+        """Send the coalesced updates once per interval"""
+        MCPUBLOG.info('Run')
+        while not self._stop_event.wait(self.interval):
+            with DATA[self.port]['lock']:
+                self._send()
+        MCPUBLOG.info('Run ended')
+
+    def stop(self):
+        """Stop the publisher thread, if running, and close the socket"""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+        self.socket.close()
+        MCPUBLOG.info('Stopped')
+
+
+MCLISTLOG = logging.getLogger(__name__ + '.MulticastListener')
+MCLISTLOG.addHandler(logging.NullHandler())
+
+
+class MulticastListener(threading.Thread):
+    """Keeps local mirrors of the data of the pull sockets that publish to a
+    multicast group (see :class:`.MulticastPublisher`)
+
+    The mirrors are kept per source, i.e. per (host, port) of the publishing
+    pull socket:
+
+    .. code-block:: python
+
+        listener = MulticastListener('239.255.47.47', 9500)
+        listener.start()
+        ...
+        print(listener.data('rasppi12', 9000))  # {'codename': [x, y]}
+        listener.stop()
+    """
+
+    def __init__(self, group, port, interface='0.0.0.0', timeout=0.5):
+        """Initialize the listener and join the group
+
+        Args:
+            group (str): The multicast group address
+            port (int): The multicast port
+            interface (str): The IP address of the interface to join the
+                group on. The default let the OS decide.
+            timeout (float): The interval at which the thread checks whether
+                it should stop
+        """
+        MCLISTLOG.info('Initialize with: {}'.format(call_spec_string()))
+        super(MulticastListener, self).__init__()
+        self.daemon = True
+        self._mirrors = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind(('', port))
+        membership = struct.pack('4s4s', socket.inet_aton(group),
+                                 socket.inet_aton(interface))
+        self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP,
+                               membership)
+        self.socket.settimeout(timeout)
+
+    @property
+    def sources(self):
+        """The list of (host, port) of the sources that has been heard from"""
+        with self._lock:
+            return list(self._mirrors.keys())
+
+    def data(self, host, port):
+        """Return a copy of the mirrored data for a source
+
+        Args:
+            host (str): The IP address of the source
+            port (int): The port of the pull socket of the source
+
+        Returns:
+            dict: Codename to point
+
+        Raises:
+            KeyError: If nothing has been received from the source
+        """
+        with self._lock:
+            return dict(self._mirrors[(host, port)]['data'])
+
+    def name(self, host, port):
+        """Return the name of the pull socket of a source"""
+        with self._lock:
+            return self._mirrors[(host, port)]['name']
+
+    def run(self):
+        """Receive the updates and apply them to the mirrors"""
+        MCLISTLOG.info('Run')
+        while not self._stop_event.is_set():
+            try:
+                datagram, (host, _) = self.socket.recvfrom(65535)
+            except socket.timeout:
+                continue
+            try:
+                message = json.loads(datagram)
+                self._update((host, message['port']), message)
+            except (ValueError, KeyError, TypeError) as exception:
+                MCLISTLOG.warning('Bad datagram from {}: {}'
+                                  .format(host, exception))
+        self.socket.close()
+        MCLISTLOG.info('Run ended')
+
+    def _update(self, source, message):
+        """Apply the update in message to the mirror for source"""
+        with self._lock:
+            mirror = self._mirrors.setdefault(
+                source, {'name': None, 'data': {}, 'sequences': {}}
+            )
+            mirror['name'] = message['name']
+            for codename, point in message['data'].items():
+                sequence = message['sequences'][codename]
+                known = mirror['sequences'].get(codename, -1)
+                # Skip reordered datagrams, unless the source has restarted
+                # i.e. its sequence is below what we know
+                if sequence <= known and message['sequence'] >= known:
+                    continue
+                mirror['data'][codename] = point
+                mirror['sequences'][codename] = sequence
+
+    def stop(self):
+        """Stop the listener"""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+        else:
+            self.socket.close()
+        MCLISTLOG.info('Stopped')
+
+
 PUSHUHLOG = logging.getLogger(__name__ + '.PushUDPHandler')
 PUSHUHLOG.addHandler(logging.NullHandler())
 
@@ -523,8 +2591,39 @@ class PushUDPHandler(SocketServer.BaseRequestHandler):
            there is more than one, they will be put in a list. An example of a
            complete raw_wn string could look like:\n
            ``'raw_wn#greeting:str:Live long and prosper;numbers:int:47,42'``
+         * **json_batch#data** (*str*): A batch of data sets. The data should
+           be a JSON encoded list of dicts, each of which is a data set as
+           for ``json_wn``. The data sets are applied in order, as if they
+           had been sent one at a time, and a single ``ACK#n`` is sent back,
+           where ``n`` is the number of data sets. If any of the data sets is
+           invalid, none of them are applied. Not supported with the
+           ``'callback_direct'`` action.
+         * **register_schema#codename1:type,codename2:type,...** (*str*):
+           Register a schema, i.e. the codenames and types of the data sets
+           that will be sent in one of the two compact forms below. The
+           ``type`` can be ``'int'``, ``'float'``, ``'str'`` or ``'bool'``.
+           Returns ``RET#id``, where ``id`` is the schema id to use in the
+           compact forms. Registering the same schema again returns the
+           same id. At most ``max_schemas`` (see :class:`.DataPushSocket`)
+           different schemas can be registered.
+         * **s<id>#value1,value2,...** (*str*): A data set with the values
+           in the order of the codenames in the schema with the id ``id``,
+           e.g. ``'s0#47,42.0,True'``. One value per codename.
+         * **b<id>#packed** (*str*): A data set with the values packed with
+           :py:mod:`struct` in the order of the codenames in the schema,
+           big-endian and with the format ``'q'`` for int, ``'d'`` for float
+           and ``'?'`` for bool. Not available for schemas with str values.
+           The packed data may contain ``#``.
+         * **raw_batch#data** (*str*): The raw equivalent of ``json_batch``.
+           The data sets are on the ``raw_wn`` format and separated by
+           ``&``, e.g:\n
+           ``'raw_batch#x:float:1.0;y:float:42.0&x:float:2.0;y:float:47.0'``
          * **name** (*str*): Return the name of the PushSocket server
 
+        If the socket has a :class:`.BoundedQueue` and data sets were dropped
+        because it was full, ``OVERFLOW#n`` is sent back instead of the
+        ``ACK``, where ``n`` is the number of dropped data sets, so that the
+        sender can back off.
         """
         request = self.request[0]
         PUSHUHLOG.debug('Request \'{}\'received'.format(request))
@@ -532,9 +2631,31 @@ class PushUDPHandler(SocketServer.BaseRequestHandler):
         self.port = self.server.server_address[1]
         sock = self.request[1]
 
+        tag, request = split_tag(request)
+        return_value = tag + self._reply(request)
+        PUSHUHLOG.debug('Send back: {}'.format(return_value))
+        sock.sendto(return_value, self.client_address)
+
+    def _reply(self, request):
+        """Set the data in request and return the reply
+
+        Args:
+            request (str): Complete request
+
+        Returns:
+            str: The reply to be sent back
+        """
         # Parse the request and call the appropriate helper methods
         if request == 'name':
             return_value = '{}#{}'.format(PUSH_RET, DATA[self.port]['name'])
+        elif request[:1] in ['s', 'b'] and request[1:2].isdigit():
+            # The packed data in the b form may contain '#', so split only
+            # once
+            command, _, data = request.partition('#')
+            try:
+                return_value = self._schema_data(command, data)
+            except ValueError as exception:
+                return_value = '{}#{}'.format(PUSH_ERROR, exception.message)
         elif request.count('#') != 1:
             return_value = '{}#{}'.format(PUSH_ERROR, UNKNOWN_COMMAND)
         else:
@@ -545,6 +2666,12 @@ class PushUDPHandler(SocketServer.BaseRequestHandler):
                     return_value = self._json_with_names(data)
                 elif command == 'raw_wn':
                     return_value = self._raw_with_names(data)
+                elif command == 'json_batch':
+                    return_value = self._json_batch(data)
+                elif command == 'raw_batch':
+                    return_value = self._raw_batch(data)
+                elif command == 'register_schema':
+                    return_value = self._register_schema(data)
                 else:
                     return_value = '{}#{}'.format(PUSH_ERROR, UNKNOWN_COMMAND)
             # Several of the helper methods will raise ValueError on wrong
@@ -552,11 +2679,33 @@ class PushUDPHandler(SocketServer.BaseRequestHandler):
             except ValueError as exception:
                 return_value = '{}#{}'.format(PUSH_ERROR, exception.message)
 
-        PUSHUHLOG.debug('Send back: {}'.format(return_value))
-        sock.sendto(return_value, self.client_address)
+        return return_value
 
     def _raw_with_names(self, data):
         """Add raw data to the queue"""
+        # Set data and return ACK message
+        return self._set_data(self._parse_raw_with_names(data))
+
+    def _raw_batch(self, data):
+        """Add a batch of raw data sets to the queue"""
+        PUSHUHLOG.debug('Parse raw batch: {}'.format(data))
+        data_sets = [self._parse_raw_with_names(part)
+                     for part in data.split('&')]
+        return self._set_batch(data_sets)
+
+    @staticmethod
+    def _parse_raw_with_names(data):
+        """Parse a raw with names data set
+
+        Args:
+            data (str): The data set e.g. ``'codename1:type:dat1,dat2;...'``
+
+        Returns:
+            dict: The data set
+
+        Raises:
+            ValueError: On bad formatting, unknown types or failed conversion
+        """
         PUSHUHLOG.debug('Parse raw with names: {}'.format(data))
         data_out = {}
         # Split in data parts e.g: 'codenam1:type:dat1,dat2'. NOTE if no data
@@ -595,28 +2744,147 @@ class PushUDPHandler(SocketServer.BaseRequestHandler):
             # Inset the data
             data_out[codename] = data_converted
 
-        # Set data and return ACK message
-        return self._set_data(data_out)
+        return data_out
 
     def _json_with_names(self, data):
         """Add json encoded data to the data queue"""
         PUSHUHLOG.debug('Parse json with names: {}'.format(data))
+        data_dict = self._decode_json(data, dict)
+        # Set data and return ACK message
+        return self._set_data(data_dict)
+
+    def _json_batch(self, data):
+        """Add a batch of json encoded data sets to the data queue"""
+        PUSHUHLOG.debug('Parse json batch: {}'.format(data))
+        data_sets = self._decode_json(data, list)
+        for data_set in data_sets:
+            if not isinstance(data_set, dict):
+                message = 'The data set \'{}\' in the batch is not a dict'\
+                    .format(data_set)
+                PUSHUHLOG.error('{}'.format(message))
+                raise ValueError(message)
+        return self._set_batch(data_sets)
+
+    def _register_schema(self, data):
+        """Register a schema and return its id"""
+        PUSHUHLOG.debug('Register schema: {}'.format(data))
+        names = []
+        converters = []
+        struct_format = '>'
+        for part in data.split(','):
+            try:
+                codename, data_type = part.split(':')
+            except ValueError:
+                message = 'The schema part \'{}\' did not match the expected '\
+                    'format of 2 parts divided by \':\''.format(part)
+                PUSHUHLOG.error('{}'.format(message))
+                raise ValueError(message)
+            if data_type not in TYPE_FROM_STRING:
+                message = 'The data type \'{}\' is unknown. Only {} are '\
+                    'allowed'.format(data_type, TYPE_FROM_STRING.keys())
+                PUSHUHLOG.error('{}'.format(message))
+                raise ValueError(message)
+            names.append(codename)
+            converters.append(TYPE_FROM_STRING[data_type])
+            if struct_format is not None and data_type in STRUCT_FORMATS:
+                struct_format += STRUCT_FORMATS[data_type]
+            else:
+                # Values of other types cannot be packed
+                struct_format = None
+
+        with DATA[self.port]['lock']:
+            schemas = DATA[self.port]['schemas']
+            for schema_id, schema in enumerate(schemas):
+                if schema['spec'] == data:
+                    break
+            else:
+                if len(schemas) >= DATA[self.port]['max_schemas']:
+                    message = 'The maximum number of schemas, {}, has been '\
+                        'reached'.format(DATA[self.port]['max_schemas'])
+                    PUSHUHLOG.error(message)
+                    raise ValueError(message)
+                schema_id = len(schemas)
+                schemas.append({
+                    'spec': data, 'names': tuple(names),
+                    'converters': tuple(converters),
+                    'struct': (None if struct_format is None
+                               else struct.Struct(struct_format)),
+                })
+        return '{}#{}'.format(PUSH_RET, schema_id)
+
+    def _schema_data(self, command, data):
+        """Decode the data with the schema in command and set it
+
+        Args:
+            command (str): ``'s<id>'`` or ``'b<id>'``
+            data (str): The values or the packed values
+
+        Returns:
+            (str): The request return value
+
+        Raises:
+            ValueError: On an unknown schema or data that does not match it
+        """
+        try:
+            schema = DATA[self.port]['schemas'][int(command[1:])]
+        except (ValueError, IndexError):
+            message = 'Unknown schema \'{}\''.format(command[1:])
+            PUSHUHLOG.error('{}'.format(message))
+            raise ValueError(message)
+
+        if command[0] == 's':
+            values = data.split(',')
+            if len(values) != len(schema['names']):
+                message = 'Expected {} values for schema {}, got {}'.format(
+                    len(schema['names']), command[1:], len(values)
+                )
+                PUSHUHLOG.error('{}'.format(message))
+                raise ValueError(message)
+            try:
+                values = [converter(value) for converter, value
+                          in zip(schema['converters'], values)]
+            except ValueError as exception:
+                message = 'Unable to convert values for schema {}. Error is: '\
+                    '{}'.format(command[1:], exception.message)
+                PUSHUHLOG.error('{}'.format(message))
+                raise ValueError(message)
+        else:
+            if schema['struct'] is None:
+                message = 'Schema {} has str values and cannot be used '\
+                    'packed'.format(command[1:])
+                PUSHUHLOG.error('{}'.format(message))
+                raise ValueError(message)
+            try:
+                values = schema['struct'].unpack(data)
+            except struct.error as exception:
+                message = 'Unable to unpack values for schema {}. Error is: '\
+                    '{}'.format(command[1:], exception)
+                PUSHUHLOG.error('{}'.format(message))
+                raise ValueError(message)
+
+        return self._set_data(dict(zip(schema['names'], values)))
+
+    @staticmethod
+    def _decode_json(data, expected_type):
+        """Decode the json string data and check the type of the result
+
+        Raises:
+            ValueError: If data cannot be decoded or is of the wrong type
+        """
         try:
-            data_dict = json.loads(data)
+            decoded = json.loads(data)
         except ValueError:
             message = 'The string \'{}\' could not be decoded as JSON'.\
                 format(data)
             PUSHUHLOG.error('{}'.format(message))
             raise ValueError(message)
         # Check type (normally not done, but we want to be sure)
-        if not isinstance(data_dict, dict):
+        if not isinstance(decoded, expected_type):
             message = 'The object \'{}\' returned after decoding the JSON '\
-                'string is not a dict'.format(data_dict)
+                'string is not a {}'.format(decoded, expected_type.__name__)
             PUSHUHLOG.error('{}'.format(message))
             raise ValueError(message)
-
-        # Set data and return ACK message
-        return self._set_data(data_dict)
+        return decoded
 
     def _set_data(self, data):
         """Set the data in 'last' and 'updated' and enqueue and/or make
@@ -629,15 +2897,9 @@ class PushUDPHandler(SocketServer.BaseRequestHandler):
             (str): The request return value
         """
         PUSHUHLOG.debug('Set data: {}'.format(data))
-        timestamp = time.time()
-        DATA[self.port]['last'] = data
-        DATA[self.port]['last_time'] = timestamp
-        DATA[self.port]['updated'].update(data)
-        DATA[self.port]['updated_time'] = timestamp
-
-        # Put the data in queue for actions that require that
-        if DATA[self.port]['action'] in ['enqueue', 'callback_async']:
-            DATA[self.port]['queue'].put(data)
+        # The callback is called outside of the lock, so that a slow callback
+        # does not hold up other requests when they are served in threads
+        dropped = self._apply_data([data], time.time())
 
         # Execute the callback for actions that require that. Notice, the
         # different branches determines which output format gets send back
@@ -661,12 +2923,82 @@ class PushUDPHandler(SocketServer.BaseRequestHandler):
             # pylint: disable=broad-except
             except Exception as exception:  # Catch anything it might raise
                 out = '{}#{}'.format(PUSH_EXCEP, exception.message)
+        elif dropped:
+            # Tell the sender that the queue is full, so it can back off
+            out = '{}#{}'.format(PUSH_OVERFLOW, dropped)
         else:
             # Return the ACK message with the interpreted data
             out = '{}#{}'.format(PUSH_ACK, data)
 
         return out
 
+    def _set_batch(self, data_sets):
+        """Set, in order, each of the data sets in 'last' and 'updated' and
+        enqueue them if the action requires it
+
+        Args:
+            data_sets (list): The list of data sets (dicts)
+
+        Returns:
+            (str): The request return value
+
+        Raises:
+            ValueError: If the action is 'callback_direct'
+        """
+        if DATA[self.port]['action'] == 'callback_direct':
+            message = 'Batches are not supported with the action '\
+                '\'callback_direct\''
+            PUSHUHLOG.error('{}'.format(message))
+            raise ValueError(message)
+        PUSHUHLOG.debug('Set batch of {} data sets'.format(len(data_sets)))
+        dropped = self._apply_data(data_sets, time.time())
+        if dropped:
+            return '{}#{}'.format(PUSH_OVERFLOW, dropped)
+        return '{}#{}'.format(PUSH_ACK, len(data_sets))
+
+    def _apply_data(self, data_sets, timestamp):
+        """Set, in order, each of the data sets in 'last' and 'updated' and
+        put them in the queue if the action requires it
+
+        The enqueue lock is held for all the data sets, which keeps the data
+        sets of concurrent requests from being interleaved, while the data
+        lock is only held while 'last' and 'updated' are set. A request that
+        waits for room in a :class:`.BoundedQueue` with the ``'block'``
+        policy therefore only holds up other pushes, not the readers, and it
+        waits at most the timeout of the queue for all the data sets in
+        total.
+
+        Args:
+            data_sets (list): The data sets (dicts)
+            timestamp (float): The unix time the data sets were received
+
+        Returns:
+            int: The number of data sets dropped from a full
+                :class:`.BoundedQueue`
+        """
+        dropped = 0
+        with DATA[self.port]['enqueue_lock']:
+            with DATA[self.port]['lock']:
+                for data in data_sets:
+                    DATA[self.port]['last'] = data
+                    DATA[self.port]['last_time'] = timestamp
+                    DATA[self.port]['updated'].update(data)
+                    DATA[self.port]['updated_time'] = timestamp
+
+            # Put the data in queue for actions that require that
+            if DATA[self.port]['action'] in ['enqueue', 'callback_async']:
+                queue = DATA[self.port]['queue']
+                if isinstance(queue, BoundedQueue):
+                    deadline = time.time() + queue.timeout
+                    for data in data_sets:
+                        dropped += queue.offer(
+                            data, timeout=max(deadline - time.time(), 0)
+                        )
+                else:
+                    for data in data_sets:
+                        queue.put(data)
+        return dropped
+
     @staticmethod
     def _format_return_json(value):
         """Format the return value as json
@@ -831,6 +3163,102 @@ class PushUDPHandler(SocketServer.BaseRequestHandler):
                                  '&'.join(items))
 
 
+BQLOG = logging.getLogger(__name__ + '.BoundedQueue')
+BQLOG.addHandler(logging.NullHandler())
+
+
+class BoundedQueue(Queue.Queue):
+    """A :py:class:`Queue.Queue` with a maximum size and a policy for what to
+    do when a data set arrives while it is full
+
+    The policies are:
+
+     * ``'drop_oldest'``: The oldest data set in the queue is dropped to make
+       room for the new one
+     * ``'drop_newest'``: The new data set is dropped
+     * ``'coalesce'``: The new data set is merged into the newest data set
+       in the queue, so that only the newest value for each codename is
+       kept. This counts as one dropped data set.
+     * ``'block'``: Wait up to ``timeout`` seconds for room in the queue and
+       drop the new data set if there still is none
+
+    The number of data sets dropped ever is available in :attr:`.dropped`.
+    """
+
+    def __init__(self, maxsize, policy='drop_oldest', timeout=1.0):
+        """Initialize the queue
+
+        Args:
+            maxsize (int): The maximum number of data sets in the queue
+            policy (str): The overflow policy, one of :data:`.OVERFLOW_POLICIES`
+            timeout (float): The time to wait for room with the ``'block'``
+                policy
+
+        Raises:
+            ValueError: On an unknown policy or a maxsize below 1
+        """
+        BQLOG.info('Initialize with: {}'.format(call_spec_string()))
+        if policy not in OVERFLOW_POLICIES:
+            message = 'Unknown overflow policy \'{}\'. Must be one of: {}'\
+                .format(policy, OVERFLOW_POLICIES)
+            BQLOG.error(message)
+            raise ValueError(message)
+        if maxsize < 1:
+            message = 'The maxsize must be at least 1'
+            BQLOG.error(message)
+            raise ValueError(message)
+        # Queue.Queue is an old style class in Python 2
+        Queue.Queue.__init__(self, maxsize)
+        self.policy = policy
+        self.timeout = timeout
+        self.dropped = 0
+
+    def offer(self, item, timeout=None):
+        """Put item in the queue, applying the overflow policy if it is full
+
+        Args:
+            item (dict): The data set
+            timeout (float): Override of the time to wait for room with the
+                ``'block'`` policy
+
+        Returns:
+            int: The number of data sets dropped (0 or 1)
+        """
+        if self.policy == 'block':
+            try:
+                self.put(item, True,
+                         self.timeout if timeout is None else timeout)
+                return 0
+            except Queue.Full:
+                return self._drop()
+
+        with self.not_full:
+            if self._qsize() < self.maxsize:
+                self._put(item)
+                self.unfinished_tasks += 1
+                self.not_empty.notify()
+                return 0
+            if self.policy == 'drop_oldest':
+                self._get()
+                self._put(item)
+                self.not_empty.notify()
+            elif self.policy == 'coalesce':
+                # Replace rather than update the newest data set, since that
+                # dict may also be referenced elsewhere, e.g. as 'last'
+                merged = dict(self.queue[-1])
+                merged.update(item)
+                self.queue[-1] = merged
+            # In all cases one data set less is in the queue than was offered
+            return self._drop()
+
+    def _drop(self):
+        """Count a dropped data set"""
+        self.dropped += 1
+        BQLOG.debug('Queue full, dropped a data set with the \'{}\' policy'
+                    .format(self.policy))
+        return 1
+
+
 DPUSHSLOG = logging.getLogger(__name__ + '.DataPushSocket')
 DPUSHSLOG.addHandler(logging.NullHandler())
 
@@ -842,7 +3270,12 @@ class DataPushSocket(threading.Thread):
 
     # pylint: disable=too-many-branches
     def __init__(self, name, port=8500, action='store_last', queue=None,
-                 callback=None, return_format='json'):
+                 callback=None, return_format='json', serving_mode='serial',
+                 workers=4, max_in_flight=32, reactor=None, queue_size=None,
+                 overflow='drop_oldest', overflow_timeout=1.0,
+                 callback_workers=None, callback_key=None,
+                 callback_batch=False, snapshot_file=None,
+                 snapshot_interval=1.0, max_schemas=64):
         """Initialiaze the DataReceiveSocket
 
         Arguments:
@@ -897,7 +3330,48 @@ class DataPushSocket(threading.Thread):
                    those lists
                  * ``'string'`` in which case the callback must return a
                    string and it will be passed through as is.
-
+            serving_mode (str): How requests are served. One of ``'serial'``
+                (default, one request at a time), ``'pool'`` (in a pool of
+                ``workers`` threads) or ``'thread'`` (in a thread per
+                request), see :func:`.make_udp_server`. With the two latter,
+                a slow ``'callback_direct'`` callback will not hold up other
+                clients, but the callback must then be thread safe.
+            workers (int): The number of worker threads in ``'pool'`` mode
+            max_in_flight (int): The maximum number of requests in progress
+                in the ``'pool'`` and ``'thread'`` modes
+            reactor (Reactor): If given, the requests will be served by this
+                :class:`.Reactor` instead of in a thread of its own. The
+                ``'callback_async'`` callbacks are still called from a
+                separate thread.
+            queue_size (int): If given, the queue used with the
+                ``'enqueue'`` and ``'callback_async'`` actions is a
+                :class:`.BoundedQueue` that holds at most this number of data
+                sets, instead of an unbounded :py:class:`Queue.Queue`
+            overflow (str): The policy for a full queue, one of
+                :data:`.OVERFLOW_POLICIES`, see :class:`.BoundedQueue`. Note
+                that with ``'block'`` the request waits for room in the queue,
+                which holds up other requests in ``'serial'`` mode and in a
+                :class:`.Reactor`.
+            overflow_timeout (float): The maximum time to wait for room in the
+                queue with the ``'block'`` policy
+            callback_workers (int): If given, the ``'callback_async'``
+                callbacks are made from a :class:`.CallBackPool` with this
+                number of worker threads, instead of from a single
+                :class:`.CallBackThread`
+            callback_key (callable): The key that decides which worker calls
+                back for a data set, see :class:`.CallBackPool`
+            callback_batch (bool): If True, the callback is called with a list
+                of all data sets queued since the last call. Implies a
+                :class:`.CallBackPool`, with one worker unless
+                ``callback_workers`` is given.
+            snapshot_file (str): If given, the :attr:`~.last` and
+                :attr:`~.updated` data are written to a
+                :class:`.SocketSnapshot` in this file every
+                ``snapshot_interval`` seconds and on stop, and restored from
+                it on initialization.
+            snapshot_interval (float): The time between snapshots in seconds
+            max_schemas (int): The maximum number of schemas the clients can
+                register, see :meth:`.PushUDPHandler.handle`
 
         """
         DPUSHSLOG.info('Initialize with: {}'.format(call_spec_string()))
@@ -909,6 +3383,7 @@ class DataPushSocket(threading.Thread):
         # Init local data and action
         self.port = port
         self.action = action
+        self._reactor = reactor
 
         # Raise exception on invalid argument combinations
         if queue is not None and action != 'enqueue':
@@ -929,21 +3404,45 @@ class DataPushSocket(threading.Thread):
             message = 'The \'return_format\' argument may only be one of the '\
                 '\'json\', \'raw\' or \'string\' values'
             raise ValueError(message)
+        if queue_size is not None and (queue is not None or action not in
+                                       ['enqueue', 'callback_async']):
+            message = 'The \'queue_size\' argument can only be used when the '\
+                'action is \'enqueue\' or \'callback_async\' and no queue is '\
+                'given'
+            raise ValueError(message)
+        if action != 'callback_async' and (callback_workers is not None or
+                                           callback_key is not None or
+                                           callback_batch):
+            message = 'The \'callback_workers\', \'callback_key\' and '\
+                '\'callback_batch\' arguments can only be used when the '\
+                'action is \'callback_async\''
+            raise ValueError(message)
 
         # Set callback and queue depending on action
         self._callback_thread = None
         content = {'action': action, 'last': None, 'updated': {},
-                   'last_time': None, 'updated_time': None, 'name': name}
+                   'last_time': None, 'updated_time': None, 'name': name,
+                   'lock': threading.RLock(), 'enqueue_lock': threading.Lock(),
+                   'schemas': [], 'max_schemas': max_schemas}
+        if queue is None and queue_size is not None:
+            queue = BoundedQueue(queue_size, policy=overflow,
+                                 timeout=overflow_timeout)
+        elif queue is None:
+            queue = Queue.Queue()
         if action == 'store_last':
             pass
         elif action == 'enqueue':
-            if queue is None:
-                content['queue'] = Queue.Queue()
-            else:
-                content['queue'] = queue
+            content['queue'] = queue
         elif action == 'callback_async':
-            content['queue'] = Queue.Queue()
-            self._callback_thread = CallBackThread(content['queue'], callback)
+            content['queue'] = queue
+            content['callback'] = callback
+            if callback_workers is None and not callback_batch:
+                self._callback_thread = CallBackThread(queue, callback)
+            else:
+                self._callback_thread = CallBackPool(
+                    queue, callback, workers=callback_workers or 1,
+                    key=callback_key, batch=callback_batch
+                )
         elif action == 'callback_direct':
             content['callback'] = callback
             content['return_format'] = return_format
@@ -954,20 +3453,47 @@ class DataPushSocket(threading.Thread):
             raise ValueError(message)
 
         # Setup server
-        try:
-            self.server = SocketServer.UDPServer(('', port), PushUDPHandler)
-        except socket.error as error:
-            if error.errno == 98:
-                # See custom exception message to understand this
-                raise PortStillReserved()
-            else:
-                raise error
+        self.server = make_udp_server(
+            port, PushUDPHandler, serving_mode=serving_mode, workers=workers,
+            max_in_flight=max_in_flight
+        )
 
         # Only put this socket in the DATA variable, if we succeed in
         # initializing it
         DATA[port] = content
+        self._snapshot_thread = None
+        if snapshot_file is not None:
+            try:
+                self._snapshot_thread = SnapshotThread(
+                    SocketSnapshot(snapshot_file), self._snapshot_state,
+                    interval=snapshot_interval
+                )
+                self._restore_snapshot()
+            except Exception:  # pylint: disable=broad-except
+                DPUSHSLOG.exception('DPS: Setting up the snapshot failed')
+                # Close the server and remove the data again, to allow
+                # forming a socket on this port
+                self.server.server_close()
+                if self._snapshot_thread is not None:
+                    self._snapshot_thread.snapshot.close()
+                del DATA[port]
+                raise
         DPUSHSLOG.debug('DPS: Initialized')
 
+    def start(self):
+        """Start the UDP socket server, in the reactor if one was given or
+        else in this thread
+        """
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.start()
+        if self._reactor is None:
+            super(DataPushSocket, self).start()
+        else:
+            DPUSHSLOG.info('DPS: Register with reactor')
+            if self._callback_thread is not None:
+                self._callback_thread.start()
+            self._reactor.register(self.server)
+
     def run(self):
         """Start the UPD socket server"""
         DPUSHSLOG.info('DPS: Start')
@@ -987,7 +3513,10 @@ class DataPushSocket(threading.Thread):
         if self._callback_thread is not None:
             self._callback_thread.stop()
         time.sleep(0.1)
-        self.server.shutdown()
+        close_udp_server(self.server, reactor=self._reactor,
+                         running=self.is_alive())
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.stop()
         # Wait 0.1 sec to prevent the interpreter from destroying the
         # environment before we are done
         time.sleep(0.1)
@@ -995,6 +3524,24 @@ class DataPushSocket(threading.Thread):
         del DATA[self.port]
         DPUSHSLOG.info('DPS: Stopped')
 
+    def _snapshot_state(self):
+        """Return the state to snapshot; the last and updated data"""
+        with DATA[self.port]['lock']:
+            return {key: DATA[self.port][key] for key in
+                    ['last', 'last_time', 'updated', 'updated_time']}
+
+    def _restore_snapshot(self):
+        """Restore the last and updated data from the snapshot"""
+        state = self._snapshot_thread.snapshot.read()
+        if state is None:
+            DPUSHSLOG.info('DPS: No snapshot to restore')
+            return
+        with DATA[self.port]['lock']:
+            for key in ['last', 'last_time', 'updated', 'updated_time']:
+                if key in state:
+                    DATA[self.port][key] = state[key]
+        DPUSHSLOG.info('DPS: Snapshot restored')
+
     @property
     def queue(self):
         """Get the queue, returns None if ``action`` is ``'store_last'`` or
@@ -1003,6 +3550,23 @@ class DataPushSocket(threading.Thread):
         DPUSHSLOG.info('DPS: queue property used')
         return DATA[self.port].get('queue')
 
+    @property
+    def queue_depth(self):
+        """Get the number of data sets in the queue, returns None if there
+        is no queue
+        """
+        queue = DATA[self.port].get('queue')
+        if queue is None:
+            return None
+        return queue.qsize()
+
+    @property
+    def dropped(self):
+        """Get the number of data sets dropped because the queue was full.
+        Always 0 unless the queue is a :class:`.BoundedQueue`.
+        """
+        return getattr(DATA[self.port].get('queue'), 'dropped', 0)
+
     @property
     def last(self):
         """Get a copy of the last data
@@ -1014,11 +3578,12 @@ class DataPushSocket(threading.Thread):
                 data has been recieved.
         """
         DPUSHSLOG.debug('DPS: last property used')
-        if DATA[self.port]['last'] is None:
-            last = DATA[self.port]['last']
-        else:
-            last = DATA[self.port]['last'].copy()
-        return DATA[self.port]['last_time'], last
+        with DATA[self.port]['lock']:
+            if DATA[self.port]['last'] is None:
+                last = DATA[self.port]['last']
+            else:
+                last = DATA[self.port]['last'].copy()
+            return DATA[self.port]['last_time'], last
 
     @property
     def updated(self):
@@ -1032,22 +3597,25 @@ class DataPushSocket(threading.Thread):
                 Returns ``(None, {})`` if no data has been recieved.
         """
         DPUSHSLOG.debug('DPS: updated property used')
-        return (DATA[self.port]['updated_time'],
-                DATA[self.port]['updated'].copy())
+        with DATA[self.port]['lock']:
+            return (DATA[self.port]['updated_time'],
+                    DATA[self.port]['updated'].copy())
 
     def set_last_to_none(self):
         """Set the last data point and last data point time to None"""
         DPUSHSLOG.debug('DPS: Set last to none')
-        DATA[self.port]['last'] = None
-        DATA[self.port]['last_time'] = None
+        with DATA[self.port]['lock']:
+            DATA[self.port]['last'] = None
+            DATA[self.port]['last_time'] = None
 
     def clear_updated(self):
         """Clear the total updated data and set the time of last update to
         None
         """
         DPUSHSLOG.debug('DPS: Clear updated')
-        DATA[self.port]['updated'].clear()
-        DATA[self.port]['updated_time'] = None
+        with DATA[self.port]['lock']:
+            DATA[self.port]['updated'].clear()
+            DATA[self.port]['updated_time'] = None
 
 
 CBTLOG = logging.getLogger(__name__ + '.CallBackThread')
@@ -1099,6 +3667,151 @@ class CallBackThread(threading.Thread):
         CBTLOG.info('CBT: Stopped')
 
 
+CBPLOG = logging.getLogger(__name__ + '.CallBackPool')
+CBPLOG.addHandler(logging.NullHandler())
+
+
+def default_callback_key(data):
+    """The default key of :class:`.CallBackPool`, the first codename of the
+    data set in sorted order
+
+    Data sets with the same first codename are called back in order, so the
+    order is kept per codename for data sets with a single codename and for
+    codenames that are always sent together with the same first codename.
+    A codename that is sent with different first codenames, e.g. ``b`` in
+    ``{'b': 1}`` and ``{'a': 2, 'b': 0}``, may be called back out of order.
+    """
+    return min(data) if data else None
+
+
+class CallBackPool(threading.Thread):
+    """Calls back for a :class:`.DataPushSocket` from a pool of worker threads
+
+    This thread dispatches the data sets from the queue to the workers by
+    the hash of a key computed from each data set. Data sets with the same key
+    always go to the same worker, so the callbacks for them are made in the
+    order the data sets was received, while a slow callback for one key does
+    not delay the others. In batch mode the callback is called with a list of
+    all the data sets that has been queued for the worker since the last call,
+    instead of with one data set at a time.
+
+    The queue of each worker has the same maximum size as the queue, so when
+    the workers fall behind, the dispatcher waits for room and the data sets
+    pile up in the queue, where the overflow policy of a
+    :class:`.BoundedQueue` applies. Up to ``workers + 1`` times the maximum
+    size of data sets can therefore be waiting in total.
+
+    The threads block on their queues, so they do not wake up periodically,
+    and they are stopped with sentinels. On stop, the data sets still in the
+    queues are discarded, as with the :class:`.CallBackThread`.
+    """
+
+    def __init__(self, queue, callback, workers=4, key=None, batch=False):
+        """Initialize the pool
+
+        Args:
+            queue (Queue.Queue): The queue that queues up the arguments for the
+                callback function
+            callback (callable): The callable that will be called with a data
+                set, or a list of data sets in batch mode
+            workers (int): The number of worker threads
+            key (callable): Callable that returns the key for a data set. The
+                default is :func:`.default_callback_key`, which keeps the
+                order of data sets with the same first codename.
+            batch (bool): Whether to call the callback with lists of data sets
+        """
+        CBPLOG.info('Initialize with: {}'.format(call_spec_string()))
+        super(CallBackPool, self).__init__()
+        self.daemon = True
+        if workers < 1:
+            message = 'The number of callback workers must be at least 1'
+            CBPLOG.error(message)
+            raise ValueError(message)
+        self.queue = queue
+        self.callback = callback
+        self.key = default_callback_key if key is None else key
+        self.batch = batch
+        self._stop_event = threading.Event()
+        # Bounded like the queue, so that a full worker queue holds up the
+        # dispatcher and the overflow policy of the queue applies
+        self._worker_queues = [Queue.Queue(queue.maxsize)
+                               for _ in range(workers)]
+        self._workers = [
+            threading.Thread(target=self._work, args=(worker_queue,))
+            for worker_queue in self._worker_queues
+        ]
+        for worker in self._workers:
+            worker.daemon = True
+        CBPLOG.debug('CBP: Initialized')
+
+    def run(self):
+        """Start the workers and dispatch the data sets to them"""
+        CBPLOG.info('CBP: Run')
+        for worker in self._workers:
+            worker.start()
+        while True:
+            item = self.queue.get()
+            if item is CALLBACK_SENTINEL:
+                break
+            if self._stop_event.is_set():
+                # Discard the rest of the queue
+                continue
+            try:
+                index = hash(self.key(item)) % len(self._worker_queues)
+            except Exception:  # pylint: disable=broad-except
+                CBPLOG.exception('CBP: Key failed for: {}'.format(item))
+                index = 0
+            self._worker_queues[index].put(item)
+        for worker_queue in self._worker_queues:
+            worker_queue.put(CALLBACK_SENTINEL)
+        CBPLOG.info('CBP: Run stopped')
+
+    def _work(self, worker_queue):
+        """Call back for the data sets in worker_queue"""
+        while True:
+            items = [worker_queue.get()]
+            if self.batch:
+                # Add all that has been queued since the last call
+                while True:
+                    try:
+                        items.append(worker_queue.get_nowait())
+                    except Queue.Empty:
+                        break
+            if CALLBACK_SENTINEL in items:
+                break
+            if self._stop_event.is_set():
+                # Keep taking (and discarding) data sets until the sentinel,
+                # so the dispatcher cannot block on a full worker queue
+                continue
+            # pylint: disable=broad-except
+            try:
+                if self.batch:
+                    self.callback(items)
+                else:
+                    self.callback(items[0])
+                CBPLOG.debug('CBP: Callback called with arg: {}'.format(items))
+            except Exception:  # A failing callback must not stop the worker
+                CBPLOG.exception('CBP: Callback failed for: {}'.format(items))
+
+    def stop(self):
+        """Stop the dispatcher and the workers, waiting only for the callbacks
+        in progress
+        """
+        CBPLOG.debug('CBP: Stop requested')
+        self._stop_event.set()
+        if self.is_alive():
+            # The sentinel must get in, also if the queue is a full bounded
+            # queue
+            with self.queue.mutex:
+                self.queue.queue.append(CALLBACK_SENTINEL)
+                self.queue.unfinished_tasks += 1
+                self.queue.not_empty.notify()
+            self.join()
+            for worker in self._workers:
+                worker.join()
+        CBPLOG.info('CBP: Stopped')
+
+
 class PortStillReserved(Exception):
     """Custom exception to explain socket server port still reserved even after
     closing the port
@@ -1143,6 +3856,12 @@ class LiveUDPHandler(SocketServer.BaseRequestHandler):
         :param sane_interval: Return the sane interval with which new data can
             be expected to be available
         :param name: Return the name of the socket server
+        :param data_since#S: Return only the points that has been set after
+            the sequence number ``S`` as a :py:class:`dict` on the form
+            ``{"sequence": S_new, "data": {codename: [x, y]}}`` contained in
+            a :py:mod:`json` string, where ``S_new`` is the sequence number
+            to use in the next request. Use ``data_since#-1`` to get all
+            points.
         """
         # pylint: disable=attribute-defined-outside-init
         command = self.request[0]
@@ -1151,23 +3870,64 @@ class LiveUDPHandler(SocketServer.BaseRequestHandler):
         LUHLOG.debug('Request \'{}\' received from {} on port {}'
                      .format(command, self.client_address, self.port))
 
-        if command == 'data':
-            points = []
-            for codename in DATA[self.port]['codenames']:
-                points.append(DATA[self.port]['data'][codename])
-            data = json.dumps(points)
-        elif command == 'codenames':
-            data = json.dumps(DATA[self.port]['codenames'])
-        elif command == 'sane_interval':
-            data = json.dumps(DATA[self.port]['sane_interval'])
-        elif command == 'name':
-            data = json.dumps(DATA[self.port]['name'])
-        else:
-            data = UNKNOWN_COMMAND
-
+        tag, command = split_tag(command)
+        data = tag + self._reply(command)
         sock.sendto(data, self.client_address)
         LUHLOG.debug('Sent back: \'{}\''.format(data))
 
+    def _reply(self, command):
+        """Return the reply for command
+
+        Args:
+            command (str): Complete command
+
+        Returns:
+            str: The data as a json string (or an error) to be sent back
+        """
+        with DATA[self.port]['lock']:
+            if 'sync' in DATA[self.port]:
+                DATA[self.port]['sync']()
+            if command == 'data':
+                points = []
+                for codename in DATA[self.port]['codenames']:
+                    points.append(DATA[self.port]['data'][codename])
+                data = json.dumps(points)
+            elif command == 'codenames':
+                data = json.dumps(DATA[self.port]['codenames'])
+            elif command == 'sane_interval':
+                data = json.dumps(DATA[self.port]['sane_interval'])
+            elif command == 'name':
+                data = json.dumps(DATA[self.port]['name'])
+            elif command.startswith('data_since#'):
+                data = self._data_since(command.split('#', 1)[1])
+            else:
+                data = UNKNOWN_COMMAND
+        return data
+
+    def _data_since(self, since):
+        """Return the points set after the sequence number since as json
+
+        Args:
+            since (str): The sequence number
+
+        Returns:
+            str: The data as a json string (or an error) to be sent back
+        """
+        try:
+            since = int(since)
+        except ValueError:
+            return UNKNOWN_COMMAND
+        # A since above the current sequence number is from before a
+        # restart of the server, so the client gets all the points
+        if since > DATA[self.port]['sequence']:
+            since = -1
+        changed = {}
+        for codename, sequence in DATA[self.port]['sequences'].items():
+            if sequence > since:
+                changed[codename] = DATA[self.port]['data'][codename]
+        return json.dumps({'sequence': DATA[self.port]['sequence'],
+                           'data': changed})
+
 
 LSLOG = logging.getLogger(__name__ + '.LiveSocket')
 LSLOG.addHandler(logging.NullHandler())
@@ -1177,12 +3937,34 @@ class LiveSocket(CommonDataPullSocket):
     """This class implements a Live Socket"""
 
     def __init__(self, name, codenames, sane_interval, port=8000,
-                 default_x=0, default_y=47):
+                 default_x=0, default_y=47, **kwargs):
+        """Initialize the live socket
 
+        Args:
+            name (str): The name of the socket server
+            codenames (list): The codenames for the measurements
+            sane_interval (float): The interval in seconds the clients should
+                poll with
+            port (int): The port to start the socket server on
+            default_x (float): The default x value
+            default_y (float): The default y value
+            kwargs: The keyword arguments of :class:`.CommonDataPullSocket`
+                in :data:`.LIVE_SOCKET_OPTIONS`, e.g. ``serving_mode``
+
+        Raises:
+            ValueError: On keyword arguments that the live socket does not
+                support
+        """
         LSLOG.info('Initialize with: {}'.format(call_spec_string()))
+        unsupported = sorted(set(kwargs) - set(LIVE_SOCKET_OPTIONS))
+        if unsupported:
+            message = 'Unsupported arguments for the live socket: {}. Use '\
+                'only: {}'.format(unsupported, LIVE_SOCKET_OPTIONS)
+            LSLOG.error(message)
+            raise ValueError(message)
         super(LiveSocket, self).__init__(
             name, codenames, port, default_x, default_y, None,
-            init_timeouts=False, handler_class=LiveUDPHandler
+            init_timeouts=False, handler_class=LiveUDPHandler, **kwargs
         )
         # Set the type and the the sane_interval
         DATA[port]['type'] = 'live'
@@ -1192,6 +3974,7 @@ class LiveSocket(CommonDataPullSocket):
         DATA[port]['last_served'] = {}
         for codename in codenames:
             DATA[port]['last_served'][codename] = (default_x, default_y)
+        self._restore_snapshot()
         LSLOG.debug('Initilized')
 
     def set_point_now(self, codename, value):
@@ -1221,10 +4004,418 @@ class LiveSocket(CommonDataPullSocket):
                 DATA[self.port]['codenames']
             )
             raise ValueError(message)
-        DATA[self.port]['data'][codename] = tuple(point)
+        with DATA[self.port]['lock']:
+            DATA[self.port]['data'][codename] = tuple(point)
+            self._point_updated(codename)
         LSLOG.debug('Point {} for \'{}\' set'.format(tuple(point), codename))
 
 
+CLIENTLOG = logging.getLogger(__name__ + '.SocketClient')
+CLIENTLOG.addHandler(logging.NullHandler())
+
+
+class SocketClient(object):
+    """Client for the pull, push and live socket servers
+
+    The client keeps one UDP socket per remote socket server and tags each
+    request (see :func:`.split_tag`), so that late replies to earlier
+    requests are recognized and discarded. Requests that are not answered
+    within the timeout are retried with exponential backoff.
+
+    Servers without support for request tags answer a tagged request as an
+    unknown command. The client then falls back to untagged requests for that
+    server and matches each reply to the oldest request that is still
+    pending, so for those servers a late reply may be taken as the reply to
+    a later request.
+
+    .. code-block:: python
+
+        client = SocketClient(timeout=0.5, retries=2)
+        points = client.json('rasppi12', 9000, 'json_wn')
+        replies = client.fetch_many([('rasppi12', 9000, 'json_wn'),
+                                     ('rasppi47', 9000, 'json_wn')],
+                                    deadline=1.0)
+        client.close()
+
+    .. note:: The client is not thread safe. Use one client per thread.
+    """
+
+    def __init__(self, timeout=1.0, retries=2, backoff=0.05,
+                 buffer_size=65535):
+        """Initialize the client
+
+        Args:
+            timeout (float): The time in seconds to wait for a reply before
+                retrying
+            retries (int): The number of retries before giving up
+            backoff (float): The wait before the first retry in seconds. It
+                is doubled for each retry.
+            buffer_size (int): The maximum size of a reply
+        """
+        CLIENTLOG.info('Initialize with: {}'.format(call_spec_string()))
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.buffer_size = buffer_size
+        # (host, port) -> (socket, resolved address)
+        self._sockets = {}
+        # (host, port) of the servers without request tag support
+        self._untagged = set()
+        self._tag = 0
+
+    def _socket(self, host, port):
+        """Return the socket and resolved address for a remote"""
+        if (host, port) not in self._sockets:
+            address = (socket.gethostbyname(host), port)
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._sockets[(host, port)] = (sock, address)
+        return self._sockets[(host, port)]
+
+    def _next_tag(self):
+        """Return a new request tag"""
+        self._tag += 1
+        return '@{} '.format(self._tag)
+
+    def request(self, host, port, command, timeout=None, retries=None):
+        """Send a request and return the reply
+
+        Args:
+            host (str): The host name or IP address of the socket server
+            port (int): The port of the socket server
+            command (str): The command
+            timeout (float): Override of the timeout
+            retries (int): Override of the number of retries
+
+        Returns:
+            str: The reply without the tag
+
+        Raises:
+            socket.timeout: If there was no reply after all retries
+        """
+        return self.fetch_many([(host, port, command)], timeout=timeout,
+                               retries=retries, deadline=None,
+                               raise_on_timeout=True)[0]
+
+    # pylint: disable=too-many-arguments,too-many-locals,too-many-branches
+    def fetch_many(self, requests, deadline=1.0, timeout=None, retries=None,
+                   raise_on_timeout=False):
+        """Send many requests concurrently and return the replies
+
+        All requests are sent at once, and those that are not answered within
+        the timeout are retried, until all are answered, the retries are used
+        or the deadline has passed. The host names are resolved before the
+        deadline starts, and a host that cannot be resolved only fails its
+        own requests.
+
+        Args:
+            requests (list): List of ``(host, port, command)``
+            deadline (float): The maximum total time in seconds. None means
+                that only the timeout and retries limit the time.
+            timeout (float): Override of the timeout
+            retries (int): Override of the number of retries
+            raise_on_timeout (bool): Whether to raise, rather than return
+                None, for requests that were not answered or whose host could
+                not be resolved
+
+        Returns:
+            list: The replies, without the tags, in the order of the requests.
+                None for requests that were not answered or whose host could
+                not be resolved.
+
+        Raises:
+            socket.error: If raise_on_timeout and a host could not be resolved
+            socket.timeout: If raise_on_timeout and a request was not
+                answered
+        """
+        timeout = self.timeout if timeout is None else timeout
+        retries = self.retries if retries is None else retries
+        replies = [None] * len(requests)
+        # Request index -> (socket, resolved address)
+        remotes = {}
+        # Request index -> resolve error
+        errors = {}
+        for index, (host, port, _) in enumerate(requests):
+            try:
+                remotes[index] = self._socket(host, port)
+            except socket.error as exception:
+                CLIENTLOG.warning('Could not resolve {}: {}'.format(
+                    host, exception))
+                errors[index] = exception
+        # socket -> (host, port)
+        socket_remotes = {remotes[index][0]: requests[index][:2]
+                          for index in remotes}
+
+        start = time.time()
+        end = None if deadline is None else start + deadline
+        # Request index -> [attempts, time of next send]
+        pending = {index: [0, start] for index in remotes}
+        # socket -> {tag: request index}
+        tags = {}
+        # socket -> request indexes sent without a tag, oldest first
+        untagged = {}
+
+        while pending:
+            now = time.time()
+            if end is not None and now >= end:
+                break
+            # Send the requests that are due
+            for index, state in pending.items():
+                if state[1] > now:
+                    continue
+                if state[0] > retries:
+                    del pending[index]
+                    continue
+                command = requests[index][2]
+                sock, address = remotes[index]
+                if socket_remotes[sock] in self._untagged:
+                    untagged.setdefault(sock, []).append(index)
+                    sock.sendto(command, address)
+                else:
+                    tag = self._next_tag()
+                    tags.setdefault(sock, {})[tag] = index
+                    sock.sendto(tag + command, address)
+                # The next send is after the timeout and a backoff
+                backoff = self.backoff * 2 ** state[0] if state[0] else 0
+                state[0] += 1
+                state[1] = now + timeout + backoff
+            if not pending:
+                break
+
+            # Wait for replies until the next send is due
+            wait = min(state[1] for state in pending.values()) - time.time()
+            if end is not None:
+                wait = min(wait, end - time.time())
+            readable, _, _ = select.select(list(socket_remotes.keys()), [],
+                                           [], max(wait, 0))
+            for sock in readable:
+                reply = sock.recv(self.buffer_size)
+                tag, reply = split_tag(reply)
+                if tag:
+                    index = tags.get(sock, {}).pop(tag, None)
+                elif socket_remotes[sock] in self._untagged:
+                    index = self._oldest_pending(untagged.get(sock, []),
+                                                 pending)
+                else:
+                    # A server without tag support answers a tagged request
+                    # as an unknown command, so send the pending requests to
+                    # it again without the tags
+                    CLIENTLOG.info('No request tag support on {}:{}'.format(
+                        *socket_remotes[sock]))
+                    self._untagged.add(socket_remotes[sock])
+                    for index, state in pending.items():
+                        if remotes[index][0] is sock:
+                            state[1] = time.time()
+                    continue
+                if index is None or index not in pending:
+                    CLIENTLOG.debug('Discarded late reply: {}'.format(reply))
+                    continue
+                replies[index] = reply
+                del pending[index]
+
+        if raise_on_timeout and errors:
+            raise errors[min(errors)]
+        if raise_on_timeout and None in replies:
+            index = replies.index(None)
+            message = 'No reply to \'{2}\' from {0}:{1}'.format(
+                *requests[index]
+            )
+            CLIENTLOG.warning(message)
+            raise socket.timeout(message)
+        return replies
+
+    @staticmethod
+    def _oldest_pending(indexes, pending):
+        """Pop and return the oldest of the request indexes that is still
+        pending, or None
+        """
+        while indexes:
+            index = indexes.pop(0)
+            if index in pending:
+                return index
+        return None
+
+    def raw(self, host, port, command='raw'):
+        """Request and decode a reply in the raw format
+
+        Returns:
+            list or tuple: List of ``(x, y)`` points for the ``raw`` command
+                or a single point for a ``codename#raw`` command. Points that
+                have timed out are :data:`.OLD_DATA`.
+        """
+        reply = self.request(host, port, command)
+        if reply == UNKNOWN_COMMAND:
+            raise ValueError('Unknown command: {}'.format(command))
+        points = []
+        for part in reply.split(';'):
+            if part == OLD_DATA:
+                points.append(OLD_DATA)
+            else:
+                points.append(tuple(float(value) for value
+                                    in part.split(',')))
+        if '#' in command:
+            return points[0]
+        return points
+
+    def json(self, host, port, command='json'):
+        """Request and decode a reply in the json format"""
+        reply = self.request(host, port, command)
+        if reply == UNKNOWN_COMMAND:
+            raise ValueError('Unknown command: {}'.format(command))
+        return json.loads(reply)
+
+    def bin(self, host, port, command='bin', codenames=None):
+        """Request and decode a reply in the binary format, see
+        :func:`.decode_bin`
+        """
+        reply = self.request(host, port, command)
+        if reply == UNKNOWN_COMMAND:
+            raise ValueError('Unknown command: {}'.format(command))
+        return decode_bin(reply, codenames)
+
+    def push(self, host, port, data):
+        """Push a data set to a :class:`.DataPushSocket`
+
+        Args:
+            data (dict): The data set
+
+        Returns:
+            str: The reply, e.g. ``'ACK#...'``
+        """
+        return self.request(host, port,
+                            'json_wn#{}'.format(json.dumps(data)))
+
+    def close(self):
+        """Close the sockets"""
+        for sock, _ in self._sockets.values():
+            sock.close()
+        self._sockets.clear()
+
+
+PROTLOG = logging.getLogger(__name__ + '.protocols')
+PROTLOG.addHandler(logging.NullHandler())
+
+
+class CommonDatagramProtocol(object):
+    """Common implementation of the datagram protocol interface, i.e. the
+    interface of :py:class:`asyncio.DatagramProtocol`, for the
+    :class:`.PullProtocol`, :class:`.PushProtocol` and :class:`.LiveProtocol`
+    classes.
+
+    The protocol classes use the same command handling as the corresponding
+    request handlers, but are driven by an event loop instead of a
+    ``SocketServer`` server. To use them, instantiate the socket server as
+    usual (which initializes :data:`.DATA` and binds the socket), but do
+    **not** start it. Instead, let the event loop read from its socket and
+    call the protocol:
+
+    .. code-block:: python
+
+        pull_socket = DateDataPullSocket(name, codenames)
+        protocol = PullProtocol(pull_socket.port)
+        protocol.connection_made(transport)
+        ...
+        protocol.datagram_received(data, addr)
+
+    Any event loop that calls :meth:`.connection_made` with a transport that
+    has a ``sendto(data, addr)`` method and :meth:`.datagram_received` for
+    each datagram can be used.
+
+    .. note:: Unlike the request handlers, the protocols are constructed with
+        only the port of an existing socket server, since that socket server
+        is what initializes :data:`.DATA` and binds the socket.
+    """
+
+    def __init__(self, port):
+        """Initialize the protocol
+
+        Args:
+            port (int): The port of the socket server whose data should be
+                served, i.e. the key in :data:`.DATA`
+        """
+        PROTLOG.info('Initialize with: {}'.format(call_spec_string()))
+        if port not in DATA:
+            message = 'No socket server has been initialized on port: {}'\
+                .format(port)
+            PROTLOG.error(message)
+            raise ValueError(message)
+        self.port = port
+        self.transport = None
+
+    def connection_made(self, transport):
+        """Store the transport the replies are sent with"""
+        PROTLOG.debug('Connection made on port {}'.format(self.port))
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        """Handle the request in data and send the reply back to addr"""
+        # pylint: disable=no-member,attribute-defined-outside-init
+        # Some commands, e.g. subscribe, needs the client address
+        self.client_address = addr
+        tag, data = split_tag(data)
+        reply = tag + self._reply(data)
+        self.transport.sendto(reply, addr)
+        PROTLOG.debug('Sent back \'{}\' to {}'.format(reply, addr))
+
+    def error_received(self, exc):  # pylint: disable=no-self-use
+        """Log errors from the transport"""
+        PROTLOG.warning('Error received: {}'.format(exc))
+
+    def connection_lost(self, exc):
+        """Forget the transport"""
+        PROTLOG.debug('Connection lost: {}'.format(exc))
+        self.transport = None
+
+
+class PullProtocol(CommonDatagramProtocol, PullUDPHandler):
+    """Datagram protocol for the :class:`.DateDataPullSocket` and
+    :class:`.DataPullSocket` socket servers. The commands are the same as for
+    the :class:`.PullUDPHandler`. See :class:`.CommonDatagramProtocol` for
+    usage.
+    """
+
+
+class PushProtocol(CommonDatagramProtocol, PushUDPHandler):
+    """Datagram protocol for the :class:`.DataPushSocket` socket server. The
+    commands are the same as for the :class:`.PushUDPHandler`. See
+    :class:`.CommonDatagramProtocol` for usage.
+
+    With the ``'callback_async'`` action, the callbacks are called by the
+    protocol in the event loop after the reply has been sent, so the
+    :class:`.CallBackThread` of the socket server is not used. The callback
+    is called directly in the loop and should therefore be fast.
+    """
+
+    def datagram_received(self, data, addr):
+        """Handle the request in data, send the reply back to addr and make
+        the asynchronous callbacks
+        """
+        CommonDatagramProtocol.datagram_received(self, data, addr)
+        if DATA[self.port]['action'] == 'callback_async':
+            self._call_back()
+
+    def _call_back(self):
+        """Call the callback for all data sets in the queue"""
+        queue = DATA[self.port]['queue']
+        callback = DATA[self.port]['callback']
+        while True:
+            try:
+                item = queue.get_nowait()
+            except Queue.Empty:
+                break
+            # pylint: disable=broad-except
+            try:
+                callback(item)
+            except Exception:  # The event loop must keep running
+                PROTLOG.exception('Callback failed for: {}'.format(item))
+
+
+class LiveProtocol(CommonDatagramProtocol, LiveUDPHandler):
+    """Datagram protocol for the :class:`.LiveSocket` socket server. The
+    commands are the same as for the :class:`.LiveUDPHandler`. See
+    :class:`.CommonDatagramProtocol` for usage.
+    """
+
+
 ### Module variables
 #: The list of characters that are not allowed in code names
 BAD_CHARS = ['#', ',', ';', ':', '&']
@@ -1232,6 +4423,61 @@ BAD_CHARS = ['#', ',', ';', ':', '&']
 UNKNOWN_COMMAND = 'UNKNOWN_COMMMAND'
 #: The string used to indicate old or obsoleted data
 OLD_DATA = 'OLD_DATA'
+#: The serving modes for the socket servers, see :func:`.make_udp_server`
+SERVING_MODES = ['serial', 'pool', 'thread']
+#: The keyword arguments of :class:`.CommonDataPullSocket` that the
+#: :class:`.LiveSocket` supports
+LIVE_SOCKET_OPTIONS = ['serving_mode', 'workers', 'max_in_flight', 'reactor',
+                       'snapshot_file', 'snapshot_interval']
+#: The pull socket commands whose responses are cached
+CACHED_COMMANDS = ['raw', 'json', 'raw_wn', 'json_wn', 'bin']
+#: The magic bytes that start the binary pull socket format
+BIN_MAGIC = 'PB'
+#: The version of the binary pull socket format
+BIN_VERSION = 1
+#: The struct for the header of the binary format, see :func:`.encode_bin`
+BIN_HEADER = struct.Struct('>2sBBH')
+#: The struct for an entry of the binary format, see :func:`.encode_bin`
+BIN_ENTRY = struct.Struct('>HBdd')
+#: Binary format entry status for a valid point
+BIN_OK = 0
+#: Binary format entry status for data that has timed out
+BIN_OLD_DATA = 1
+#: Binary format entry status for a point that is not numbers
+BIN_NOT_NUMBER = 2
+NAN = float('nan')
+#: The header of the frames of the stream endpoint; flags and payload length
+STREAM_HEADER = struct.Struct('>BI')
+#: Stream frame flag for a zlib compressed payload
+STREAM_ZLIB = 1
+#: Stream frame flag for a request whose reply may be compressed
+STREAM_ACCEPT_ZLIB = 2
+#: Replies larger than this number of bytes are compressed, if accepted
+STREAM_COMPRESS_THRESHOLD = 1024
+#: The maximum size of a stream frame
+STREAM_MAX_FRAME = 16 * 1024 ** 2
+#: The magic string and version of the :class:`.SocketSnapshot` format
+SNAPSHOT_MAGIC = 'PLSS'
+SNAPSHOT_VERSION = 1
+#: The snapshot header; magic, version and the index of the active buffer
+SNAPSHOT_HEADER = struct.Struct('<4sHBx')
+#: The snapshot buffer header; length and CRC32 of the json encoded state
+SNAPSHOT_BUFFER_HEADER = struct.Struct('<II')
+#: The magic string and version of the :class:`.SharedDataStore` format
+STORE_MAGIC = 'PLSD'
+STORE_VERSION = 2
+#: The store header; magic, version, number of codenames and the size of the
+#: json encoded codenames that follows the header
+STORE_HEADER = struct.Struct('<4sHII')
+#: A store slot; sequence number, x, y, timestamp and the CRC32 checksum of
+#: the four
+STORE_SLOT = struct.Struct('<QdddQ')
+STORE_SEQUENCE = struct.Struct('<Q')
+STORE_VALUES = struct.Struct('<ddd')
+STORE_CHECKSUM = struct.Struct('<Q')
+#: The number of attempts a :class:`.SharedDataStore` reader makes to read a
+#: slot, before it gives up
+STORE_READ_RETRIES = 1000
 #: The answer prefix used when a push failed
 PUSH_ERROR = 'ERROR'
 #: The answer prefix used when a push succeds
@@ -1241,6 +4487,15 @@ PUSH_ACK = 'ACK'
 PUSH_EXCEP = 'EXCEP'
 #: The answer prefix for a callback return value
 PUSH_RET = 'RET'
+#: The answer prefix for when data sets were dropped because the queue was
+#: full
+PUSH_OVERFLOW = 'OVERFLOW'
+#: The overflow policies of the :class:`.BoundedQueue`
+OVERFLOW_POLICIES = ['drop_oldest', 'drop_newest', 'coalesce', 'block']
+#: The sentinel that stops the :class:`.CallBackPool` threads
+CALLBACK_SENTINEL = object()
+#: The prefix for the updates a pull socket pushes to its subscribers
+SUBSCRIPTION_PUSH = 'PUSH'
 #:The variable used to contain all the data.
 #:
 #:The format of the DATA variable is the following. The DATA variable is a
@@ -1262,3 +4517,5 @@ DATA = {}
 #: The dict that transforms strings to convertion functions
 TYPE_FROM_STRING = {'int': int, 'float': float, 'str': str,
                     'bool': bool_translate}
+#: The :py:mod:`struct` formats for the types in packed schema data
+STRUCT_FORMATS = {'int': 'q', 'float': 'd', 'bool': '?'}
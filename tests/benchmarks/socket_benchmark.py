@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+"""Load generation benchmark for the socket servers
+
+This module starts one of the socket servers from
+:py:mod:`PyExpLabSys.common.sockets` on the loopback interface, drives it
+with a number of concurrent clients and reports the throughput and the
+latency percentiles as json, so that changes to the hot path of the socket
+servers can be tracked over time. Use it from the command line e.g. as::
+
+    python socket_benchmark.py --server date --clients 4 --codenames 8 \\
+        --mix raw:2,json_wn:1,codename#json:1 --requests 2000 \\
+        --serving-mode pool --reactor
+
+The clients are run in separate processes, so that they do not compete with
+the server for the interpreter lock. The file is deliberately not named
+test_*, so that it is not picked up by pytest.
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+import json
+import random
+import socket
+import argparse
+import multiprocessing
+
+from PyExpLabSys.common.sockets import DataPullSocket, DateDataPullSocket,\
+    DataPushSocket, Reactor, split_tag, SERVING_MODES, UNKNOWN_COMMAND
+
+# Module variables
+HOST = '127.0.0.1'
+NAME = 'Socket benchmark'
+#: The server types that can be benchmarked
+SERVERS = {
+    'data': DataPullSocket,
+    'date': DateDataPullSocket,
+    'push': DataPushSocket,
+}
+#: The commands each server type understands
+COMMANDS = {
+    'data': ('raw', 'json_wn', 'codename#json', 'codename#raw'),
+    'date': ('raw', 'json_wn', 'codename#json', 'codename#raw'),
+    'push': ('json_wn#', 'raw_wn#'),
+}
+#: The default command mix for each server type
+DEFAULT_MIX = {
+    'data': 'raw:1,json_wn:1,codename#json:1',
+    'date': 'raw:1,json_wn:1,codename#json:1',
+    'push': 'json_wn#:1',
+}
+
+
+def parse_mix(mix, server):
+    """Parse a command mix on the form 'command:weight,command:weight'
+
+    Args:
+        mix (str): The command mix. A weight may be left out, in which case
+            it is 1
+        server (str): The server type the mix is meant for
+
+    Returns:
+        list: List of (command, weight) tuples
+
+    Raises:
+        ValueError: On unknown commands or bad weights
+    """
+    parsed = []
+    for item in mix.split(','):
+        command, _, weight = item.partition(':')
+        weight = weight or '1'
+        if command not in COMMANDS[server]:
+            message = 'Unknown command \'{}\' for server type \'{}\'. Use '\
+                'one of: {}'.format(command, server, COMMANDS[server])
+            raise ValueError(message)
+        weight = int(weight)
+        if weight < 1:
+            raise ValueError('The weight of a command must be at least 1')
+        parsed.append((command, weight))
+    return parsed
+
+
+def make_requests(mix, codenames, number):
+    """Form a shuffled list of requests from a command mix
+
+    Args:
+        mix (list): List of (command, weight) tuples as returned by
+            :py:func:`parse_mix`
+        codenames (list): The codenames of the server
+        number (int): The number of requests to form
+
+    Returns:
+        list: The requests
+    """
+    weighted = []
+    for command, weight in mix:
+        weighted += [command] * weight
+    requests = []
+    for index in range(number):
+        command = weighted[index % len(weighted)]
+        codename = codenames[index % len(codenames)]
+        if command.startswith('codename#'):
+            requests.append(command.replace('codename', codename, 1))
+        elif command == 'json_wn#':
+            values = {name: float(index) for name in codenames}
+            requests.append(command + json.dumps(values))
+        elif command == 'raw_wn#':
+            values = ['{}:float:{}'.format(name, index) for name in codenames]
+            requests.append(command + ';'.join(values))
+        else:
+            requests.append(command)
+    random.shuffle(requests)
+    return requests
+
+
+def start_server(server, codenames, port, serving_mode='serial',
+                 reactor=None):
+    """Start a socket server of the server type on port
+
+    Args:
+        server (str): The server type, one of the keys in :py:data:`SERVERS`
+        codenames (list): The codenames for the pull servers
+        port (int): The port
+        serving_mode (str): The serving mode, one of
+            :py:data:`PyExpLabSys.common.sockets.SERVING_MODES`
+        reactor (Reactor): The reactor to serve the requests in, if any
+
+    Returns:
+        object: The started socket server
+    """
+    kwargs = {'port': port, 'serving_mode': serving_mode, 'reactor': reactor}
+    if server == 'push':
+        socket_server = DataPushSocket(NAME, **kwargs)
+    else:
+        socket_server = SERVERS[server](NAME, codenames, **kwargs)
+        for codename in codenames:
+            socket_server.set_point(codename, (time.time(), 47.0))
+    socket_server.start()
+    # Give the server thread time to start serving
+    time.sleep(0.1)
+    return socket_server
+
+
+def run_client(port, requests, timeout, results):
+    """Send the requests one at a time and record the latencies
+
+    This is the target function of the client processes. Each request is
+    tagged (see :py:func:`PyExpLabSys.common.sockets.split_tag`), so that a
+    late reply to a request that timed out is not taken as the reply to the
+    next one.
+
+    Args:
+        port (int): The port of the server
+        requests (list): The requests to send
+        timeout (float): The timeout for each request in seconds
+        results (multiprocessing.Queue): Queue to put the tuple of the list
+            of latencies in seconds of the successful replies, the number of
+            errors (time outs and error replies) and the number of late
+            replies in
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    latencies = []
+    errors = 0
+    late = 0
+    for number, request in enumerate(requests):
+        tag = '@{} '.format(number)
+        start = time.time()
+        sock.sendto(tag + request, (HOST, port))
+        # Receive until the reply with the tag of this request arrives
+        while True:
+            remaining = start + timeout - time.time()
+            if remaining <= 0:
+                reply = None
+                break
+            sock.settimeout(remaining)
+            try:
+                reply, _ = sock.recvfrom(65535)
+            except socket.timeout:
+                reply = None
+                break
+            reply_tag, reply = split_tag(reply)
+            if reply_tag == tag:
+                break
+            late += 1
+        if reply is None:
+            errors += 1
+        elif reply == UNKNOWN_COMMAND or reply.startswith('ERROR'):
+            errors += 1
+        else:
+            latencies.append(time.time() - start)
+    sock.close()
+    results.put((latencies, errors, late))
+
+
+def percentile(sorted_values, percent):
+    """Return the nearest rank percentile of a sorted list
+
+    Args:
+        sorted_values (list): The sorted values
+        percent (float): The percentile (0-100)
+
+    Returns:
+        float: The percentile or None if there are no values
+    """
+    if not sorted_values:
+        return None
+    rank = int(round(percent / 100.0 * len(sorted_values) + 0.5)) - 1
+    return sorted_values[min(max(rank, 0), len(sorted_values) - 1)]
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+def benchmark(server='date', clients=1, mix=None, codenames=1,
+              requests=1000, port=9100, timeout=1.0, serving_mode='serial',
+              reactor=False):
+    """Benchmark a socket server
+
+    Args:
+        server (str): The server type, one of the keys in :py:data:`SERVERS`
+        clients (int): The number of concurrent clients
+        mix (str): The command mix as described in :py:func:`parse_mix`.
+            Defaults to the server type entry in :py:data:`DEFAULT_MIX`
+        codenames (int): The number of codenames
+        requests (int): The number of requests to send from each client
+        port (int): The port to start the server on
+        timeout (float): The timeout for each request in seconds
+        serving_mode (str): The serving mode of the server, one of
+            :py:data:`PyExpLabSys.common.sockets.SERVING_MODES`
+        reactor (bool): Whether to serve the requests in a
+            :py:class:`PyExpLabSys.common.sockets.Reactor`
+
+    Returns:
+        dict: The benchmark settings and results. The latencies are in ms
+            and only for the successful replies
+    """
+    if server not in SERVERS:
+        message = 'Unknown server type \'{}\'. Use one of: {}'.format(
+            server, sorted(SERVERS.keys()))
+        raise ValueError(message)
+    if serving_mode not in SERVING_MODES:
+        message = 'Unknown serving mode \'{}\'. Use one of: {}'.format(
+            serving_mode, SERVING_MODES)
+        raise ValueError(message)
+    if mix is None:
+        mix = DEFAULT_MIX[server]
+    parsed_mix = parse_mix(mix, server)
+    names = ['codename{}'.format(index) for index in range(codenames)]
+
+    socket_reactor = None
+    if reactor:
+        socket_reactor = Reactor()
+        socket_reactor.start()
+    socket_server = start_server(server, names, port, serving_mode,
+                                 socket_reactor)
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(
+            target=run_client,
+            args=(port, make_requests(parsed_mix, names, requests), timeout,
+                  results)
+        ) for _ in range(clients)
+    ]
+    try:
+        start = time.time()
+        for process in processes:
+            process.start()
+        # Empty the queue before joining, so the processes can exit
+        outcomes = [results.get() for _ in processes]
+        duration = time.time() - start
+        for process in processes:
+            process.join()
+    finally:
+        socket_server.stop()
+        if socket_reactor is not None:
+            socket_reactor.stop()
+
+    latencies = sorted(latency for outcome in outcomes
+                       for latency in outcome[0])
+    errors = sum(outcome[1] for outcome in outcomes)
+    late = sum(outcome[2] for outcome in outcomes)
+
+    def as_ms(value):
+        """Convert seconds to ms"""
+        return None if value is None else value * 1000.0
+
+    return {
+        'server': server,
+        'serving_mode': serving_mode,
+        'reactor': reactor,
+        'clients': clients,
+        'mix': mix,
+        'codenames': codenames,
+        'requests': requests * clients,
+        'replies': len(latencies),
+        'errors': errors,
+        'late_replies': late,
+        'duration': duration,
+        'throughput': len(latencies) / duration,
+        'latency_ms': {
+            'mean': as_ms(sum(latencies) / len(latencies)
+                          if latencies else None),
+            'p50': as_ms(percentile(latencies, 50)),
+            'p90': as_ms(percentile(latencies, 90)),
+            'p99': as_ms(percentile(latencies, 99)),
+            'max': as_ms(latencies[-1] if latencies else None),
+        },
+        'python': sys.version.split()[0],
+    }
+
+
+def main(args=None):
+    """Parse the command line arguments, run the benchmark and print json"""
+    parser = argparse.ArgumentParser(
+        description='Benchmark the PyExpLabSys socket servers on loopback')
+    parser.add_argument('--server', choices=sorted(SERVERS.keys()),
+                        default='date', help='the server type to benchmark')
+    parser.add_argument('--serving-mode', choices=SERVING_MODES,
+                        default='serial',
+                        help='the serving mode of the server')
+    parser.add_argument('--reactor', action='store_true',
+                        help='serve the requests in a reactor')
+    parser.add_argument('--clients', type=int, default=1,
+                        help='the number of concurrent clients')
+    parser.add_argument('--mix', default=None,
+                        help='the command mix as "command:weight,...", '
+                        'commands are: ' + '; '.join(
+                            '{}: {}'.format(key, ', '.join(value))
+                            for key, value in sorted(COMMANDS.items())))
+    parser.add_argument('--codenames', type=int, default=1,
+                        help='the number of codenames')
+    parser.add_argument('--requests', type=int, default=1000,
+                        help='the number of requests per client')
+    parser.add_argument('--port', type=int, default=9100,
+                        help='the port to start the server on')
+    parser.add_argument('--timeout', type=float, default=1.0,
+                        help='the timeout for each request in seconds')
+    parser.add_argument('--output', default=None,
+                        help='file to append the json result to as one line')
+    args = parser.parse_args(args)
+
+    try:
+        result = benchmark(args.server, args.clients, args.mix,
+                           args.codenames, args.requests, args.port,
+                           args.timeout, args.serving_mode, args.reactor)
+    except ValueError as exception:
+        parser.error(str(exception))
+    print(json.dumps(result, indent=4, sort_keys=True))
+    if args.output is not None:
+        with open(args.output, 'a') as file_:
+            file_.write(json.dumps(result, sort_keys=True) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -10,4 +10,21 @@ def sock():
     """Client socket fixture"""
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     yield sock
-    sock.close()
\ No newline at end of file
+    sock.close()
+
+
+class FakeTransport(object):
+    """Transport that records what is sent, for testing datagram protocols"""
+
+    def __init__(self):
+        self.sent = []
+
+    def sendto(self, data, addr):
+        """Record the data and address"""
+        self.sent.append((data, addr))
+
+
+@pytest.fixture
+def transport():
+    """Fake datagram transport fixture"""
+    return FakeTransport()
@@ -101,3 +101,84 @@ def test_enqueue_point():
             # Time is rounded, so it is only correct to within ~0.5 s
             assert(abs(point_original[0]-point_control[0]) < 0.51)
             assert(abs(point_original[1]-point_control[1]) < 1E-12)
+
+
+def test_batched_insert():
+    """Test that points sent in several batches all end up in the database"""
+    db_logger = loggers.ContinuousLogger('dateplots_dummy', 'dummy', 'dummy',
+                                         ['dummy_sine_one'], batch_size=4,
+                                         max_latency=0.5)
+    db_logger.start()
+    data = []
+    time_start = time.time()
+    for index in range(10):
+        time_ = time_start + index
+        point = math.sin(time_)
+        data.append([time_, point])
+        db_logger.enqueue_point('dummy_sine_one', time_, point)
+    time.sleep(1)
+    db_logger.stop()
+
+    code = db_logger._codename_translation['dummy_sine_one']
+    query = 'SELECT UNIX_TIMESTAMP(time), value FROM dateplots_dummy '\
+        'WHERE time > FROM_UNIXTIME({}) and type={} ORDER BY time'\
+            .format(time_start - 1, code)
+    CURSOR.execute(query)
+    fetched = CURSOR.fetchall()
+    assert(len(fetched) == len(data))
+    for point_original, point_control in zip(data, fetched):
+        assert(abs(point_original[0]-point_control[0]) < 0.51)
+        assert(abs(point_original[1]-point_control[1]) < 1E-12)
+
+
+def test_bad_point():
+    """Test that a point the database refuses does not hold back the others"""
+    db_logger = loggers.ContinuousLogger('dateplots_dummy', 'dummy', 'dummy',
+                                         ['dummy_sine_one'], batch_size=10,
+                                         max_latency=0.5)
+    db_logger.start()
+    time_start = time.time()
+    for index, point in enumerate((1.0, float('nan'), 3.0)):
+        db_logger.enqueue_point('dummy_sine_one', time_start + index, point)
+    time.sleep(1)
+    db_logger.stop()
+    assert(db_logger.dropped_points == 1)
+
+    code = db_logger._codename_translation['dummy_sine_one']
+    query = 'SELECT value FROM dateplots_dummy WHERE time > '\
+        'FROM_UNIXTIME({}) and type={} ORDER BY time'\
+            .format(time_start - 1, code)
+    CURSOR.execute(query)
+    assert([point[0] for point in CURSOR.fetchall()] == [1.0, 3.0])
+
+
+def test_rollup_logger():
+    """Test that the rollup logger logs the mean and max of each bucket"""
+    db_logger = loggers.RollupLogger(
+        'dateplots_dummy', 'dummy', 'dummy', ['dummy_sine_one'], bucket=10,
+        siblings={'dummy_sine_one': {'max': 'dummy_sine_two'}}
+    )
+    db_logger.start()
+    # Two buckets with three samples each, in the past
+    time_start = math.floor(time.time() / 10) * 10 - 100
+    for offset, value in ((1, 1.0), (2, 2.0), (3, 6.0),
+                          (11, 4.0), (12, 4.0), (13, 4.0)):
+        db_logger.enqueue_point('dummy_sine_one', time_start + offset, value)
+    # A late sample for the first bucket is dropped
+    db_logger.enqueue_point('dummy_sine_one', time_start + 4, 47.0)
+    assert(db_logger.late_samples == 1)
+    time.sleep(1)
+    db_logger.stop()
+
+    for codename, expected in (('dummy_sine_one', [3.0, 4.0]),
+                               ('dummy_sine_two', [6.0, 4.0])):
+        code = db_logger._codename_translation[codename]
+        query = 'SELECT UNIX_TIMESTAMP(time), value FROM dateplots_dummy '\
+            'WHERE time >= FROM_UNIXTIME({}) and time < FROM_UNIXTIME({}) '\
+            'and type={} ORDER BY time'.format(time_start, time_start + 20,
+                                               code)
+        CURSOR.execute(query)
+        fetched = CURSOR.fetchall()
+        assert([point[0] for point in fetched] ==
+               [time_start + 5, time_start + 15])
+        assert([point[1] for point in fetched] == expected)
@@ -3,14 +3,18 @@
 
 import Queue
 import time
+import struct
 import json
 import ast
 import threading
+import socket
 import SocketServer
 # Allow for fast restart of a socket on a port for test purposes
 SocketServer.UDPServer.allow_reuse_address = True
 import pytest
 from PyExpLabSys.common.sockets import DataPushSocket, CallBackThread
+from PyExpLabSys.common.sockets import PushProtocol, CallBackPool
+from PyExpLabSys.common.sockets import SocketClient
 import PyExpLabSys.common.sockets
 DATA = PyExpLabSys.common.sockets.DATA
 
@@ -189,6 +193,16 @@ def test_bad_init():
         '\'json\', \'raw\' or \'string\' values'
     assert(str(excinfo.value) == message)
 
+    # queue_size given with a queue or without a queue action
+    with pytest.raises(ValueError):
+        DataPushSocket(NAME, action='enqueue', queue=Queue.Queue(),
+                       queue_size=10)
+    with pytest.raises(ValueError):
+        DataPushSocket(NAME, queue_size=10)
+    # Unknown overflow policy
+    with pytest.raises(ValueError):
+        DataPushSocket(NAME, action='enqueue', queue_size=10, overflow='oo')
+
 
 class TestInit(object):
     """Class that wraps test of successful initialization"""
@@ -396,6 +410,167 @@ class TestDataTransfer(object):
             self.last_test(dps, data, time_sent)
             self.updated_test(dps, data_updated, time_sent)
 
+    def test_json_batch(self, dps, sock, json_data):
+        """Test sending several data sets with the json_batch command"""
+        data_updated = {}
+        for data in json_data:
+            data_updated.update(data)
+        time_sent = time.time()
+        command = 'json_batch#{}'.format(json.dumps(json_data))
+        reply = send_and_resc(sock, command)
+        assert(reply == '{}#{}'.format(PyExpLabSys.common.sockets.PUSH_ACK,
+                                       len(json_data)))
+        self.last_test(dps, json_data[-1], time_sent)
+        self.updated_test(dps, data_updated, time_sent)
+
+    def test_raw_batch(self, dps, sock, raw_data):
+        """Test sending several data sets with the raw_batch command"""
+        data_sets, commands = raw_data
+        data_updated = {}
+        for data in data_sets:
+            data_updated.update(data)
+        time_sent = time.time()
+        command = 'raw_batch#' + '&'.join(command.split('#')[1]
+                                          for command in commands)
+        reply = send_and_resc(sock, command)
+        assert(reply == '{}#{}'.format(PyExpLabSys.common.sockets.PUSH_ACK,
+                                       len(data_sets)))
+        self.last_test(dps, data_sets[-1], time_sent)
+        self.updated_test(dps, data_updated, time_sent)
+
+
+def test_batch_bad_data(dps, sock):
+    """Test that nothing is applied from a batch with a bad data set"""
+    for command in ['json_batch#{"a": 1}', 'json_batch#[{"a": 1}, 2]',
+                    'raw_batch#a:int:1&a:int:b', 'json_batch#[']:
+        reply = send_and_resc(sock, command)
+        assert(reply.startswith(PyExpLabSys.common.sockets.PUSH_ERROR + '#'))
+    assert(dps.last == (None, None))
+
+
+@pytest.mark.parametrize('overflow, expected', [
+    ('drop_oldest', [{'a': 1, 'b': 1}, {'a': 2}]),
+    ('drop_newest', [{'a': 0}, {'a': 1, 'b': 1}]),
+    ('coalesce', [{'a': 0}, {'a': 2, 'b': 1}]),
+    ('block', [{'a': 0}, {'a': 1, 'b': 1}]),
+])
+def test_bounded_queue(sock, overflow, expected):
+    """Test the overflow policies of the bounded queue"""
+    dps = DataPushSocket(NAME, action='enqueue', queue_size=2,
+                         overflow=overflow, overflow_timeout=0.1)
+    dps.start()
+    for data in [{'a': 0}, {'a': 1, 'b': 1}]:
+        reply = send_and_resc(sock, 'json_wn#{}'.format(json.dumps(data)))
+        assert(reply.startswith('ACK#'))
+    assert(dps.queue_depth == 2)
+    reply = send_and_resc(sock, 'json_wn#{"a": 2}')
+    assert(reply == 'OVERFLOW#1')
+    assert(dps.dropped == 1)
+    assert(dps.queue_depth == 2)
+    # The data is still stored in last
+    assert(dps.last[1] == {'a': 2})
+    assert([dps.queue.get_nowait() for _ in range(2)] == expected)
+
+    # Drops in a batch are counted
+    reply = send_and_resc(sock, 'json_batch#[{"a": 3}, {"a": 4}, {"a": 5}]')
+    assert(reply == 'OVERFLOW#1')
+    assert(dps.dropped == 2)
+    dps.stop()
+
+
+def test_bounded_queue_block_batch(sock):
+    """Test that a blocked batch waits at most the timeout in total, without
+    holding up the readers
+    """
+    dps = DataPushSocket(NAME, action='enqueue', queue_size=1,
+                         overflow='block', overflow_timeout=0.5)
+    dps.start()
+    replies = []
+    sender = threading.Thread(target=lambda: replies.append(send_and_resc(
+        sock, 'json_batch#[{"a": 1}, {"a": 2}, {"a": 3}, {"a": 4}]'
+    )))
+    start = time.time()
+    sender.start()
+    time.sleep(0.2)
+    # The data is set right away and can be read while the batch waits
+    assert(dps.updated[1] == {'a': 4})
+    assert(time.time() - start < 0.4)
+    sender.join()
+    assert(time.time() - start < 1.0)
+    assert(replies == ['OVERFLOW#3'])
+    assert(dps.queue.get_nowait() == {'a': 1})
+    dps.stop()
+
+
+def test_unbounded_queue_depth():
+    """Test the queue depth and dropped properties without a bound"""
+    dps = DataPushSocket(NAME, action='enqueue')
+    assert(dps.queue_depth == 0)
+    assert(dps.dropped == 0)
+    dps.stop()
+    dps = DataPushSocket(NAME)
+    assert(dps.queue_depth is None)
+    dps.stop()
+
+
+def test_schema(dps, sock):
+    """Test the schema registration and the compact data set forms"""
+    reply = send_and_resc(sock, 'register_schema#a:int,b:float,c:bool')
+    assert(reply == 'RET#0')
+    assert(send_and_resc(sock, 'register_schema#d:str') == 'RET#1')
+    # The same schema gets the same id
+    assert(send_and_resc(sock, 'register_schema#a:int,b:float,c:bool') ==
+           'RET#0')
+
+    reply = send_and_resc(sock, 's0#47,42.0,True')
+    assert(reply.startswith('ACK#'))
+    assert(dps.last[1] == {'a': 47, 'b': 42.0, 'c': True})
+    # The packed data may contain a #
+    packed = struct.pack('>qd?', 35, 47.0, False)
+    assert('#' in packed)
+    reply = send_and_resc(sock, 'b0#' + packed)
+    assert(reply.startswith('ACK#'))
+    assert(dps.last[1] == {'a': 35, 'b': 47.0, 'c': False})
+    assert(send_and_resc(sock, 's1#Live long').startswith('ACK#'))
+    assert(dps.updated[1]['d'] == 'Live long')
+
+    for command in ['s0#47,42.0', 's0#47,a,True', 's2#1', 'b0#short',
+                    'b1#' + packed, 'register_schema#a:complex',
+                    'register_schema#a']:
+        reply = send_and_resc(sock, command)
+        assert(reply.startswith(PyExpLabSys.common.sockets.PUSH_ERROR + '#'))
+
+
+def test_schema_limit(sock):
+    """Test that the number of schemas is limited"""
+    dps = DataPushSocket(NAME, max_schemas=2)
+    dps.start()
+    assert(send_and_resc(sock, 'register_schema#a:int') == 'RET#0')
+    assert(send_and_resc(sock, 'register_schema#b:int') == 'RET#1')
+    reply = send_and_resc(sock, 'register_schema#c:int')
+    assert(reply.startswith(PyExpLabSys.common.sockets.PUSH_ERROR + '#'))
+    # Registering a known schema still works
+    assert(send_and_resc(sock, 'register_schema#b:int') == 'RET#1')
+    assert(len(PyExpLabSys.common.sockets.DATA[8500]['schemas']) == 2)
+    dps.stop()
+
+
+def test_batch_enqueue(sock):
+    """Test that the data sets of a batch are enqueued in order"""
+    dps = DataPushSocket(NAME, action='enqueue')
+    dps.start()
+    data_sets = [{'x': float(number)} for number in range(100)]
+    command = 'json_batch#{}'.format(json.dumps(data_sets))
+    assert(send_and_resc(sock, command) == 'ACK#100')
+    assert([dps.queue.get_nowait() for _ in range(100)] == data_sets)
+    dps.stop()
+
+    dps = DataPushSocket(NAME, action='callback_direct', callback=echo_callback)
+    dps.start()
+    reply = send_and_resc(sock, command)
+    assert(reply.startswith(PyExpLabSys.common.sockets.PUSH_ERROR + '#'))
+    dps.stop()
+
 
 class TestCallBack(object):
     """Test the call back functionality"""
@@ -439,6 +614,104 @@ class TestCallBack(object):
         assert(dps.updated[0] - local_data[-1][0] < 0.010)
 
 
+class TestCallBackPool(object):
+    """Test the call back pool"""
+    dps_kwargs = {'action': 'callback_async',
+                  'callback': memory_callback_with_time,
+                  'callback_workers': 3}
+
+    def test_callback_order(self, dps, sock, callback):
+        """Test that the data sets for each key are called back in order"""
+        for number in range(30):
+            data = {'name{}'.format(number % 3): number}
+            reply = send_and_resc(sock, 'json_wn#{}'.format(json.dumps(data)))
+            assert(reply.startswith(PyExpLabSys.common.sockets.PUSH_ACK))
+        time.sleep(0.1)
+        assert(len(CALLBACK_MEMORY) == 30)
+        for name in ['name0', 'name1', 'name2']:
+            values = [received[name] for _, received in CALLBACK_MEMORY
+                      if name in received]
+            assert(values == sorted(values) and len(values) == 10)
+
+
+    def test_callback_order_mixed_codenames(self, dps, sock, callback):
+        """Test that the data sets of a codename are called back in order,
+        also when they are sent together with other codenames
+        """
+        for number in range(30):
+            data = {'a': number}
+            if number % 2:
+                data['name{}'.format(number % 3)] = number
+            reply = send_and_resc(sock, 'json_wn#{}'.format(json.dumps(data)))
+            assert(reply.startswith(PyExpLabSys.common.sockets.PUSH_ACK))
+        time.sleep(0.1)
+        values = [received['a'] for _, received in CALLBACK_MEMORY]
+        assert(values == list(range(30)))
+
+
+def test_callback_pool_bounded_queue(sock, callback):
+    """Test that the overflow policy applies with the call back pool"""
+    release = threading.Event()
+
+    def blocked_callback(argument):
+        """Callback that waits for the release"""
+        release.wait()
+
+    dps = DataPushSocket(NAME, action='callback_async',
+                         callback=blocked_callback, callback_workers=2,
+                         queue_size=5, overflow='drop_newest')
+    dps.start()
+    replies = [send_and_resc(sock, 'json_wn#{{"a": {}}}'.format(number))
+               for number in range(50)]
+    # At most the queue, the two worker queues, the two callbacks in
+    # progress and the one data set held by the dispatcher
+    accepted = sum(reply.startswith('ACK#') for reply in replies)
+    assert(accepted <= 5 + 2 * 5 + 2 + 1)
+    assert(dps.dropped == 50 - accepted)
+    assert(dps.queue_depth == 5)
+    release.set()
+    dps.stop()
+
+
+def test_callback_pool_batch(callback):
+    """Test the batch mode and the fast stop of the call back pool"""
+    queue = Queue.Queue()
+    release = threading.Event()
+
+    def slow_memory_callback(argument):
+        """Memory callback that waits for the release"""
+        release.wait()
+        memory_callback(argument)
+
+    pool = CallBackPool(queue, slow_memory_callback, workers=1, batch=True)
+    pool.start()
+    for number in range(5):
+        queue.put({'a': number})
+    # Let the worker take the first batch before more are queued
+    time.sleep(0.1)
+    for number in range(5, 10):
+        queue.put({'a': number})
+    release.set()
+    time.sleep(0.1)
+    batches = list(CALLBACK_MEMORY)
+    assert(sum(batches, []) == [{'a': number} for number in range(10)])
+    assert(len(batches) < 10)
+
+    # Stopping does not wait for a timeout
+    start = time.time()
+    pool.stop()
+    assert(time.time() - start < 0.5)
+    assert(not pool.is_alive())
+
+
+def test_callback_pool_bad_args():
+    """Test the callback pool arguments"""
+    with pytest.raises(ValueError):
+        DataPushSocket(NAME, action='enqueue', callback_workers=2)
+    with pytest.raises(ValueError):
+        CallBackPool(Queue.Queue(), memory_callback, workers=0)
+
+
 class TestCallBackReturnJson(object):
     """Test the callback functionality with json return"""
     # Used in dps fixture to init dps with certain kwargs.
@@ -614,3 +887,121 @@ class Dequeuer(threading.Thread):
                 self.received.append((time.time(), item))
             except Queue.Empty:
                 pass
+
+
+def slow_echo_callback(argument):
+    """Echo callback function that takes a while"""
+    time.sleep(argument.get('sleep', 0))
+    return argument
+
+
+@pytest.mark.parametrize('serving_mode', ['pool', 'thread'])
+def test_concurrent_serving(serving_mode, sock):
+    """Test that a slow callback does not hold up other requests"""
+    dps = DataPushSocket(NAME, action='callback_direct',
+                         callback=slow_echo_callback,
+                         serving_mode=serving_mode)
+    dps.start()
+    slow_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    slow_sock.sendto('json_wn#{"sleep": 0.5}', (HOST, PORT))
+    time.sleep(0.05)
+
+    # This request is answered while the slow callback is still running
+    start = time.time()
+    sock.sendto('json_wn#{"sleep": 0}', (HOST, PORT))
+    reply = sock.recv(1024)
+    assert(time.time() - start < 0.3)
+    assert(json.loads(reply.split('#')[1]) == {'sleep': 0})
+
+    reply = slow_sock.recv(1024)
+    assert(json.loads(reply.split('#')[1]) == {'sleep': 0.5})
+    # The data is set before the callback is called, so the fast request was
+    # the last to set it
+    assert(dps.last[1] == {'sleep': 0})
+    assert(dps.updated[1] == {'sleep': 0})
+    slow_sock.close()
+    dps.stop()
+
+
+def test_bad_serving_mode():
+    """Test that an unknown serving mode raises ValueError"""
+    with pytest.raises(ValueError):
+        DataPushSocket(NAME, serving_mode='spooky')
+    assert(PORT not in DATA)
+
+
+def test_push_protocol_callback_async(callback, transport):
+    """Test that the push protocol makes the async callbacks itself"""
+    dps = DataPushSocket(NAME, action='callback_async', callback=callback)
+    protocol = PushProtocol(PORT)
+    protocol.connection_made(transport)
+    client = ('127.0.0.1', 47000)
+    for data in DATA_SETS['json']:
+        protocol.datagram_received('json_wn#' + json.dumps(data), client)
+        reply, address = transport.sent.pop()
+        assert(address == client)
+        assert(reply.startswith(PyExpLabSys.common.sockets.PUSH_ACK))
+    # The callbacks were made without the callback thread being started
+    assert(not dps._callback_thread.is_alive())
+    assert(CALLBACK_MEMORY == DATA_SETS['json'])
+    assert(dps.last[1] == DATA_SETS['json'][-1])
+    dps.stop()
+
+
+@pytest.mark.parametrize('serving_mode', ['pool', 'thread'])
+def test_stop_waits_for_requests(serving_mode):
+    """Test that stop finishes the queued requests and leaves no threads"""
+    threads_before = threading.active_count()
+    dps = DataPushSocket(NAME, action='callback_direct',
+                         callback=slow_echo_callback,
+                         serving_mode=serving_mode, workers=1)
+    dps.start()
+    socks = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+             for _ in range(4)]
+    for number, client_sock in enumerate(socks):
+        client_sock.sendto('json_wn#{{"sleep": 0.1, "n": {}}}'.format(number),
+                           (HOST, PORT))
+    time.sleep(0.05)
+    dps.stop()
+    # All the requests were answered before the data was deleted
+    for number, client_sock in enumerate(socks):
+        client_sock.settimeout(1)
+        reply = client_sock.recv(1024)
+        assert(json.loads(reply.split('#')[1])['n'] == number)
+        client_sock.close()
+    assert(threading.active_count() == threads_before)
+
+
+def test_snapshot(sock, tmpdir):
+    """Test restoring the last and updated data from a snapshot"""
+    path = str(tmpdir.join('snapshot'))
+    dps = DataPushSocket(NAME, snapshot_file=path)
+    dps.start()
+    send_and_resc(sock, 'json_wn#{"a": 1, "b": 2.0}')
+    send_and_resc(sock, 'json_wn#{"a": 3}')
+    last, updated = dps.last, dps.updated
+    dps.stop()
+
+    dps = DataPushSocket(NAME, snapshot_file=path)
+    assert(dps.last == last)
+    assert(dps.updated == updated)
+    assert(dps.updated[1] == {'a': 3, 'b': 2.0})
+    dps.stop()
+
+
+def test_snapshot_failure(tmpdir):
+    """Test that the port is freed if the snapshot cannot be used"""
+    with pytest.raises(EnvironmentError):
+        DataPushSocket(NAME, snapshot_file=str(tmpdir))
+    assert(PORT not in DATA)
+    dps = DataPushSocket(NAME)
+    dps.stop()
+
+
+def test_socket_client_push(dps):
+    """Test pushing with the socket client"""
+    client = SocketClient()
+    reply = client.push(HOST, PORT, {'a': 47})
+    assert(reply.startswith(PyExpLabSys.common.sockets.PUSH_ACK + '#'))
+    assert(dps.last[1] == {'a': 47})
+    client.close()
@@ -4,6 +4,9 @@
 # Built-in imports
 import time
 import json
+import socket
+import os
+import threading
 import SocketServer
 # Allow for fast restart of a socket on a port for test purposes
 SocketServer.UDPServer.allow_reuse_address = True
@@ -12,6 +15,10 @@ import pytest
 # Own imports
 import PyExpLabSys.common.sockets
 from PyExpLabSys.common.sockets import DataPullSocket, DateDataPullSocket
+from PyExpLabSys.common.sockets import DataPushSocket, Reactor, PullProtocol
+from PyExpLabSys.common.sockets import LiveSocket, decode_bin
+from PyExpLabSys.common.sockets import MulticastListener, SharedDataStore
+from PyExpLabSys.common.sockets import SocketClient
 
 #from PyExpLabSys.common.utilities import get_logger
 #LOGGER = get_logger('Test data socket', level='info')
@@ -299,3 +306,633 @@ def test_data_timeout(socket_and_use_timestamp, sock):
     assert(json.loads(data1) == expected1)
 
     data_socket.stop()
+
+
+def test_response_cache(sockettype, sock):
+    """Test that all-values responses are cached until set_point or timeout"""
+    data_socket = sockettype(NAME, ['one', 'two'], port=9000,
+                             timeouts=[0.2, None])
+    data_socket.start()
+    port = 9000
+
+    data_socket.set_point('one', (time.time(), 42.0))
+    data_socket.set_point('two', (time.time(), 47.0))
+    first = send_and_resc(sock, 'raw', port)
+    assert(data_socket.cache_stats == {'hits': 0, 'misses': 1})
+    # An unchanged value is served from the cache
+    assert(send_and_resc(sock, 'raw', port) == first)
+    assert(data_socket.cache_stats == {'hits': 1, 'misses': 1})
+    # The commands are cached separately
+    send_and_resc(sock, 'json_wn', port)
+    assert(data_socket.cache_stats == {'hits': 1, 'misses': 2})
+
+    # set_point invalidates the cache
+    now = time.time()
+    data_socket.set_point('two', (now, 1.0))
+    data = send_and_resc(sock, 'raw_wn', port)
+    assert(data.endswith('two:{},{}'.format(now, 1.0)))
+    data = json.loads(send_and_resc(sock, 'json_wn', port))
+    assert(data['two'] == [now, 1.0])
+    assert(data_socket.cache_stats == {'hits': 1, 'misses': 4})
+
+    # A timeout invalidates the cache
+    time.sleep(0.25)
+    data = send_and_resc(sock, 'raw_wn', port)
+    assert(data == 'one:OLD_DATA;two:{},{}'.format(now, 1.0))
+    assert(data_socket.cache_stats == {'hits': 1, 'misses': 5})
+
+    data_socket.stop()
+
+
+@pytest.mark.parametrize('serving_mode', ['serial', 'pool', 'thread'])
+def test_serving_modes(sockettype, serving_mode, sock):
+    """Test that the pull sockets work with all the serving modes"""
+    data_socket = sockettype(NAME, ['one'], port=9000,
+                             serving_mode=serving_mode, workers=2)
+    data_socket.start()
+    for n in range(3):
+        data_socket.set_point('one', (n, n + 1))
+        assert(send_and_resc(sock, 'one#raw', 9000) == '{},{}'.format(n, n + 1))
+    data_socket.stop()
+
+
+def test_reactor(sock):
+    """Test serving several socket servers from a single reactor thread"""
+    reactor = Reactor(poll_interval=0.1)
+    reactor.start()
+    threads_before = threading.active_count()
+    date_socket = DateDataPullSocket(NAME, ['one'], port=9000,
+                                     reactor=reactor)
+    data_socket = DataPullSocket(NAME, ['two'], port=9010, reactor=reactor)
+    push_socket = DataPushSocket(NAME, port=8500, reactor=reactor)
+    for socket_server in (date_socket, data_socket, push_socket):
+        socket_server.start()
+    # No threads have been started by the socket servers
+    assert(threading.active_count() == threads_before)
+    assert(len(reactor.servers) == 3)
+
+    for n in range(3):
+        date_socket.set_point('one', (n, n + 1))
+        data_socket.set_point('two', (n, n + 2))
+        assert(send_and_resc(sock, 'raw', 9000) == '{},{}'.format(n, n + 1))
+        assert(send_and_resc(sock, 'json_wn', 9010) ==
+               json.dumps({'two': [n, n + 2]}))
+        reply = send_and_resc(sock, 'json_wn#{{"three": {}}}'.format(n), 8500)
+        assert(reply.startswith('ACK'))
+        assert(push_socket.last[1] == {'three': n})
+
+    for socket_server in (date_socket, data_socket, push_socket):
+        socket_server.stop()
+    assert(reactor.servers == [])
+    reactor.stop()
+    assert(not reactor.is_alive())
+
+
+def test_reactor_live_and_callback_async(sock):
+    """Test a LiveSocket and a callback_async DataPushSocket on a reactor"""
+    reactor = Reactor(poll_interval=0.1)
+    reactor.start()
+    received = []
+    live_socket = LiveSocket(NAME, ['one'], 1.0, port=8000, reactor=reactor)
+    push_socket = DataPushSocket(NAME, port=8500, action='callback_async',
+                                 callback=received.append, reactor=reactor)
+    live_socket.start()
+    push_socket.start()
+
+    live_socket.set_point('one', (1.0, 2.0))
+    assert(json.loads(send_and_resc(sock, 'data', 8000)) == [[1.0, 2.0]])
+    for number in range(3):
+        reply = send_and_resc(sock, 'json_wn#{{"n": {}}}'.format(number),
+                              8500)
+        assert(reply.startswith('ACK'))
+    # The callback thread was started by start
+    time.sleep(0.1)
+    assert(received == [{'n': 0}, {'n': 1}, {'n': 2}])
+
+    live_socket.stop()
+    push_socket.stop()
+    reactor.stop()
+
+
+def test_reactor_pool_mode_cleanup(sock):
+    """Test that pool mode sockets on a reactor leave no threads behind"""
+    reactor = Reactor(poll_interval=0.1)
+    reactor.start()
+    threads_before = threading.active_count()
+    for n in range(3):
+        data_socket = DateDataPullSocket(NAME, ['one'], port=9000,
+                                         serving_mode='pool',
+                                         reactor=reactor)
+        data_socket.start()
+        data_socket.set_point('one', (n, n))
+        assert(send_and_resc(sock, 'raw', 9000) == '{},{}'.format(n, n))
+        data_socket.stop()
+        assert(threading.active_count() == threads_before)
+    reactor.stop()
+
+
+def test_pull_protocol(sockettype, transport):
+    """Test serving the pull socket commands with the datagram protocol"""
+    data_socket = sockettype(NAME, ['one', 'two'], port=9000)
+    protocol = PullProtocol(9000)
+    protocol.connection_made(transport)
+    data_socket.set_point('one', (1, 2))
+    data_socket.set_point('two', (3, 4))
+    client = ('127.0.0.1', 47000)
+    for command, expected in [('raw', '1,2;3,4'), ('two#raw', '3,4'),
+                              ('codenames_raw', 'one,two'), ('name', NAME)]:
+        protocol.datagram_received(command, client)
+        assert(transport.sent.pop() == (expected, client))
+    data_socket.stop()
+
+    with pytest.raises(ValueError):
+        PullProtocol(9000)
+
+
+def test_bin_command(sockettype, sock):
+    """Test the binary format commands and the decoder"""
+    data_socket = sockettype(NAME, ['one', 'two', 'three'], port=9000,
+                             timeouts=[None, 0.1, None])
+    data_socket.start()
+    now = time.time()
+    data_socket.set_point('one', (now, 42.0))
+    data_socket.set_point('two', (now, 47.0))
+    data_socket.set_point('three', (now, 'not a number'))
+
+    data = send_and_resc(sock, 'bin', 9000)
+    assert(decode_bin(data) == [(0, (now, 42.0)), (1, (now, 47.0)),
+                                (2, None)])
+    # 6 bytes header and 19 bytes per point
+    assert(len(data) == 6 + 3 * 19)
+    data = send_and_resc(sock, 'two#bin', 9000)
+    assert(decode_bin(data, ['one', 'two', 'three']) == {'two': (now, 47.0)})
+
+    time.sleep(0.15)
+    data = send_and_resc(sock, 'bin', 9000)
+    decoded = decode_bin(data, ['one', 'two', 'three'])
+    assert(decoded['two'] == PyExpLabSys.common.sockets.OLD_DATA)
+    assert(decoded['one'] == (now, 42.0))
+
+    with pytest.raises(ValueError):
+        decode_bin('nonsense')
+    data_socket.stop()
+
+
+def test_history(sockettype, sock):
+    """Test the history commands"""
+    data_socket = sockettype(NAME, ['one', 'two'], port=9000, history_size=3)
+    data_socket.start()
+    for value in range(5):
+        data_socket.set_point('one', (float(value), value * 2.0))
+    data_socket.set_point('two', (1.0, 'not a number'))
+
+    data = json.loads(send_and_resc(sock, 'one#history:2', 9000))
+    assert(data == [[3.0, 6.0], [4.0, 8.0]])
+    # Only history_size points are kept
+    data = json.loads(send_and_resc(sock, 'one#history:10', 9000))
+    assert(data == [[2.0, 4.0], [3.0, 6.0], [4.0, 8.0]])
+    data = json.loads(send_and_resc(sock, 'history_json_wn', 9000))
+    assert(data == {'one': [[2.0, 4.0], [3.0, 6.0], [4.0, 8.0]], 'two': []})
+    data = json.loads(send_and_resc(sock, 'history_json_wn:1', 9000))
+    assert(data['one'] == [[4.0, 8.0]])
+    if sockettype is DateDataPullSocket:
+        # The x values are the times
+        data = json.loads(send_and_resc(sock, 'one#since:2.5', 9000))
+        assert(data == [[3.0, 6.0], [4.0, 8.0]])
+    else:
+        # The times are the timestamps
+        data = json.loads(send_and_resc(sock, 'one#since:0', 9000))
+        assert(len(data) == 3)
+        data = json.loads(send_and_resc(sock, 'one#since:1e10', 9000))
+        assert(data == [])
+    for command in ['one#history:a', 'one#since:a', 'history_json_wn:a']:
+        data = send_and_resc(sock, command, 9000)
+        assert(data == PyExpLabSys.common.sockets.UNKNOWN_COMMAND)
+    data_socket.stop()
+
+    # Without a history the commands are unknown
+    data_socket = sockettype(NAME, ['one'], port=9000)
+    data_socket.start()
+    data = send_and_resc(sock, 'one#history:2', 9000)
+    assert(data == PyExpLabSys.common.sockets.UNKNOWN_COMMAND)
+    data_socket.stop()
+
+
+def test_window_stats(sockettype, sock):
+    """Test the windowed statistics commands"""
+    data_socket = sockettype(NAME, ['one', 'two'], port=9000,
+                             stats_windows=[0.2, 60])
+    data_socket.start()
+    for value in [1.0, 2.0, 3.0]:
+        data_socket.set_point('one', (time.time(), value))
+    data_socket.set_point('two', (time.time(), 'not a number'))
+
+    data = json.loads(send_and_resc(sock, 'one#stats:60', 9000))
+    assert(data['count'] == 3)
+    assert(data['min'] == 1.0 and data['max'] == 3.0)
+    assert(data['mean'] == pytest.approx(2.0))
+    assert(data['std'] == pytest.approx((2.0 / 3.0) ** 0.5))
+    data = json.loads(send_and_resc(sock, 'stats_json_wn:60', 9000))
+    assert(data['two']['count'] == 0 and data['two']['mean'] is None)
+
+    # Values older than the window are removed
+    time.sleep(0.25)
+    data_socket.set_point('one', (time.time(), 0.5))
+    data = json.loads(send_and_resc(sock, 'one#stats:0.2', 9000))
+    assert(data == {'min': 0.5, 'max': 0.5, 'mean': 0.5, 'std': 0.0,
+                    'count': 1})
+    data = json.loads(send_and_resc(sock, 'one#stats:60', 9000))
+    assert(data['count'] == 4 and data['min'] == 0.5)
+
+    # Only the configured windows are available
+    for command in ['one#stats:10', 'one#stats:a', 'stats_json_wn:10']:
+        data = send_and_resc(sock, command, 9000)
+        assert(data == PyExpLabSys.common.sockets.UNKNOWN_COMMAND)
+    data_socket.stop()
+
+
+def test_changed_since(sockettype, sock):
+    """Test the changed_since command"""
+    data_socket = sockettype(NAME, ['one', 'two', 'three'], port=9000)
+    data_socket.start()
+    data = json.loads(send_and_resc(sock, 'changed_since:-1', 9000))
+    assert(data['sequence'] == 0)
+    assert(sorted(data['data'].keys()) == ['one', 'three', 'two'])
+    data = json.loads(send_and_resc(sock, 'changed_since:0', 9000))
+    assert(data == {'sequence': 0, 'data': {}})
+
+    data_socket.set_point('one', (1.0, 42.0))
+    data_socket.set_point('two', (1.0, 47.0))
+    data = json.loads(send_and_resc(sock, 'changed_since:0', 9000))
+    assert(data == {'sequence': 2,
+                    'data': {'one': [1.0, 42.0], 'two': [1.0, 47.0]}})
+    data_socket.set_point('two', (2.0, 48.0))
+    data = json.loads(send_and_resc(sock, 'changed_since:2', 9000))
+    assert(data == {'sequence': 3, 'data': {'two': [2.0, 48.0]}})
+    data = json.loads(send_and_resc(sock, 'changed_since:3', 9000))
+    assert(data == {'sequence': 3, 'data': {}})
+    # A sequence number from before a restart of the server returns all
+    data = json.loads(send_and_resc(sock, 'changed_since:47', 9000))
+    assert(data['sequence'] == 3)
+    assert(sorted(data['data'].keys()) == ['one', 'three', 'two'])
+
+    data = send_and_resc(sock, 'changed_since:a', 9000)
+    assert(data == PyExpLabSys.common.sockets.UNKNOWN_COMMAND)
+    data_socket.stop()
+
+
+def test_subscribe(sockettype, sock):
+    """Test the subscription push"""
+    data_socket = sockettype(NAME, ['one', 'two'], port=9000,
+                             subscription_lease=0.5, max_subscribers=1)
+    data_socket.start()
+    sock.settimeout(1)
+    assert(send_and_resc(sock, 'subscribe#one', 9000) == 'ACK#0.5')
+
+    data_socket.set_point('one', (1.0, 42.0))
+    data_socket.set_point('two', (1.0, 47.0))
+    data, _ = sock.recvfrom(1024)
+    assert(data.startswith('PUSH#'))
+    assert(json.loads(data[5:]) == {'one': [1.0, 42.0]})
+
+    # Rate limited, the second update is sent when the interval has passed,
+    # also without further updates
+    assert(send_and_resc(sock, 'subscribe#one,two:0.2', 9000) == 'ACK#0.5')
+    data_socket.set_point('one', (2.0, 43.0))
+    data_socket.set_point('two', (2.0, 48.0))
+    data, _ = sock.recvfrom(1024)
+    assert(json.loads(data[5:]) == {'one': [2.0, 43.0]})
+    start = time.time()
+    data, _ = sock.recvfrom(1024)
+    assert(time.time() - start > 0.1)
+    assert(json.loads(data[5:]) == {'two': [2.0, 48.0]})
+    # Updates within the interval are sent together
+    data_socket.set_point('one', (3.0, 44.0))
+    data_socket.set_point('two', (3.0, 49.0))
+    data, _ = sock.recvfrom(1024)
+    assert(json.loads(data[5:]) == {'one': [3.0, 44.0], 'two': [3.0, 49.0]})
+
+    # Only one subscriber allowed
+    other_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    data = send_and_resc(other_sock, 'subscribe#one', 9000)
+    assert(data.startswith('ERROR#'))
+    other_sock.close()
+    assert(send_and_resc(sock, 'subscribe#three', 9000) ==
+           PyExpLabSys.common.sockets.UNKNOWN_COMMAND)
+
+    # Unsubscribe and expiry
+    assert(send_and_resc(sock, 'unsubscribe#', 9000) == 'ACK')
+    data_socket.set_point('one', (4.0, 45.0))
+    assert(send_and_resc(sock, 'subscribe#one', 9000) == 'ACK#0.5')
+    time.sleep(0.6)
+    data_socket.set_point('one', (5.0, 46.0))
+    sock.settimeout(0.2)
+    with pytest.raises(socket.timeout):
+        sock.recvfrom(1024)
+    assert(PyExpLabSys.common.sockets.DATA[9000]['subscribers'] == {})
+
+    # An expired subscription does not hold a slot, also when no point has
+    # been set since it expired
+    assert(send_and_resc(sock, 'subscribe#one', 9000) == 'ACK#0.5')
+    time.sleep(0.6)
+    other_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    assert(send_and_resc(other_sock, 'subscribe#one', 9000) == 'ACK#0.5')
+    other_sock.close()
+    data_socket.stop()
+
+
+@pytest.mark.parametrize('interval', [None, 0.05], ids=['direct', 'coalesced'])
+def test_multicast(sockettype, interval):
+    """Test publishing to a multicast group and the listener"""
+    group = ('239.255.47.47', 9123)
+    listener = MulticastListener(*group, timeout=0.05)
+    listener.start()
+    data_socket = sockettype(NAME, ['one', 'two'], port=9000,
+                             multicast=group, multicast_interval=interval)
+    data_socket.start()
+    data_socket.set_point('one', (1.0, 42.0))
+    data_socket.set_point('one', (2.0, 43.0))
+    data_socket.set_point('two', (2.0, 47.0))
+    time.sleep(0.2)
+
+    assert(len(listener.sources) == 1)
+    host, port = listener.sources[0]
+    assert(port == 9000)
+    assert(listener.name(host, port) == NAME)
+    assert(listener.data(host, port) == {'one': [2.0, 43.0],
+                                         'two': [2.0, 47.0]})
+    with pytest.raises(KeyError):
+        listener.data(host, 9001)
+    data_socket.stop()
+    listener.stop()
+
+
+def test_shared_data_store(sockettype, sock, tmpdir):
+    """Test serving points set in a shared data store in another process"""
+    path = str(tmpdir.join('store'))
+    with pytest.raises(ValueError):
+        SharedDataStore(path, create=True)
+    store = SharedDataStore(path, ['one', 'two'], create=True)
+    store.set_point('one', (1.0, 42.0))
+    assert(store.get('one') == (2, 1.0, 42.0, store.get('one')[3]))
+    assert(store.get('two')[0] == 0)
+
+    # Set points from another process
+    pid = os.fork()
+    if pid == 0:
+        writer = SharedDataStore(path, ['one', 'two'])
+        for value in range(100):
+            writer.set_point('two', (float(value), float(value)))
+        writer.close()
+        os._exit(0)
+    os.waitpid(pid, 0)
+
+    reader = SharedDataStore(path)
+    assert(reader.codenames == ['one', 'two'])
+    with pytest.raises(ValueError):
+        SharedDataStore(path, ['three'])
+    with pytest.raises(ValueError):
+        sockettype(NAME, ['three'], port=9000, shared_store=reader)
+    data_socket = sockettype(NAME, ['one', 'two'], port=9000,
+                             shared_store=reader, reuse_port=True)
+    data_socket.start()
+    assert(json.loads(send_and_resc(sock, 'json', 9000)) ==
+           [[1.0, 42.0], [99.0, 99.0]])
+    store.set_point('one', (2.0, 43.0))
+    assert(send_and_resc(sock, 'one#raw', 9000) == '2.0,43.0')
+
+    # A writer that died while writing leaves the sequence number odd. The
+    # reader gives up and the last point is served
+    offset = store._offsets['one']
+    sequence = PyExpLabSys.common.sockets.STORE_SEQUENCE
+    sequence.pack_into(store._map, offset,
+                       sequence.unpack_from(store._map, offset)[0] + 1)
+    assert(reader.get('one') is None)
+    assert(send_and_resc(sock, 'one#raw', 9000) == '2.0,43.0')
+    # A torn slot, e.g. new values seen with an old sequence number on a
+    # weakly ordered CPU, does not match its checksum and is not read
+    store.set_point('one', (3.0, 44.0))
+    values = PyExpLabSys.common.sockets.STORE_VALUES
+    values.pack_into(store._map, offset + sequence.size, 4.0, 45.0, 0.0)
+    assert(reader.get('one') is None)
+    store.set_point('one', (3.0, 44.0))
+    assert(send_and_resc(sock, 'one#raw', 9000) == '3.0,44.0')
+    data_socket.stop()
+    reader.close()
+    store.close()
+
+
+def test_snapshot(sockettype, sock, tmpdir):
+    """Test restoring the points from a snapshot on restart"""
+    path = str(tmpdir.join('snapshot'))
+    data_socket = sockettype(NAME, ['one', 'two'], port=9000,
+                             snapshot_file=path, snapshot_interval=0.05)
+    data_socket.start()
+    now = time.time()
+    data_socket.set_point('one', (now, 42.0))
+    data_socket.set_point('two', (now - 100, 47.0))
+    data_socket.stop()
+
+    data_socket = sockettype(NAME, ['one', 'two', 'three'], port=9000,
+                             timeouts=[None, 10, None], snapshot_file=path)
+    data_socket.start()
+    data = send_and_resc(sock, 'raw', 9000).split(';')
+    assert(data[0] == '{},42.0'.format(now))
+    if sockettype is DateDataPullSocket:
+        # The restored point is older than the timeout
+        assert(data[1] == PyExpLabSys.common.sockets.OLD_DATA)
+    else:
+        assert(data[1] == '{},47.0'.format(now - 100))
+    assert(data[2].endswith(',47'))
+    data_socket.stop()
+    # A corrupted active buffer falls back on the previous snapshot
+    snapshot = PyExpLabSys.common.sockets.SocketSnapshot(path)
+    snapshot.write({'data': {'one': [1.0, 1.0]}})
+    state = snapshot.read()
+    assert(state == {'data': {'one': [1.0, 1.0]}})
+    header = PyExpLabSys.common.sockets.SNAPSHOT_HEADER
+    active = header.unpack_from(snapshot._map, 0)[2]
+    offset = header.size + active * (8 + snapshot.capacity) + 8
+    snapshot._map[offset] = 'X'
+    assert(snapshot.read()['data']['one'][1] == 42.0)
+    snapshot.close()
+
+
+def test_snapshot_failure(sockettype, tmpdir):
+    """Test that the port is freed if the snapshot cannot be used"""
+    # The snapshot file cannot be created in place of a directory
+    with pytest.raises(EnvironmentError):
+        sockettype(NAME, ['one'], port=9000, snapshot_file=str(tmpdir))
+    assert(9000 not in PyExpLabSys.common.sockets.DATA)
+    # A valid snapshot with bad content cannot be restored
+    path = str(tmpdir.join('snapshot'))
+    snapshot = PyExpLabSys.common.sockets.SocketSnapshot(path)
+    snapshot.write({'data': 47})
+    snapshot.close()
+    with pytest.raises(AttributeError):
+        sockettype(NAME, ['one'], port=9000, snapshot_file=path)
+    assert(9000 not in PyExpLabSys.common.sockets.DATA)
+    data_socket = sockettype(NAME, ['one'], port=9000)
+    data_socket.stop()
+
+
+def test_stream_endpoint(sockettype, tmpdir):
+    """Test the TCP and Unix domain socket companion endpoints"""
+    sockets = PyExpLabSys.common.sockets
+    path = str(tmpdir.join('socket'))
+    codenames = ['codename{}'.format(number) for number in range(200)]
+    data_socket = sockettype(NAME, codenames, port=9000, tcp_port=9001,
+                             unix_socket=path)
+    data_socket.start()
+    for number, codename in enumerate(codenames):
+        data_socket.set_point(codename, (float(number), float(number)))
+
+    for family, address in [(socket.AF_INET, (HOST, 9001)),
+                            (socket.AF_UNIX, path)]:
+        stream = socket.socket(family, socket.SOCK_STREAM)
+        stream.connect(address)
+        # Pipeline the requests
+        sockets.send_frame(stream, 'json_wn', sockets.STREAM_ACCEPT_ZLIB)
+        sockets.send_frame(stream, 'codename7#raw')
+        sockets.send_frame(stream, 'json_wn')
+        sockets.send_frame(stream, 'subscribe#codename7')
+        flags, reply = sockets.recv_frame(stream)
+        # The reply is larger than a datagram and compressed
+        assert(flags & sockets.STREAM_ZLIB)
+        data = json.loads(reply)
+        assert(len(data) == 200 and data['codename199'] == [199.0, 199.0])
+        assert(sockets.recv_frame(stream) == (0, '7.0,7.0'))
+        flags, reply = sockets.recv_frame(stream)
+        assert(flags == 0 and len(json.loads(reply)) == 200)
+        assert(sockets.recv_frame(stream) == (0, sockets.UNKNOWN_COMMAND))
+        stream.close()
+
+    data_socket.stop()
+    assert(not os.path.exists(path))
+
+    # A socket file left behind is replaced, but other files are not removed
+    leftover = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    leftover.bind(path)
+    leftover.close()
+    data_socket = sockettype(NAME, codenames, port=9000, unix_socket=path)
+    data_socket.stop()
+    # A file that replaced the socket file while serving is not removed
+    data_socket = sockettype(NAME, codenames, port=9000, unix_socket=path)
+    os.remove(path)
+    with open(path, 'w') as file_:
+        file_.write('important')
+    data_socket.stop()
+    os.remove(path)
+    with open(path, 'w') as file_:
+        file_.write('important')
+    with pytest.raises(ValueError):
+        sockettype(NAME, codenames, port=9000, unix_socket=path)
+    assert(9000 not in sockets.DATA)
+    with open(path) as file_:
+        assert(file_.read() == 'important')
+
+
+@pytest.mark.parametrize('endpoint', [{'tcp_port': 8101},
+                                      {'unix_socket': 'live_socket'}],
+                         ids=['tcp', 'unix'])
+def test_stream_endpoint_live_socket(endpoint, tmpdir):
+    """Test that the stream endpoints, which serve the pull socket commands,
+    are refused for the live socket
+    """
+    if 'unix_socket' in endpoint:
+        endpoint = {'unix_socket': str(tmpdir.join(endpoint['unix_socket']))}
+    with pytest.raises(ValueError):
+        LiveSocket(NAME, ['one'], 1.0, **endpoint)
+    assert(8000 not in PyExpLabSys.common.sockets.DATA)
+    if 'unix_socket' in endpoint:
+        assert(not os.path.exists(endpoint['unix_socket']))
+
+
+def test_request_tag(sockettype, sock):
+    """Test that the request tag is sent back"""
+    data_socket = sockettype(NAME, ['one'], port=9000)
+    data_socket.start()
+    data_socket.set_point('one', (1.0, 42.0))
+    assert(send_and_resc(sock, '@47 one#raw', 9000) == '@47 1.0,42.0')
+    assert(send_and_resc(sock, '@47', 9000) ==
+           PyExpLabSys.common.sockets.UNKNOWN_COMMAND)
+    data_socket.stop()
+
+
+def test_socket_client(sockettype):
+    """Test the socket client"""
+    data_socket0 = sockettype(NAME, ['one', 'two'], port=9000,
+                              timeouts=[None, 0.0])
+    data_socket0.start()
+    data_socket1 = sockettype(NAME, ['three'], port=9001)
+    data_socket1.start()
+    data_socket0.set_point('one', (1.0, 42.0))
+    data_socket1.set_point('three', (3.0, 47.0))
+
+    client = SocketClient(timeout=0.1, retries=1)
+    assert(client.raw(HOST, 9000) == [(1.0, 42.0),
+                                      PyExpLabSys.common.sockets.OLD_DATA])
+    assert(client.raw(HOST, 9000, 'one#raw') == (1.0, 42.0))
+    assert(client.json(HOST, 9000, 'json_wn')['one'] == [1.0, 42.0])
+    assert(client.bin(HOST, 9001, codenames=['three']) ==
+           {'three': (3.0, 47.0)})
+    with pytest.raises(ValueError):
+        client.json(HOST, 9000, 'nonsense')
+
+    replies = client.fetch_many([(HOST, 9000, 'name'), (HOST, 9001, 'raw'),
+                                 (HOST, 9002, 'raw')], deadline=0.5)
+    assert(replies == [NAME, '3.0,47.0', None])
+    # No server on the port; retried and then timed out
+    start = time.time()
+    with pytest.raises(socket.timeout):
+        client.request(HOST, 9002, 'raw')
+    assert(0.2 <= time.time() - start < 0.5)
+
+    # An unresolvable host only fails its own request
+    replies = client.fetch_many([('nohost.invalid', 9000, 'name'),
+                                 (HOST, 9001, 'raw')], deadline=0.5)
+    assert(replies == [None, '3.0,47.0'])
+    with pytest.raises(socket.error):
+        client.request('nohost.invalid', 9000, 'name')
+    client.close()
+    data_socket0.stop()
+    data_socket1.stop()
+
+
+def test_socket_client_untagged_server():
+    """Test the socket client fallback for servers without tag support"""
+    server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server.bind((HOST, 9002))
+    server.settimeout(1.0)
+    received = []
+
+    def serve():
+        """Answer like a server that does not know the request tags"""
+        try:
+            while True:
+                request, address = server.recvfrom(1024)
+                received.append(request)
+                if request.startswith('@'):
+                    server.sendto('UNKNOWN_COMMMAND', address)
+                else:
+                    server.sendto(request.upper(), address)
+                if request == 'stop':
+                    break
+        except socket.timeout:
+            pass
+
+    thread = threading.Thread(target=serve)
+    thread.start()
+    client = SocketClient(timeout=0.2, retries=1)
+    try:
+        assert(client.request(HOST, 9002, 'name') == 'NAME')
+        assert(client.fetch_many([(HOST, 9002, 'raw'), (HOST, 9002, 'json')],
+                                 deadline=0.5) == ['RAW', 'JSON'])
+        # Only the first request was tagged
+        assert([request.startswith('@') for request in received] ==
+               [True, False, False, False])
+    finally:
+        client.request(HOST, 9002, 'stop', retries=0)
+        thread.join()
+        server.close()
+        client.close()
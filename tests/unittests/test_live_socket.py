@@ -5,7 +5,7 @@ import time
 import json
 import pytest
 import PyExpLabSys.common.sockets
-from PyExpLabSys.common.sockets import LiveSocket
+from PyExpLabSys.common.sockets import LiveSocket, LiveProtocol
 
 # Module variables
 HOST = '127.0.0.1'
@@ -85,3 +85,88 @@ def test_live_wrong_codename():
         live_socket.set_point('bad name', (1, 2))
 
     live_socket.stop()
+
+
+def test_live_protocol(transport):
+    """Test serving the live socket commands with the datagram protocol"""
+    live_socket = LiveSocket(NAME, ['name1', 'name2'], 1.0)
+    protocol = LiveProtocol(8000)
+    protocol.connection_made(transport)
+    live_socket.set_point('name1', (1.0, 2.0))
+    client = ('127.0.0.1', 47000)
+    protocol.datagram_received('data', client)
+    data, address = transport.sent.pop()
+    assert(address == client)
+    assert(json.loads(data) == [[1.0, 2.0], [0, 47]])
+    live_socket.stop()
+
+
+def test_live_data_since(sock):
+    """Test getting only the points set since a sequence number"""
+    live_socket = LiveSocket(NAME, ['name1', 'name2'], 1.0)
+    live_socket.start()
+    port = 8000
+
+    # All points from the beginning
+    data = json.loads(send_and_resc(sock, 'data_since#-1', port))
+    assert(data['data'] == {'name1': [0, 47], 'name2': [0, 47]})
+    sequence = data['sequence']
+
+    # No changes
+    data = json.loads(send_and_resc(sock, 'data_since#{}'.format(sequence),
+                                    port))
+    assert(data == {'sequence': sequence, 'data': {}})
+
+    # Only the changed point
+    live_socket.set_point('name2', (1.0, 2.0))
+    data = json.loads(send_and_resc(sock, 'data_since#{}'.format(sequence),
+                                    port))
+    assert(data['data'] == {'name2': [1.0, 2.0]})
+    assert(data['sequence'] > sequence)
+
+    # A sequence number from before a restart gives all points
+    data = json.loads(send_and_resc(sock, 'data_since#{}'.format(
+        data['sequence'] + 1000), port))
+    assert(data['data'] == {'name1': [0, 47], 'name2': [1.0, 2.0]})
+
+    assert(send_and_resc(sock, 'data_since#bad', port) ==
+           PyExpLabSys.common.sockets.UNKNOWN_COMMAND)
+
+    live_socket.stop()
+
+
+def test_live_data_since_snapshot(sock, tmpdir):
+    """Test that the sequence number continues after a restart"""
+    path = str(tmpdir.join('snapshot'))
+    port = 8000
+    live_socket = LiveSocket(NAME, ['name1', 'name2'], 1.0,
+                             snapshot_file=path, snapshot_interval=0.05)
+    live_socket.start()
+    for value in range(10):
+        live_socket.set_point('name1', (1.0, value))
+    sequence = json.loads(send_and_resc(sock, 'data_since#-1',
+                                        port))['sequence']
+    live_socket.stop()
+
+    live_socket = LiveSocket(NAME, ['name1', 'name2'], 1.0,
+                             snapshot_file=path)
+    live_socket.start()
+    data = json.loads(send_and_resc(sock, 'data_since#{}'.format(sequence),
+                                    port))
+    assert(data['sequence'] > sequence)
+    assert(data['data'] == {'name1': [1.0, 9], 'name2': [0, 47]})
+    live_socket.stop()
+
+
+def test_live_unsupported_options():
+    """Test that the options the live socket does not support are refused"""
+    for kwargs in ({'history_size': 10}, {'stats_windows': [10]},
+                   {'subscription_lease': 1.0}, {'max_subscribers': 2},
+                   {'multicast': ('239.0.0.1', 9500)}):
+        with pytest.raises(ValueError):
+            LiveSocket(NAME, ['name1'], 1.0, **kwargs)
+    # The port is free, since nothing was started
+    live_socket = LiveSocket(NAME, ['name1'], 1.0, serving_mode='pool',
+                             workers=2)
+    live_socket.start()
+    live_socket.stop()
@@ -0,0 +1,361 @@
+# pylint: disable=W0212
+"""Module to test the components of the continous loggers, which do not need
+a database: the spool, the query executor and the compression policies, and
+the spooling of the loggers against a fake database.
+"""
+
+import re
+import time
+import threading
+import pytest
+from PyExpLabSys.common import loggers
+
+
+def test_spool(tmpdir):
+    """Test that the spool deduplicates and returns the oldest points first"""
+    filename = str(tmpdir.join('spool.db'))
+    spool = loggers.Spool(filename)
+    # WAL mode with synchronous=NORMAL (1)
+    assert(spool._connection.execute('PRAGMA synchronous').fetchone()[0] == 1)
+    spool.put([(1, 20.0, 2.0), (1, 10.0, 1.0), (2, 10.0, 3.0)])
+    # Same type and time replaces the value
+    spool.put([(1, 20.0, 4.0)])
+    assert(len(spool) == 3)
+    # and keeps the id, so a replay of the point does not remove the new value
+    ids = [point[0] for point in spool.get(10)]
+    spool.put([(2, 10.0, 5.0), (2, 10.0, 3.0)])
+    assert([point[0] for point in spool.get(10)] == ids)
+    points = spool.get(2)
+    assert([point[1:] for point in points] == [(1, 10.0, 1.0), (2, 10.0, 3.0)])
+    # A value replaced after the get is not removed
+    spool.put([(2, 10.0, 6.0)])
+    spool.remove(points)
+    assert([point[1:] for point in spool.get(10)] ==
+           [(2, 10.0, 6.0), (1, 20.0, 4.0)])
+    spool.remove(spool.get(1))
+    spool.close()
+
+    # The remaining point survives a re-open
+    spool = loggers.Spool(filename)
+    assert([point[1:] for point in spool.get(10)] == [(1, 20.0, 4.0)])
+    spool.close()
+
+
+class SlowConnection(object):
+    """Fake DB-API connection whose queries take the time given in them"""
+
+    def __init__(self):
+        self.closed = False
+
+    def cursor(self):
+        """Return self as cursor"""
+        return self
+
+    def execute(self, query):
+        """Sleep the number of seconds in query"""
+        time.sleep(float(query))
+
+    @staticmethod
+    def fetchall():
+        """Return a fixed result"""
+        return ((1,),)
+
+    def close(self):
+        """Record that the connection was closed"""
+        self.closed = True
+
+
+def test_query_executor():
+    """Test that the executor re-uses one worker and recycles on timeouts"""
+    connections = []
+
+    def connect(timeout):
+        """Return a new slow connection"""
+        connections.append(SlowConnection())
+        return connections[-1]
+
+    executor = loggers.QueryExecutor(connect, timeout=0.1, wait=0.5)
+    assert(executor.connect())
+    worker = executor._worker
+    for _ in range(3):
+        assert(executor.execute('0') == ((1,),))
+    assert(executor._worker is worker)
+    assert(len(connections) == 1)
+
+    # A query the driver does not time out abandons the worker, which exits
+    # and closes its connection when the query returns
+    assert(executor.execute('1.5') is loggers.NONE_RESPONSE)
+    assert(executor.timeouts == 1)
+    assert(executor.execute('0') == ((1,),))
+    assert(executor._worker is not worker)
+    worker.join(1)
+    assert(not worker.is_alive())
+    assert(connections[0].closed)
+
+    executor.close()
+    assert(connections[-1].closed)
+
+
+def test_compression_deadband():
+    """Test the deadband and max interval compression"""
+    policy = loggers.CompressionPolicy(absolute=0.5, relative=0.1,
+                                       max_interval=10)
+    logged = []
+    for unixtime, value in ((0, 10.0), (1, 10.4), (2, 10.6), (3, 11.5),
+                            (4, 11.6), (14, 11.6)):
+        logged += policy.filter(unixtime, value)
+    # 10.4 is within both bands and 11.6 is only logged again when the max
+    # interval has passed
+    assert(logged == [(0, 10.0), (2, 10.6), (3, 11.5), (14, 11.6)])
+    assert(policy.flush() == [])
+
+
+def test_compression_swinging_door():
+    """Test that swinging door trending keeps only the corners of a curve"""
+    policy = loggers.CompressionPolicy(swinging_door=0.1)
+    # A ramp followed by a flat line
+    points = [(time_, float(time_)) for time_ in range(10)] + \
+        [(time_, 9.0) for time_ in range(10, 20)]
+    logged = []
+    for point in points:
+        logged += policy.filter(*point)
+    logged += policy.flush()
+    assert(logged == [(0, 0.0), (9, 9.0), (19, 9.0)])
+
+    with pytest.raises(ValueError):
+        loggers.CompressionPolicy(absolute=1, swinging_door=0.1)
+
+
+def connection_error():
+    """Return the error of the driver for a lost connection"""
+    if loggers.SQL == 'mysqldb':
+        return loggers.MySQLdb.OperationalError(2006, 'Server has gone away')
+    return loggers.pyodbc.Error('08S01', 'Communication link failure')
+
+
+class FakeDatabase(object):
+    """Fake database with a table with a unique key on (type, time), that
+    can be taken down
+    """
+
+    def __init__(self, codenames):
+        self.codes = {codename: index + 1
+                      for index, codename in enumerate(codenames)}
+        self.down = False
+        #: The rows in the order they were inserted
+        self.rows = []
+        #: The number of rows in each insert
+        self.inserts = []
+        self._lock = threading.Lock()
+
+    def connect(self, timeout):  # pylint: disable=unused-argument
+        """Return a new connection"""
+        if self.down:
+            raise connection_error()
+        return FakeDatabaseConnection(self)
+
+    def points(self, code):
+        """Return the (time, value) points of code in insertion order"""
+        with self._lock:
+            return [row[1:] for row in self.rows if row[0] == code]
+
+
+class FakeDatabaseConnection(object):
+    """Fake DB-API connection to a :class:`FakeDatabase`"""
+
+    insert = re.compile(r'\((\d+), FROM_UNIXTIME\(([^)]+)\), ([^)]+)\)')
+
+    def __init__(self, database):
+        self.database = database
+        self._result = ()
+
+    def cursor(self):
+        """Return self as cursor"""
+        return self
+
+    def execute(self, query):
+        """Look up a codename or insert rows"""
+        if self.database.down:
+            raise connection_error()
+        if query.startswith('SELECT id FROM dateplots_descriptions'):
+            codename = query.split('\'')[1]
+            self._result = ((self.database.codes[codename],),)
+            return
+        replace = 'ON DUPLICATE KEY UPDATE' in query
+        rows = [(int(code), float(unixtime), float(value))
+                for code, unixtime, value in self.insert.findall(query)]
+        with self.database._lock:
+            self.database.inserts.append(len(rows))
+            keys = [row[:2] for row in self.database.rows]
+            for row in rows:
+                if row[:2] in keys and not replace:
+                    raise ValueError('Duplicate entry {}'.format(row[:2]))
+            for row in rows:
+                if row[:2] in keys:
+                    self.database.rows[keys.index(row[:2])] = row
+                else:
+                    self.database.rows.append(row)
+                    keys.append(row[:2])
+        self._result = ()
+
+    def fetchall(self):
+        """Return the result of the last query"""
+        return self._result
+
+    def close(self):
+        """Close the connection"""
+        pass
+
+
+def fake_logger(logger_class, database, codenames, **kwargs):
+    """Return a logger of logger_class that logs to the fake database"""
+
+    class FakeLogger(logger_class):
+        """Logger that connects to the fake database"""
+
+        def _connect(self, timeout):
+            return database.connect(timeout)
+
+    kwargs.setdefault('dequeue_timeout', 0.05)
+    kwargs.setdefault('max_latency', 0.05)
+    kwargs.setdefault('reconnect_waittime', 0.1)
+    return FakeLogger('dateplots_dummy', 'dummy', 'dummy', codenames,
+                      **kwargs)
+
+
+def test_spool_threshold(tmpdir):
+    """Test that points above the spool threshold are spooled and replayed
+    oldest first
+    """
+    database = FakeDatabase(['one'])
+    db_logger = fake_logger(loggers.ContinuousLogger, database, ['one'],
+                            spool_file=str(tmpdir.join('spool.db')),
+                            spool_threshold=5)
+    for unixtime in range(10):
+        db_logger.enqueue_point('one', 1000 + unixtime, float(unixtime))
+    # The points above the threshold wait in memory for the logger thread
+    assert(db_logger._spooling)
+    assert(db_logger.data_queue.qsize() == 5)
+    assert(len(db_logger._spool_buffer) == 5)
+    assert(len(db_logger._spool) == 0)
+
+    db_logger.start()
+    time.sleep(0.3)
+    assert(database.points(1) == [(1000.0 + unixtime, float(unixtime))
+                                  for unixtime in range(10)])
+    assert(not db_logger._spooling)
+    assert(len(db_logger._spool) == 0)
+    db_logger.stop()
+
+
+def test_spool_outage(tmpdir):
+    """Test that the points are spooled while the database is down and
+    replayed when it is back
+    """
+    database = FakeDatabase(['one'])
+    db_logger = fake_logger(loggers.ContinuousLogger, database, ['one'],
+                            spool_file=str(tmpdir.join('spool.db')))
+    db_logger.start()
+    db_logger.enqueue_point('one', 1000, 0.0)
+    time.sleep(0.2)
+    assert(database.points(1) == [(1000.0, 0.0)])
+
+    database.down = True
+    for unixtime in range(1, 6):
+        db_logger.enqueue_point('one', 1000 + unixtime, float(unixtime))
+        time.sleep(0.05)
+    time.sleep(0.3)
+    # The points were written to the spool during the outage
+    assert(db_logger._spooling)
+    assert(db_logger._spool_buffer == [])
+    assert(len(db_logger._spool) == 5)
+    # A value replaced in the spool wins
+    db_logger.enqueue_point('one', 1003, 47.0)
+    time.sleep(0.2)
+    assert(len(db_logger._spool) == 5)
+
+    database.down = False
+    time.sleep(0.5)
+    assert(database.points(1) == [(1000.0, 0.0), (1001.0, 1.0),
+                                  (1002.0, 2.0), (1003.0, 47.0),
+                                  (1004.0, 4.0), (1005.0, 5.0)])
+    assert(not db_logger._spooling)
+    assert(len(db_logger._spool) == 0)
+    db_logger.stop()
+
+
+def test_stop_flush_batches():
+    """Test that the points left at stop are sent in batches"""
+    database = FakeDatabase(['one'])
+    db_logger = fake_logger(loggers.ContinuousLogger, database, ['one'],
+                            batch_size=3)
+    for unixtime in range(7):
+        db_logger.enqueue_point('one', 1000 + unixtime, float(unixtime))
+    # Stopped before it is started, so all points are left for the flush
+    db_logger._stop = True
+    db_logger.run()
+    assert(database.inserts == [3, 3, 1])
+    assert(len(database.points(1)) == 7)
+    assert(db_logger._pending == [])
+
+
+def test_rollup_logger():
+    """Test that the rollup logger logs the mean and max of each bucket"""
+    database = FakeDatabase(['one', 'one_max'])
+    db_logger = fake_logger(loggers.RollupLogger, database, ['one'],
+                            bucket=10, siblings={'one': {'max': 'one_max'}})
+    db_logger.start()
+    # Two buckets with three samples each, in the past
+    time_start = int(time.time() / 10) * 10 - 100
+    for offset, value in ((1, 1.0), (2, 2.0), (3, 6.0),
+                          (11, 4.0), (12, 4.0), (13, 4.0)):
+        db_logger.enqueue_point('one', time_start + offset, value)
+    # The first bucket was closed by the sample for the second
+    assert(db_logger._closed['one'] == time_start)
+    # A late sample for the first bucket is dropped
+    db_logger.enqueue_point('one', time_start + 4, 47.0)
+    assert(db_logger.late_samples == 1)
+    with pytest.raises(ValueError):
+        db_logger.enqueue_point('one_max', time_start, 1.0)
+    # The second bucket is closed when the grace time has passed
+    time.sleep(0.3)
+    assert(database.points(1) == [(time_start + 5.0, 3.0),
+                                  (time_start + 15.0, 4.0)])
+    assert(database.points(2) == [(time_start + 5.0, 6.0),
+                                  (time_start + 15.0, 4.0)])
+    db_logger.stop()
+
+
+@pytest.mark.parametrize('spool', [True, False], ids=['spool', 'memory'])
+def test_rollup_logger_outage(spool, tmpdir):
+    """Test that the buckets are closed on the grace time while the database
+    is down
+    """
+    database = FakeDatabase(['one', 'one_max'])
+    db_logger = fake_logger(
+        loggers.RollupLogger, database, ['one'], bucket=10,
+        siblings={'one': {'max': 'one_max'}}, grace=0.05,
+        spool_file=str(tmpdir.join('spool.db')) if spool else None
+    )
+    db_logger.start()
+    database.down = True
+    # Let the logger fail on a first bucket and start to retry or spool
+    time_start = int(time.time() / 10) * 10 - 100
+    db_logger.enqueue_point('one', time_start + 1, 1.0)
+    time.sleep(0.3)
+    assert(db_logger._spooling if spool else db_logger._pending)
+
+    db_logger.enqueue_point('one', time_start + 11, 2.0)
+    db_logger.enqueue_point('one', time_start + 12, 4.0)
+    time.sleep(0.3)
+    assert(db_logger._aggregates == {})
+    if spool:
+        assert(len(db_logger._spool) == 4)
+
+    database.down = False
+    time.sleep(0.5)
+    assert(database.points(1) == [(time_start + 5.0, 1.0),
+                                  (time_start + 15.0, 3.0)])
+    assert(database.points(2) == [(time_start + 5.0, 1.0),
+                                  (time_start + 15.0, 4.0)])
+    db_logger.stop()